@@ -2,13 +2,17 @@
 API FastAPI para expor dados do Google Sheets para o app Flutter
 """
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Hashable
 import os
 from pathlib import Path
 import sys
 import json
+import time
+import threading
+from datetime import datetime
 
 # Criar arquivo de credenciais a partir de variável de ambiente (Railway)
 creds_json = os.getenv('GOOGLE_CREDENTIALS')
@@ -45,6 +49,9 @@ except ImportError:
     pass
 
 from services.google_sheets_breno import GoogleSheetsBreno
+from services.sheets_client_pool import sheets_pool
+from services.async_sheets import sheets_executor, SheetsTimeoutError
+from services.sheets_write_queue import get_shared_write_queue
 from services.report_service import ReportService
 from services.alert_service import AlertService
 from services.categorization_service import CategorizationService
@@ -63,29 +70,93 @@ app.add_middleware(
 # Configuração
 SPREADSHEET_ID = "1zK0xBqbcS_05eloUPnTn0k-B3mMYdnk8rjWek5YNSuI"
 
-def get_sheets_service():
-    """Inicializa serviço Google Sheets"""
-    try:
-        # Tentar obter do .env ou variável de ambiente
-        creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
-        
-        # Se não estiver configurado, tentar usar o arquivo padrão na raiz
-        if not creds_path:
-            default_path = Path(__file__).parent.parent / 'google-credentials.json'
-            if default_path.exists():
-                creds_path = str(default_path)
-                print(f"✅ Usando arquivo de credenciais padrão: {creds_path}")
-            else:
-                raise ValueError(
-                    "GOOGLE_CREDENTIALS_PATH não configurado e arquivo padrão não encontrado.\n"
-                    "Configure a variável de ambiente GOOGLE_CREDENTIALS_PATH ou crie um arquivo .env com:\n"
-                    "GOOGLE_CREDENTIALS_PATH=google-credentials.json"
-                )
+# Tempo (segundos) que uma leitura da planilha é reaproveitada entre requisições
+SHEETS_CACHE_TTL = float(os.getenv('SHEETS_CACHE_TTL', '30'))
+
+
+class SheetSnapshotCache:
+    """
+    Cache em memória, compartilhado pelo processo, das leituras da planilha
+    
+    Cada entrada expira após o TTL e todo o cache é invalidado quando a API
+    registra algo na planilha (gasto, entrada ou saída).
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, tuple] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """Retorna valor do cache ou executa o loader e guarda o resultado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
         
-        if not os.path.exists(creds_path):
-            raise FileNotFoundError(f"Arquivo de credenciais não encontrado: {creds_path}")
+        value = loader()
         
-        return GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+        with self._lock:
+            # Não guardar leituras iniciadas antes de uma invalidação
+            if cacheable(value) and generation == self._generation:
+                self._entries[key] = (time.monotonic(), value)
+        return value
+    
+    def invalidate(self):
+        """Descarta todas as entradas (chamado após escritas na planilha)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Retorna contadores de acerto/erro do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'ttl': self.ttl,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0
+            }
+
+
+sheet_cache = SheetSnapshotCache(SHEETS_CACHE_TTL)
+
+
+def get_credentials_path() -> str:
+    """Caminho do arquivo de credenciais (variável de ambiente ou arquivo padrão na raiz)"""
+    # Tentar obter do .env ou variável de ambiente
+    creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
+    
+    # Se não estiver configurado, tentar usar o arquivo padrão na raiz
+    if not creds_path:
+        default_path = Path(__file__).parent.parent / 'google-credentials.json'
+        if default_path.exists():
+            creds_path = str(default_path)
+        else:
+            raise ValueError(
+                "GOOGLE_CREDENTIALS_PATH não configurado e arquivo padrão não encontrado.\n"
+                "Configure a variável de ambiente GOOGLE_CREDENTIALS_PATH ou crie um arquivo .env com:\n"
+                "GOOGLE_CREDENTIALS_PATH=google-credentials.json"
+            )
+    
+    if not os.path.exists(creds_path):
+        raise FileNotFoundError(f"Arquivo de credenciais não encontrado: {creds_path}")
+    return creds_path
+
+
+def get_sheets_service():
+    """Retorna serviço Google Sheets compartilhado (autenticado uma única vez)"""
+    try:
+        return sheets_pool.get(SPREADSHEET_ID, get_credentials_path())
     except Exception as e:
         import traceback
         error_msg = f"Erro ao inicializar Google Sheets: {str(e)}\n{traceback.format_exc()}"
@@ -93,6 +164,44 @@ def get_sheets_service():
         raise
 
 
+def get_write_queue():
+    """Retorna fila de escrita da planilha; cada registro e cada gravação invalidam o cache de leituras"""
+    queue = get_shared_write_queue(SPREADSHEET_ID, get_credentials_path())  # Não acessa a planilha
+    queue.add_listener(sheet_cache.invalidate)
+    return queue
+
+
+async def run_sheets(func: Callable[[], Any]) -> Any:
+    """
+    Executa acesso à planilha no pool de threads, sem bloquear o event loop
+    
+    Chamadas que excedem o timeout viram HTTP 504.
+    """
+    try:
+        return await sheets_executor.run(func)
+    except SheetsTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+@app.on_event("startup")
+async def startup_sheets_pool():
+    """Autentica no Google Sheets ao iniciar, antes da primeira requisição"""
+    try:
+        await sheets_executor.run(get_sheets_service)
+        print("✅ Conexão com Google Sheets pronta")
+        
+        # Inicia a gravação em segundo plano (inclui registros pendentes de execuções anteriores)
+        get_write_queue()
+    except Exception as e:
+        print(f"⚠️  Google Sheets indisponível na inicialização: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_sheets_executor():
+    """Encerra o pool de threads do Google Sheets"""
+    sheets_executor.shutdown()
+
+
 # Models
 class StatusResponse(BaseModel):
     saldo: float
@@ -177,8 +286,11 @@ async def root():
 async def get_status():
     """Retorna status financeiro atual"""
     try:
-        service = get_sheets_service()
-        status = service.obter_status_atual()
+        status = dict(await run_sheets(lambda: sheet_cache.get_or_load(
+            ('status',),
+            lambda: get_write_queue().obter_status(),  # Inclui registros ainda na fila
+            cacheable=lambda result: 'erro' not in result
+        )))
         
         # Verificar se há erro no retorno
         if 'erro' in status:
@@ -216,14 +328,18 @@ async def get_status():
 async def get_relatorio_semanal():
     """Retorna relatório semanal"""
     try:
-        service = get_sheets_service()
-        report_service = ReportService(service)
-        relatorio = report_service.gerar_relatorio_semanal()
+        relatorio = await run_sheets(lambda: sheet_cache.get_or_load(
+            ('relatorio_semanal',),
+            lambda: ReportService(get_sheets_service()).gerar_relatorio_semanal(),
+            cacheable=lambda result: result.get('sucesso')
+        ))
         
         if not relatorio.get('sucesso'):
             raise HTTPException(status_code=500, detail=relatorio.get('erro'))
         
         return RelatorioSemanalResponse(**relatorio)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -232,14 +348,48 @@ async def get_relatorio_semanal():
 async def get_relatorio_mensal(mes: Optional[int] = None, ano: Optional[int] = None):
     """Retorna relatório mensal"""
     try:
-        service = get_sheets_service()
-        report_service = ReportService(service)
-        relatorio = report_service.gerar_relatorio_mensal(mes, ano)
+        relatorio = await run_sheets(lambda: sheet_cache.get_or_load(
+            ('relatorio_mensal', mes, ano),
+            lambda: ReportService(get_sheets_service()).gerar_relatorio_mensal(mes, ano),
+            cacheable=lambda result: result.get('sucesso')
+        ))
         
         if not relatorio.get('sucesso'):
             raise HTTPException(status_code=500, detail=relatorio.get('erro'))
         
         return RelatorioMensalResponse(**relatorio)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/relatorio/anual")
+async def get_relatorio_anual(ano: Optional[int] = None):
+    """
+    Retorna relatório anual (uma leitura da planilha inteira)
+    A planilha só tem o ano corrente: outro ano retorna 400.
+    """
+    try:
+        ano_atual = datetime.now().year
+        if ano is not None and ano != ano_atual:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A planilha só contém o ano de {ano_atual}; não há dados de {ano}"
+            )
+        
+        relatorio = await run_sheets(lambda: sheet_cache.get_or_load(
+            ('relatorio_anual', ano_atual),
+            lambda: ReportService(get_sheets_service()).gerar_relatorio_anual(),
+            cacheable=lambda result: result.get('sucesso')
+        ))
+        
+        if not relatorio.get('sucesso'):
+            raise HTTPException(status_code=500, detail=relatorio.get('erro'))
+        
+        return relatorio
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -248,10 +398,13 @@ async def get_relatorio_mensal(mes: Optional[int] = None, ano: Optional[int] = N
 async def get_alertas():
     """Retorna alertas ativos"""
     try:
-        service = get_sheets_service()
-        alert_service = AlertService(service)
-        alertas = alert_service.verificar_alertas()
+        alertas = await run_sheets(lambda: sheet_cache.get_or_load(
+            ('alertas',),
+            lambda: AlertService(get_sheets_service()).verificar_alertas(status=get_write_queue().obter_status())
+        ))
         return [AlertaResponse(**a) for a in alertas]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -273,8 +426,11 @@ async def get_projecao(meses: int = 6):
         if meses < 1 or meses > 12:
             meses = 6
         
-        service = get_sheets_service()
-        projecao = service.calcular_projecao_futura(meses_futuros=meses)
+        projecao = await run_sheets(lambda: sheet_cache.get_or_load(
+            ('projecao', meses),
+            lambda: get_sheets_service().calcular_projecao_futura(meses_futuros=meses),
+            cacheable=lambda result: result.get('sucesso')
+        ))
         
         if not projecao.get('sucesso'):
             return ProjecaoResponse(
@@ -309,6 +465,8 @@ async def get_projecao(meses: int = 6):
             total_alertas=len(alertas_model),
             meses_projetados=meses
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
@@ -320,73 +478,47 @@ async def get_projecao(meses: int = 6):
 async def criar_transacao(tipo: str, valor: float, descricao: str):
     """Cria uma nova transação"""
     try:
-        service = get_sheets_service()
-        
-        if tipo.lower() == 'gasto':
-            result = service.registrar_gasto_diario(valor, descricao)
-        elif tipo.lower() == 'entrada':
-            result = service.registrar_entrada(valor, descricao)
-        elif tipo.lower() == 'saida':
-            result = service.registrar_saida_fixa(valor, descricao)
-        else:
+        tipo = tipo.lower()
+        if tipo not in ('gasto', 'entrada', 'saida'):
             raise HTTPException(status_code=400, detail="Tipo inválido. Use: gasto, entrada ou saida")
         
-        if not result.get('sucesso'):
-            raise HTTPException(status_code=500, detail=result.get('erro'))
+        # Registro vai para a fila local antes de qualquer acesso à planilha e fora do timeout:
+        # a resposta confirma o id enfileirado mesmo se a estimativa falhar (sem registro duplicado)
+        write_queue = get_write_queue()
+        field = {'gasto': 'diario', 'entrada': 'entrada', 'saida': 'saida'}[tipo]
+        row_id = await run_in_threadpool(write_queue.enqueue, field, valor, descricao)
+        result = {'sucesso': True, 'enfileirado': True, 'id': row_id}
+        
+        def estimar():
+            estimativa = write_queue.estimar_registro(row_id)
+            
+            # Alertas disparados pelo registro, avaliados sobre o status estimado (sem ler a planilha)
+            if estimativa and tipo != 'entrada':
+                try:
+                    estimativa['alertas'] = AlertService(get_sheets_service()).alertas_do_registro(
+                        estimativa.get('status_estimado')
+                    )
+                except Exception as e:
+                    print(f"Erro ao avaliar alertas do registro: {e}")
+                    estimativa['alertas'] = []
+            return estimativa
+        
+        try:
+            result.update(await sheets_executor.run(estimar))
+        except Exception as e:
+            print(f"Estimativa do registro {row_id} indisponível (registro mantido na fila): {e}")
         
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/projecao", response_model=ProjecaoResponse)
-async def get_projecao(meses: int = 6):
-    """Retorna projeção de saldo futuro baseado em valores previstos"""
-    try:
-        if meses < 1 or meses > 12:
-            meses = 6
-        
-        service = get_sheets_service()
-        projecao = service.calcular_projecao_futura(meses_futuros=meses)
-        
-        if not projecao.get('sucesso'):
-            return ProjecaoResponse(
-                sucesso=False,
-                saldo_atual=0.0,
-                mes_atual="",
-                ano_atual=0,
-                projecoes=[],
-                alertas=[],
-                total_alertas=0,
-                meses_projetados=0,
-                erro=projecao.get('erro', 'Erro desconhecido')
-            )
-        
-        # Converter projeções para modelos
-        projecoes_model = [
-            ProjecaoMensal(**p) for p in projecao.get('projecoes', [])
-        ]
-        
-        # Converter alertas para modelos
-        alertas_model = [
-            AlertaProjecao(**a) for a in projecao.get('alertas', [])
-        ]
-        
-        return ProjecaoResponse(
-            sucesso=True,
-            saldo_atual=projecao.get('saldo_atual', 0.0),
-            mes_atual=projecao.get('mes_atual', ''),
-            ano_atual=projecao.get('ano_atual', 0),
-            projecoes=projecoes_model,
-            alertas=alertas_model,
-            total_alertas=len(alertas_model),
-            meses_projetados=meses
-        )
-    except Exception as e:
-        import traceback
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        print(f"ERRO em /api/projecao: {error_detail}")
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Retorna estatísticas do cache de leituras da planilha"""
+    return sheet_cache.stats()
 
 
 if __name__ == "__main__":
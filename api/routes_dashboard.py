@@ -44,10 +44,7 @@ def get_dashboard(db: Session = Depends(get_db)):
     ).limit(10).all()
     
     # Configurações
-    from core.models_sqlalchemy import UserSettings
-    settings = db.query(UserSettings).filter(UserSettings.id == 1).first()
-    if not settings:
-        settings = UserSettings()
+    settings = engine.get_settings()
     
     return {
         "current_balance": current_balance,
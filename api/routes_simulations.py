@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from app.database import get_db
 from core.models_sqlalchemy import InstallmentGroup
 from core.finance_engine_api import FinanceEngineAPI
@@ -20,6 +20,22 @@ class LoanSimulation(BaseModel):
     start_date: Optional[str] = None
 
 
+class LoanScenarioBatch(BaseModel):
+    values: List[float]
+    monthly_rates: List[float]
+    terms: List[int]
+    start_date: Optional[str] = None
+    include_projections: bool = True
+
+
+# Limite de cenários por requisição (produto valores x taxas x prazos)
+MAX_SCENARIOS = 500
+
+# Limites do horizonte projetado (prazo e início das parcelas, em meses)
+MAX_TERM_MONTHS = 360
+MAX_START_OFFSET_MONTHS = 60
+
+
 class PurchaseSimulation(BaseModel):
     description: str
     value: float
@@ -33,6 +49,9 @@ def simulate_loan(simulation: LoanSimulation, db: Session = Depends(get_db)):
     if simulation.start_date is None:
         simulation.start_date = datetime.now().strftime('%Y-%m-%d')
     
+    if not 0 < simulation.term <= MAX_TERM_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Prazo deve ser de 1 a {MAX_TERM_MONTHS} meses")
+    
     # Calcular parcela
     if simulation.monthly_rate == 0:
         installment = simulation.value / simulation.term
@@ -81,6 +100,52 @@ def simulate_loan(simulation: LoanSimulation, db: Session = Depends(get_db)):
     }
 
 
+@router.post("/simulate/batch")
+def simulate_loan_batch(batch: LoanScenarioBatch, db: Session = Depends(get_db)):
+    """Simula uma grade de empréstimos (valores x taxas x prazos) sem gravar nada"""
+    scenarios = [
+        (value, rate, term)
+        for value in batch.values
+        for rate in batch.monthly_rates
+        for term in batch.terms
+    ]
+    
+    if not scenarios:
+        raise HTTPException(status_code=400, detail="Informe ao menos um valor, uma taxa e um prazo")
+    
+    if len(scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_SCENARIOS} cenários por requisição")
+    
+    if any(value <= 0 for value in batch.values) or any(rate < 0 for rate in batch.monthly_rates) or any(term <= 0 for term in batch.terms):
+        raise HTTPException(status_code=400, detail="Valores e prazos devem ser positivos e taxas não negativas")
+    
+    if max(batch.terms) > MAX_TERM_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Prazo máximo de {MAX_TERM_MONTHS} meses")
+    
+    if batch.start_date is not None:
+        try:
+            start = datetime.strptime(batch.start_date, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Formato de data inválido. Use YYYY-MM-DD")
+        today = datetime.now()
+        if (start.year - today.year) * 12 + (start.month - today.month) > MAX_START_OFFSET_MONTHS:
+            raise HTTPException(status_code=400, detail=f"Início das parcelas até {MAX_START_OFFSET_MONTHS} meses à frente")
+    
+    engine = FinanceEngineAPI(db)
+    results = engine.simulate_loan_scenarios(scenarios, batch.start_date)
+    commitment_ratio, _ = engine.get_commitment_ratio()
+    
+    if not batch.include_projections:
+        for result in results:
+            del result['projections']
+    
+    return {
+        "count": len(results),
+        "current_commitment_ratio": commitment_ratio,
+        "scenarios": results
+    }
+
+
 @router.post("/simulate/installment")
 def simulate_purchase(simulation: PurchaseSimulation, db: Session = Depends(get_db)):
     """Simula compra parcelada"""
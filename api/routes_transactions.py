@@ -1,13 +1,24 @@
 """
 Rotas de transações
 """
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import base64
+import tempfile
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import insert, select, cast, literal, tuple_, String
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional, List
 from app.database import get_db
 from core.models_sqlalchemy import Transaction
+from core.balance_ledger import BalanceLedger
+from services.category_classifier import prever_categoria
+from services.categorization_service import CategorizationService
+from services.statement_import import StatementImporter, abrir_texto
 # TransactionService não necessário aqui, usando parser direto
 
 router = APIRouter()
@@ -51,9 +62,18 @@ class TransactionResponse(BaseModel):
         return cls(**data)
 
 
+def _data_iso(valor: str) -> str:
+    """Data normalizada em YYYY-MM-DD (422 se inválida; a coluna date não aceita datas inválidas)"""
+    try:
+        return date.fromisoformat(valor).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Data inválida (use YYYY-MM-DD)")
+
+
 @router.post("/transactions", response_model=TransactionResponse)
 def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_db)):
     """Cria uma nova transação"""
+    transaction.date = _data_iso(transaction.date)
     db_transaction = Transaction(
         date=transaction.date,
         description=transaction.description,
@@ -64,66 +84,270 @@ def create_transaction(transaction: TransactionCreate, db: Session = Depends(get
     )
     
     db.add(db_transaction)
+    BalanceLedger(db).apply(db_transaction.date, db_transaction.amount)
     db.commit()
     db.refresh(db_transaction)
     
     return TransactionResponse.from_orm(db_transaction)
 
 
+# Linhas lidas do banco por lote no modo ndjson
+EXPORT_BATCH_SIZE = 1000
+
+# Colunas devolvidas pela listagem (sem hidratar objetos ORM)
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.description,
+    Transaction.amount,
+    Transaction.type,
+    Transaction.category,
+    Transaction.installment_group_id,
+    Transaction.created_at
+)
+
+# created_at como gravado no banco: o cursor compara com o texto exato da coluna
+# (um datetime seria gravado com microssegundos e não casaria com os valores de server_default)
+_created_key = cast(Transaction.created_at, String)
+
+
+def _encode_cursor(date: str, created_key: str, transaction_id: int) -> str:
+    """Cursor opaco com a chave (date, created_at, id) da última linha da página"""
+    raw = json.dumps([date, created_key, transaction_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        date, created_key, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(date), str(created_key), int(transaction_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _row_to_dict(row) -> dict:
+    """Linha da consulta no formato de TransactionResponse"""
+    created_at = row.created_at or datetime.now()
+    return {
+        'id': row.id,
+        'date': row.date,
+        'description': row.description,
+        'amount': row.amount,
+        'type': row.type,
+        'category': row.category,
+        'installment_group_id': row.installment_group_id,
+        'created_at': created_at.isoformat()
+    }
+
+
 @router.get("/transactions", response_model=List[TransactionResponse])
 def get_transactions(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     type_filter: Optional[str] = None,
     limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    format: str = 'json',
     db: Session = Depends(get_db)
 ):
-    """Lista transações com filtros opcionais"""
-    query = db.query(Transaction)
+    """
+    Lista transações com filtros opcionais (mais recentes primeiro)
+    
+    Paginação por cursor: com limit, o cabeçalho X-Next-Cursor traz o cursor da
+    próxima página (ausente na última); basta repeti-lo em cursor.
+    format=ndjson transmite uma transação por linha, sem montar a lista em memória (exportação).
+    """
+    if format not in ('json', 'ndjson'):
+        raise HTTPException(status_code=400, detail="format deve ser 'json' ou 'ndjson'")
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit deve ser positivo")
+    
+    stmt = select(*TRANSACTION_COLUMNS, _created_key.label('created_key'))
     
     if start_date:
-        query = query.filter(Transaction.date >= start_date)
+        stmt = stmt.where(Transaction.date >= _data_iso(start_date))
     if end_date:
-        query = query.filter(Transaction.date <= end_date)
+        stmt = stmt.where(Transaction.date <= _data_iso(end_date))
     if type_filter:
-        query = query.filter(Transaction.type == type_filter)
+        stmt = stmt.where(Transaction.type == type_filter)
+    if cursor:
+        cursor_date, cursor_created, cursor_id = _decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(Transaction.date, Transaction.created_at, Transaction.id)
+            < tuple_(_data_iso(cursor_date), literal(cursor_created, String), cursor_id)
+        )
     
-    query = query.order_by(Transaction.date.desc(), Transaction.created_at.desc())
+    # Mesma ordem do índice ix_transactions_date_created_id (sem ordenação à parte por página)
+    stmt = stmt.order_by(Transaction.date.desc(), Transaction.created_at.desc(), Transaction.id.desc())
     
-    if limit:
-        query = query.limit(limit)
+    if format == 'ndjson':
+        if limit:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(_stream_ndjson(db.get_bind(), stmt), media_type='application/x-ndjson')
     
-    transactions = query.all()
-    return [TransactionResponse.from_orm(t) for t in transactions]
+    # Sem limit a lista inteira é devolvida (compatibilidade); uma linha a mais indica se há próxima página
+    rows = db.execute(stmt.limit(limit + 1) if limit else stmt).all()
+    
+    headers = {}
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        ultima = rows[-1]
+        headers['X-Next-Cursor'] = _encode_cursor(ultima.date, ultima.created_key, ultima.id)
+    
+    return JSONResponse([_row_to_dict(row) for row in rows], headers=headers)
+
+
+def _stream_ndjson(bind, stmt):
+    """Linhas da consulta em NDJSON, lidas do banco em lotes (conexão própria: a sessão da requisição já terá fechado)"""
+    with bind.connect() as conn:
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+        for lote in result.partitions():
+            yield ''.join(json.dumps(_row_to_dict(row), ensure_ascii=False) + '\n' for row in lote)
+
+
+# Transações gravadas por commit no lote
+BULK_CHUNK_SIZE = 1000
+
+VALID_TYPES = ['income', 'fixed', 'variable', 'installment']
+
+
+def _validar_lote(transactions: List[TransactionCreate]) -> List[dict]:
+    """
+    Valida datas, valores e tipos de todo o lote de uma vez (NumPy)
+    
+    Returns:
+        Lista de erros {'index', 'campo', 'erro'} (vazia se tudo válido)
+    """
+    dates = np.array([t.date for t in transactions])
+    amounts = np.array([t.amount for t in transactions], dtype=float)
+    types = np.array([t.type for t in transactions])
+    
+    invalid_date = np.char.str_len(dates) != 10
+    try:
+        dates.astype('datetime64[D]')
+    except ValueError:
+        # Só no caminho de erro: descobrir quais datas não convertem
+        for i, date in enumerate(dates):
+            try:
+                np.datetime64(date, 'D')
+            except ValueError:
+                invalid_date[i] = True
+    
+    erros = []
+    for campo, invalidos, mensagem in (
+        ('date', invalid_date, 'Data inválida (use YYYY-MM-DD)'),
+        ('amount', ~np.isfinite(amounts), 'Valor inválido'),
+        ('type', ~np.isin(types, VALID_TYPES), f"Tipo inválido (use {', '.join(VALID_TYPES)})"),
+    ):
+        erros.extend({'index': int(i), 'campo': campo, 'erro': mensagem} for i in np.flatnonzero(invalidos))
+    return sorted(erros, key=lambda e: e['index'])
 
 
 @router.post("/transactions/bulk")
 def create_bulk_transactions(
     transactions: List[TransactionCreate],
+    counts_only: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Cria múltiplas transações de uma vez"""
-    created = []
-    for transaction in transactions:
-        db_transaction = Transaction(
-            date=transaction.date,
-            description=transaction.description,
-            amount=transaction.amount,
-            type=transaction.type,
-            category=transaction.category,
-            installment_group_id=transaction.installment_group_id
-        )
-        db.add(db_transaction)
-        created.append(db_transaction)
+    """
+    Cria múltiplas transações de uma vez
     
-    db.commit()
+    Valida o lote inteiro antes de gravar e insere em blocos de BULK_CHUNK_SIZE
+    (um INSERT com RETURNING e um commit por bloco, junto com o ledger).
+    Com counts_only=true retorna só a quantidade criada.
+    """
+    if not transactions:
+        return {"message": "0 transações criadas", "count": 0} if counts_only else {
+            "message": "0 transações criadas", "transactions": []
+        }
+    
+    erros = _validar_lote(transactions)
+    if erros:
+        raise HTTPException(status_code=422, detail={
+            "message": f"{len(erros)} erros de validação; nenhuma transação criada",
+            "errors": erros[:50]
+        })
+    
+    # Transações sem categoria: palavras-chave e, sem palavra encontrada, o modelo (uma previsão em lote)
+    sem_categoria = [i for i, t in enumerate(transactions) if not t.category or t.category == 'Outros']
+    categorias = [t.category for t in transactions]
+    if sem_categoria:
+        previstas = CategorizationService().categorizar_many(transactions[i].description for i in sem_categoria)
+        for i, categoria in zip(sem_categoria, previstas):
+            categorias[i] = categoria
+    
+    rows = [
+        {
+            'date': transaction.date,
+            'description': transaction.description,
+            'amount': transaction.amount,
+            'type': transaction.type,
+            'category': categoria,
+            'installment_group_id': transaction.installment_group_id
+        }
+        for transaction, categoria in zip(transactions, categorias)
+    ]
+    
+    created = []
+    # RETURNING na ordem das linhas enviadas (o SQLAlchemy garante a correspondência)
+    stmt = insert(Transaction).returning(Transaction.id, Transaction.created_at, sort_by_parameter_order=True)
+    for inicio in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[inicio:inicio + BULK_CHUNK_SIZE]
+        try:
+            returned = db.execute(stmt, chunk).all()
+            BalanceLedger(db).apply_many((row['date'], row['amount']) for row in chunk)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erro ao gravar transações: {e} ({inicio} transações já gravadas)"
+            )
+        
+        if not counts_only:
+            for row, (id_, created_at) in zip(chunk, returned):
+                created.append({
+                    'id': id_,
+                    **row,
+                    'created_at': created_at.isoformat() if created_at else datetime.now().isoformat()
+                })
     
-    for t in created:
-        db.refresh(t)
+    if counts_only:
+        return {"message": f"{len(rows)} transações criadas", "count": len(rows)}
     
     return {
         "message": f"{len(created)} transações criadas",
-        "transactions": [TransactionResponse.from_orm(t) for t in created]
+        "transactions": created
+    }
+
+
+@router.post("/transactions/import")
+async def import_statement(request: Request, format: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Importa extrato bancário (CSV ou OFX) enviado como corpo da requisição
+    Ex: curl --data-binary @extrato.csv "/api/transactions/import?format=csv"
+    
+    O corpo é gravado em arquivo temporário à medida que chega e processado em blocos;
+    transações que já existem no banco (mesmo conteúdo) são ignoradas.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as arquivo:
+        async for chunk in request.stream():
+            arquivo.write(chunk)
+        arquivo.seek(0)
+        
+        def importar():
+            return StatementImporter(db).importar(abrir_texto(arquivo), format)
+        
+        try:
+            resultado = await run_in_threadpool(importar)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erro ao importar extrato: {e}")
+    
+    return {
+        "message": f"{resultado['importadas']} transações importadas",
+        **resultado
     }
 
 
@@ -139,6 +363,13 @@ def update_transaction(
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
     
+    transaction.date = _data_iso(transaction.date)
+    
+    # Retirar valor antigo do ledger e aplicar o novo
+    ledger = BalanceLedger(db)
+    ledger.apply(db_transaction.date, -db_transaction.amount)
+    ledger.apply(transaction.date, transaction.amount)
+    
     # Atualizar campos
     db_transaction.date = transaction.date
     db_transaction.description = transaction.description
@@ -161,6 +392,7 @@ def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
     if not transaction:
         raise HTTPException(status_code=404, detail="Transação não encontrada")
     
+    BalanceLedger(db).apply(transaction.date, -transaction.amount)
     db.delete(transaction)
     db.commit()
     
@@ -193,6 +425,11 @@ def create_quick_transaction(command: str, db: Session = Depends(get_db)):
         if 'description' not in parsed or 'amount' not in parsed or 'type' not in parsed:
             raise HTTPException(status_code=400, detail="Dados incompletos no comando")
         
+        # Sem categoria pelas palavras do parser, usar a prevista pelo modelo
+        category = str(parsed.get('category', 'Outros'))
+        if category == 'Outros':
+            category = prever_categoria(str(parsed['description']))
+        
         # Criar transação
         today = datetime.now().strftime('%Y-%m-%d')
         
@@ -201,11 +438,12 @@ def create_quick_transaction(command: str, db: Session = Depends(get_db)):
             description=str(parsed['description']),
             amount=float(parsed['amount']),
             type=str(parsed['type']),
-            category=str(parsed.get('category', 'Outros')),
+            category=category,
             installment_group_id=None
         )
         
         db.add(db_transaction)
+        BalanceLedger(db).apply(db_transaction.date, db_transaction.amount)
         db.commit()
         db.refresh(db_transaction)
         
@@ -1,7 +1,9 @@
 """
 Configuração do banco de dados SQLite com SQLAlchemy
 """
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -9,14 +11,71 @@ import os
 # Caminho do banco
 DATABASE_URL = "sqlite:///./data/finance.db"
 
+# PRAGMAs aplicados a cada conexão nova
+# WAL: leitores (dashboard, bot) não bloqueiam durante escritas (importações em lote);
+# com WAL, synchronous=NORMAL continua seguro contra corrupção e evita um fsync por commit.
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-20000')),  # Negativo = KiB (20 MB por conexão)
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),  # Bytes
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '30000')),  # ms esperando o lock de escrita
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+# Pool de conexões (API, bot e scheduler usam o mesmo arquivo)
+POOL_SETTINGS: Dict[str, Any] = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+    'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', '30')),
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),
+}
+
+
+def create_sqlite_engine(url: str = DATABASE_URL, pragmas: Dict[str, Any] = None,
+                         pool: Dict[str, Any] = None) -> Engine:
+    """
+    Cria engine SQLite com os PRAGMAs e o pool configurados
+    
+    Args:
+        url: URL do banco (bancos em memória não usam pool nem WAL)
+        pragmas: PRAGMAs por conexão (padrão: SQLITE_PRAGMAS)
+        pool: Parâmetros do pool (padrão: POOL_SETTINGS)
+    """
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    em_memoria = url in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in url
+    
+    kwargs = {} if em_memoria else dict(POOL_SETTINGS if pool is None else pool)
+    if em_memoria:
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,  # Necessário para SQLite
+            "timeout": pragmas.get('busy_timeout', 5000) / 1000
+        },
+        **kwargs
+    )
+    
+    @event.listens_for(engine, "connect")
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nome, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nome} = {valor}")
+        finally:
+            cursor.close()
+    
+    return engine
+
+
 # Criar diretório se não existir
 os.makedirs("data", exist_ok=True)
 
 # Engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Necessário para SQLite
-)
+engine = create_sqlite_engine()
 
 # Session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -37,9 +96,23 @@ def get_db():
 def init_db():
     """Inicializa o banco de dados criando as tabelas"""
     # Importar modelos para garantir que estão registrados
-    from core.models_sqlalchemy import Transaction, InstallmentGroup, UserSettings
+    from core.models_sqlalchemy import (
+        Transaction, InstallmentGroup, UserSettings, DailyBalance, CategoryKeyword, CategoryVersion
+    )
+    
+    # Tabelas antigas com esquema desatualizado (tipos de coluna)
+    from core.schema_migrations import migrar
+    migradas = migrar(engine)
+    for tabela in migradas:
+        print(f"✅ Tabela {tabela} migrada para o esquema atual")
+    
     Base.metadata.create_all(bind=engine)
     
+    # create_all não adiciona índices novos a tabelas já existentes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
     # Criar configurações padrão se não existir
     from sqlalchemy.orm import Session
     db = SessionLocal()
@@ -57,6 +130,14 @@ def init_db():
             )
             db.add(default_settings)
             db.commit()
+        
+        # Montar ledger de saldos para bancos criados antes dele existir
+        # (e refazer após migrar transactions ou daily_balances para centavos)
+        from core.balance_ledger import BalanceLedger
+        if migradas:
+            BalanceLedger(db).rebuild()
+        else:
+            BalanceLedger(db).ensure_built()
     except Exception as e:
         print(f"Aviso ao inicializar settings: {e}")
         db.rollback()
@@ -34,6 +34,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from services.google_sheets_breno import GoogleSheetsBreno
+from services.sheets_client_pool import get_shared_sheets_service
+from services.sheets_write_queue import get_shared_write_queue
 from services.categorization_service import CategorizationService
 from services.report_service import ReportService
 from services.alert_service import AlertService
@@ -55,15 +57,21 @@ report_service = None
 alert_service = None
 
 def get_sheets_service():
-    """Inicializa serviço Google Sheets"""
+    """Retorna serviço Google Sheets compartilhado (token renovado e conexão verificada pelo pool)"""
     global sheets_service
-    if sheets_service is None:
-        creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
-        if not creds_path:
-            raise ValueError("GOOGLE_CREDENTIALS_PATH não configurado")
-        sheets_service = GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+    creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
+    if not creds_path:
+        raise ValueError("GOOGLE_CREDENTIALS_PATH não configurado")
+    sheets_service = get_shared_sheets_service(SPREADSHEET_ID, creds_path)
     return sheets_service
 
+def get_write_queue():
+    """Retorna fila de escrita da planilha (registros confirmados na hora, gravados em lote)"""
+    creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
+    if not creds_path:
+        raise ValueError("GOOGLE_CREDENTIALS_PATH não configurado")
+    return get_shared_write_queue(SPREADSHEET_ID, creds_path)
+
 def get_categorization_service():
     """Inicializa serviço de categorização"""
     global categorization_service
@@ -91,6 +99,24 @@ def format_currency(value: float) -> str:
     return f"R$ {value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
 
 
+def formatar_alertas_registro(result: dict) -> str:
+    """Alertas disparados por um registro (sem ler a planilha), para anexar à resposta"""
+    try:
+        alertas = get_alert_service().alertas_do_registro(result.get('status_estimado'))
+    except Exception as e:
+        print(f"Erro ao avaliar alertas do registro: {e}")
+        return ""
+    
+    msg = ""
+    for alerta in alertas:
+        msg += (
+            f"\n\n━━━━━━━━━━━━━━━━━━━━\n"
+            f"{alerta.get('emoji', '⚠️')} *{alerta.get('titulo', 'Alerta')}*\n"
+            f"{alerta.get('mensagem', '')}"
+        )
+    return msg
+
+
 def parse_gasto_command(text: str) -> Optional[Dict[str, Any]]:
     """
     Parse do comando /gasto ou mensagem simples
@@ -147,13 +173,13 @@ async def comando_gasto(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
         
-        service = get_sheets_service()
+        write_queue = get_write_queue()
         categorization = get_categorization_service()
         
         # Categorizar automaticamente
         categoria = categorization.categorizar(parsed['descricao'])
         
-        result = service.registrar_gasto_diario(
+        result = write_queue.registrar_gasto_diario(
             valor=parsed['valor'],
             descricao=parsed['descricao']
         )
@@ -203,6 +229,8 @@ async def comando_gasto(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     f"{semaforo} *Saldo atual:* {format_currency(saldo)}\n"
                     f"_{result.get('status', 'OK')}_"
                 )
+            
+            msg += formatar_alertas_registro(result)
         else:
             msg = (
                 f"❌ *Erro ao registrar gasto*\n\n"
@@ -391,8 +419,8 @@ async def comando_entrada(update: Update, context: ContextTypes.DEFAULT_TYPE):
         valor = float(numbers[0].replace(',', '.'))
         descricao = re.sub(r'\d+[.,]?\d*', '', text, count=1).strip() or "Entrada"
         
-        service = get_sheets_service()
-        result = service.registrar_entrada(
+        write_queue = get_write_queue()
+        result = write_queue.registrar_entrada(
             valor=valor,
             descricao=descricao
         )
@@ -454,8 +482,8 @@ async def comando_saida(update: Update, context: ContextTypes.DEFAULT_TYPE):
         valor = float(numbers[0].replace(',', '.'))
         descricao = re.sub(r'\d+[.,]?\d*', '', text, count=1).strip() or "Saída fixa"
         
-        service = get_sheets_service()
-        result = service.registrar_saida_fixa(
+        write_queue = get_write_queue()
+        result = write_queue.registrar_saida_fixa(
             valor=valor,
             descricao=descricao
         )
@@ -470,6 +498,7 @@ async def comando_saida(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 f"💵 *Saldo atual:*\n"
                 f"*{format_currency(result.get('saldo_atual', 0))}*"
             )
+            msg += formatar_alertas_registro(result)
         else:
             msg = (
                 f"❌ *Erro ao registrar saída*\n\n"
@@ -635,6 +664,62 @@ async def comando_relatorio(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Erro: {str(e)}")
 
 
+async def comando_anual(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Comando /anual [ano] - Relatório anual"""
+    try:
+        ano = int(context.args[0]) if context.args and context.args[0].isdigit() else None
+        
+        report_service = get_report_service()
+        relatorio = report_service.gerar_relatorio_anual(ano)
+        
+        if not relatorio.get('sucesso'):
+            await update.message.reply_text(
+                f"❌ *Erro ao gerar relatório*\n\n{relatorio.get('erro', 'Erro desconhecido')}",
+                parse_mode='Markdown'
+            )
+            return
+        
+        totais = relatorio.get('totais', {})
+        msg = (
+            f"📅 *Relatório Anual {relatorio['ano']}*\n\n"
+            f"━━━━━━━━━━━━━━━━━━━━\n"
+            f"💵 Entradas: {format_currency(totais.get('entrada', 0))}\n"
+            f"📤 Saídas fixas: {format_currency(totais.get('saida', 0))}\n"
+            f"💸 Diário: {format_currency(totais.get('diario', 0))}\n"
+            f"📊 Performance: {format_currency(totais.get('performance', 0))}\n\n"
+        )
+        
+        # Mês a mês (apenas meses realizados)
+        meses = [m for m in relatorio.get('meses', []) if m['realizado']]
+        if meses:
+            msg += f"━━━━━━━━━━━━━━━━━━━━\n📈 *Mês a mês:*\n"
+            for m in meses:
+                emoji = "🟢" if m['performance'] >= 0 else "🔴"
+                msg += f"{emoji} {m['nome_mes'].title()}: {format_currency(m['performance'])}\n"
+            msg += "\n"
+        
+        melhor = relatorio.get('melhor_mes')
+        pior = relatorio.get('pior_mes')
+        if melhor and pior:
+            msg += (
+                f"━━━━━━━━━━━━━━━━━━━━\n"
+                f"🏆 Melhor mês: {melhor['nome_mes'].title()} ({format_currency(melhor['performance'])})\n"
+                f"⚠️ Pior mês: {pior['nome_mes'].title()} ({format_currency(pior['performance'])})\n\n"
+            )
+        
+        distribuicao = relatorio.get('distribuicao_gastos', {})
+        msg += (
+            f"━━━━━━━━━━━━━━━━━━━━\n"
+            f"🏷️ *Distribuição dos gastos:*\n"
+            f"• Saídas fixas: {distribuicao.get('saida', {}).get('percentual', 0):.1f}%\n"
+            f"• Diário: {distribuicao.get('diario', {}).get('percentual', 0):.1f}%"
+        )
+        
+        await update.message.reply_text(msg, parse_mode='Markdown')
+    except Exception as e:
+        await update.message.reply_text(f"❌ Erro: {str(e)}")
+
+
 async def comando_alertas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Comando /alertas - Ver alertas ativos"""
     try:
@@ -800,6 +885,7 @@ async def comando_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "━━━━━━━━━━━━━━━━━━━━\n\n"
         "📈 `/resumo` - Relatório semanal completo\n\n"
         "📊 `/relatorio` - Relatório mensal com insights\n\n"
+        "📅 `/anual [ano]` - Relatório do ano mês a mês\n\n"
         "🔮 `/projecao [meses]` - Projeção futura de saldo (padrão: 6 meses)\n\n"
         "🏷️ `/categorias` - Ver categorias de gastos\n\n"
         "🔔 `/alertas` - Ver alertas financeiros ativos\n\n"
@@ -858,6 +944,16 @@ def main():
     """Inicializa o bot"""
     print("🤖 Iniciando Bot Telegram - Método Breno...")
     
+    # Autenticar no Google Sheets uma vez, antes do primeiro comando
+    try:
+        get_sheets_service()
+        print("✅ Conexão com Google Sheets pronta")
+        
+        # Inicia a gravação em segundo plano (inclui registros pendentes de execuções anteriores)
+        get_write_queue()
+    except Exception as e:
+        print(f"⚠️  Google Sheets indisponível na inicialização: {e}")
+    
     # Criar aplicação
     application = Application.builder().token(TELEGRAM_TOKEN).build()
     
@@ -872,6 +968,7 @@ def main():
     application.add_handler(CommandHandler("categorias", comando_categorias))
     application.add_handler(CommandHandler("resumo", comando_resumo))
     application.add_handler(CommandHandler("relatorio", comando_relatorio))
+    application.add_handler(CommandHandler("anual", comando_anual))
     application.add_handler(CommandHandler("alertas", comando_alertas))
     application.add_handler(CommandHandler("projecao", comando_projecao))
     application.add_handler(CommandHandler("meta", comando_meta))
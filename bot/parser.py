@@ -8,6 +8,9 @@ from datetime import datetime
 class CommandParser:
     """Parser simples para comandos rápidos"""
     
+    # Descrições que começam com estas palavras são gastos fixos
+    FIXED_KEYWORDS = ['aluguel', 'luz', 'agua', 'água', 'internet', 'condominio', 'condomínio']
+    
     def parse(self, command: str) -> Optional[Dict[str, Any]]:
         """
         Parse de comandos tipo:
@@ -70,8 +73,7 @@ class CommandParser:
                     return None
         
         # Gasto fixo (palavras-chave)
-        fixos_keywords = ['aluguel', 'luz', 'agua', 'água', 'internet', 'condominio', 'condomínio']
-        is_fixo = any(command.startswith(kw) for kw in fixos_keywords)
+        is_fixo = any(command.startswith(kw) for kw in self.FIXED_KEYWORDS)
         
         if is_fixo:
             parts = command.split()
@@ -105,6 +107,19 @@ class CommandParser:
         
         return None
     
+    def infer_type(self, description: str, amount: float) -> str:
+        """
+        Tipo de uma transação já separada em descrição e valor (ex: linha de extrato)
+        Mesmas regras de parse: valor positivo é receita, palavras de gasto fixo no início
+        da descrição indicam gasto fixo e o restante é gasto variável.
+        """
+        if amount > 0:
+            return 'income'
+        desc_lower = description.strip().lower()
+        if any(desc_lower.startswith(kw) for kw in self.FIXED_KEYWORDS):
+            return 'fixed'
+        return 'variable'
+    
     def _infer_category(self, description: str) -> str:
         """Infere categoria baseado na descrição"""
         desc_lower = description.lower()
@@ -32,6 +32,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from telegram import Bot
 from services.google_sheets_breno import GoogleSheetsBreno
+from services.sheets_client_pool import get_shared_sheets_service
 from services.alert_service import AlertService
 from services.report_service import ReportService
 
@@ -41,6 +42,9 @@ if not TELEGRAM_TOKEN:
 
 SPREADSHEET_ID = "1zK0xBqbcS_05eloUPnTn0k-B3mMYdnk8rjWek5YNSuI"
 
+# Intervalo (minutos) entre verificações de alertas; alertas repetidos são filtrados pelo registro persistente
+ALERT_CHECK_INTERVAL = int(os.getenv('ALERT_CHECK_INTERVAL', '10'))
+
 bot = Bot(token=TELEGRAM_TOKEN)
 
 
@@ -57,7 +61,7 @@ async def job_lembrete_20h():
             print("⚠️  GOOGLE_CREDENTIALS_PATH não configurado")
             return
         
-        service = GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+        service = get_shared_sheets_service(SPREADSHEET_ID, creds_path)
         status = service.obter_status_atual()
         
         gasto_diario = status.get('gasto_diario', 0)
@@ -100,11 +104,11 @@ async def job_resumo_matinal():
             print("⚠️  GOOGLE_CREDENTIALS_PATH não configurado")
             return
         
-        service = GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+        service = get_shared_sheets_service(SPREADSHEET_ID, creds_path)
         alert_service = AlertService(service)
         
         status = service.obter_status_atual()
-        alertas = alert_service.verificar_alertas()
+        alertas = alert_service.verificar_alertas(status)
         
         saldo = status.get('saldo', 0)
         performance = status.get('performance', 0)
@@ -174,7 +178,7 @@ async def job_relatorio_semanal():
             print("⚠️  GOOGLE_CREDENTIALS_PATH não configurado")
             return
         
-        service = GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+        service = get_shared_sheets_service(SPREADSHEET_ID, creds_path)
         report_service = ReportService(service)
         
         relatorio = report_service.gerar_relatorio_semanal()
@@ -227,19 +231,17 @@ async def job_relatorio_semanal():
 
 
 async def job_verificar_alertas():
-    """Job para verificar e enviar alertas (a cada 6 horas)"""
+    """Job para verificar e enviar alertas novos (a cada ALERT_CHECK_INTERVAL minutos)"""
     try:
         creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
         if not creds_path:
             return
         
-        service = GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+        service = get_shared_sheets_service(SPREADSHEET_ID, creds_path)
         alert_service = AlertService(service)
         
-        alertas = alert_service.verificar_alertas()
-        
-        # Filtrar apenas alertas de alta prioridade
-        alertas_altos = [a for a in alertas if a.get('prioridade') == 'alta']
+        # Apenas alertas de alta prioridade ainda não enviados (ou com envio expirado)
+        alertas_altos = alert_service.alertas_pendentes(prioridades=['alta'])
         
         if not alertas_altos:
             return
@@ -265,6 +267,7 @@ async def job_verificar_alertas():
                         text=msg,
                         parse_mode='Markdown'
                     )
+                    alert_service.marcar_enviados([alerta])
                     print(f"✅ Alerta enviado para {chat_id}")
     except Exception as e:
         print(f"❌ Erro ao verificar alertas: {e}")
@@ -278,7 +281,7 @@ async def job_zerar_diarios_nao_registrados():
             print("⚠️  GOOGLE_CREDENTIALS_PATH não configurado")
             return
         
-        service = GoogleSheetsBreno(SPREADSHEET_ID, creds_path)
+        service = get_shared_sheets_service(SPREADSHEET_ID, creds_path)
         result = service.zerar_diarios_nao_registrados_ontem()
         
         if result.get('sucesso'):
@@ -323,6 +326,15 @@ def main():
     """Inicializa agendador"""
     print("⏰ Iniciando agendador de lembretes e relatórios...")
     
+    # Autenticar no Google Sheets uma vez; os jobs reutilizam a mesma conexão
+    creds_path = os.getenv('GOOGLE_CREDENTIALS_PATH')
+    if creds_path:
+        try:
+            get_shared_sheets_service(SPREADSHEET_ID, creds_path)
+            print("✅ Conexão com Google Sheets pronta")
+        except Exception as e:
+            print(f"⚠️  Google Sheets indisponível na inicialização: {e}")
+    
     # Lembrete às 20h
     schedule.every().day.at("20:00").do(lambda: run_async(job_lembrete_20h()))
     
@@ -335,15 +347,15 @@ def main():
     # Relatório semanal aos domingos às 9h
     schedule.every().sunday.at("09:00").do(lambda: run_async(job_relatorio_semanal()))
     
-    # Verificar alertas a cada 6 horas
-    schedule.every(6).hours.do(lambda: run_async(job_verificar_alertas()))
+    # Verificar alertas com frequência (leituras vêm do espelho local)
+    schedule.every(ALERT_CHECK_INTERVAL).minutes.do(lambda: run_async(job_verificar_alertas()))
     
     print("✅ Agendador iniciado!")
     print("   - Lembrete: 20:00")
     print("   - Resumo matinal: 08:00")
     print("   - Zerar diários não registrados: 00:05")
     print("   - Relatório semanal: Domingos 09:00")
-    print("   - Verificação de alertas: A cada 6 horas")
+    print(f"   - Verificação de alertas: A cada {ALERT_CHECK_INTERVAL} minutos")
     
     while True:
         schedule.run_pending()
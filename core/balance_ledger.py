@@ -0,0 +1,190 @@
+"""
+Ledger de saldo acumulado por dia
+Mantido pelas rotas de transações para que o saldo (atual ou em uma data) seja uma consulta direta
+"""
+from bisect import bisect_left
+from typing import Dict, Any, Iterable, Tuple, Optional
+from sqlalchemy import func, insert, update, bindparam, or_
+from sqlalchemy.orm import Session
+from core.models_sqlalchemy import Transaction, DailyBalance
+
+
+class BalanceLedger:
+    """Mantém a tabela daily_balances sincronizada com as transações"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def apply(self, date: str, amount: float):
+        """
+        Aplica o valor de uma transação ao ledger (use valor negativo para remover)
+        
+        Não faz commit - a alteração entra na mesma transação da rota que chamou.
+        """
+        if not amount:
+            return
+        
+        self.db.flush()
+        
+        day = self.db.query(DailyBalance).filter(DailyBalance.date == date).first()
+        if day is None:
+            # Novo dia começa com o saldo do último dia anterior
+            day = DailyBalance(date=date, net_amount=0.0, balance=self.get_balance_before(date))
+            self.db.add(day)
+            self.db.flush()
+        
+        self.db.query(DailyBalance).filter(DailyBalance.date == date).update(
+            {DailyBalance.net_amount: DailyBalance.net_amount + amount},
+            synchronize_session=False
+        )
+        
+        # Todos os dias a partir desta data acumulam a diferença
+        self.db.query(DailyBalance).filter(DailyBalance.date >= date).update(
+            {DailyBalance.balance: DailyBalance.balance + amount},
+            synchronize_session=False
+        )
+        self.db.expire_all()
+    
+    def apply_many(self, entries: Iterable[Tuple[str, float]]):
+        """
+        Aplica várias transações agrupando por data
+        
+        Mesmo resultado de chamar apply dia a dia, mas com quantidade fixa de comandos:
+        uma leitura dos saldos, uma inserção dos dias novos e dois UPDATE em lote
+        (net_amount por dia e saldo acumulado por faixa de datas).
+        """
+        by_date: Dict[str, float] = {}
+        for date, amount in entries:
+            by_date[date] = by_date.get(date, 0.0) + amount
+        dates = [date for date in sorted(by_date) if by_date[date]]
+        if not dates:
+            return
+        
+        self.db.flush()
+        
+        existing = self.db.query(DailyBalance.date, DailyBalance.balance).filter(
+            DailyBalance.date <= dates[-1]
+        ).order_by(DailyBalance.date).all()
+        existing_dates = [date for date, _ in existing]
+        existing_set = set(existing_dates)
+        
+        # Dias novos começam com o saldo do último dia anterior (antes deste lote)
+        new_days = []
+        for date in dates:
+            if date not in existing_set:
+                pos = bisect_left(existing_dates, date)
+                balance_before = existing[pos - 1][1] if pos > 0 else 0.0
+                new_days.append({'date': date, 'net_amount': 0.0, 'balance': balance_before})
+        if new_days:
+            self.db.execute(insert(DailyBalance), new_days)
+        
+        table = DailyBalance.__table__
+        self.db.execute(
+            update(table).where(table.c.date == bindparam('b_date')).values(
+                net_amount=table.c.net_amount + bindparam('b_amount')
+            ),
+            [{'b_date': date, 'b_amount': by_date[date]} for date in dates]
+        )
+        
+        # Cada faixa [dia, próximo dia do lote) acumula a soma do lote até aquele dia
+        ranges = []
+        cumulative = 0.0
+        for i, date in enumerate(dates):
+            cumulative += by_date[date]
+            end = dates[i + 1] if i + 1 < len(dates) else None
+            ranges.append({'b_start': date, 'b_end': end, 'b_amount': cumulative})
+        self.db.execute(
+            update(table).where(
+                table.c.date >= bindparam('b_start'),
+                or_(bindparam('b_end').is_(None), table.c.date < bindparam('b_end'))
+            ).values(balance=table.c.balance + bindparam('b_amount')),
+            ranges
+        )
+        self.db.expire_all()
+    
+    def get_balance(self, as_of: Optional[str] = None) -> float:
+        """Saldo acumulado até o fim do dia informado (None = saldo atual)"""
+        query = self.db.query(DailyBalance.balance)
+        if as_of:
+            query = query.filter(DailyBalance.date <= as_of)
+        row = query.order_by(DailyBalance.date.desc()).first()
+        return row[0] if row else 0.0
+    
+    def get_balance_before(self, date: str) -> float:
+        """Saldo acumulado antes do dia informado"""
+        row = self.db.query(DailyBalance.balance).filter(
+            DailyBalance.date < date
+        ).order_by(DailyBalance.date.desc()).first()
+        return row[0] if row else 0.0
+    
+    def _totals_by_date(self):
+        """
+        Soma das transações por dia, direto da tabela transactions
+        
+        Dias que somam zero ficam de fora, como em apply (valor zero não cria dia no ledger).
+        """
+        return self.db.query(
+            Transaction.date, func.sum(Transaction.amount)
+        ).group_by(Transaction.date).having(
+            func.sum(Transaction.amount) != 0
+        ).order_by(Transaction.date).all()
+    
+    def rebuild(self) -> int:
+        """Reconstrói o ledger do zero a partir das transações. Retorna quantidade de dias"""
+        self.db.query(DailyBalance).delete(synchronize_session=False)
+        
+        balance = 0.0
+        days = []
+        for date, total in self._totals_by_date():
+            balance += total
+            days.append({'date': date, 'net_amount': total, 'balance': balance})
+        
+        if days:
+            self.db.bulk_insert_mappings(DailyBalance, days)
+        self.db.commit()
+        return len(days)
+    
+    def check(self, tolerance: float = 0.01) -> Dict[str, Any]:
+        """Compara o ledger com as transações e lista os dias divergentes"""
+        expected = {}
+        balance = 0.0
+        for date, total in self._totals_by_date():
+            balance += total
+            expected[date] = (total, balance)
+        
+        stored = {
+            day.date: (day.net_amount, day.balance)
+            for day in self.db.query(DailyBalance).all()
+        }
+        
+        divergencias = []
+        balance = 0.0
+        for date in sorted(set(expected) | set(stored)):
+            net_esperado, balance_esperado = expected.get(date, (0.0, balance))
+            balance = balance_esperado
+            net_atual, balance_atual = stored.get(date, (None, None))
+            
+            # Dia sem linha no ledger só diverge se movimentou algum valor
+            if net_atual is None and abs(net_esperado) <= tolerance:
+                continue
+            
+            if (net_atual is None or abs(net_atual - net_esperado) > tolerance
+                    or abs(balance_atual - balance_esperado) > tolerance):
+                divergencias.append({
+                    'date': date,
+                    'net_amount': net_atual,
+                    'expected_net_amount': net_esperado,
+                    'balance': balance_atual,
+                    'expected_balance': balance_esperado
+                })
+        
+        return {
+            'ok': not divergencias,
+            'days': len(stored),
+            'divergences': divergencias
+        }
+    
+    def ensure_built(self):
+        """Constrói o ledger se estiver vazio e já houver transações (bancos antigos)"""
+        if self.db.query(DailyBalance.date).first() is None and self.db.query(Transaction.id).first() is not None:
+            self.rebuild()
@@ -1,11 +1,39 @@
 """
 Motor financeiro adaptado para SQLAlchemy/FastAPI
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Any, Tuple
+from sqlalchemy import func, and_, or_
 from sqlalchemy.orm import Session
 from core.models_sqlalchemy import Transaction, InstallmentGroup, UserSettings
+from core.balance_ledger import BalanceLedger
+from core.installment_schedule import get_installment_schedule
 import calendar
+import numpy as np
+
+# Meses de histórico usados nas médias da projeção
+HISTORY_MONTHS = 3
+
+
+def add_months(year: int, month: int, n: int) -> Tuple[int, int]:
+    """Soma n meses (pode ser negativo) respeitando o calendário"""
+    idx = year * 12 + (month - 1) + n
+    return idx // 12, idx % 12 + 1
+
+
+def calculate_loan_installments(values: np.ndarray, monthly_rates: np.ndarray, terms: np.ndarray) -> np.ndarray:
+    """
+    Parcela (tabela Price) de vários empréstimos de uma vez
+    
+    Args:
+        values: Valores emprestados
+        monthly_rates: Taxas mensais em decimal (0.02 = 2%)
+        terms: Prazos em meses
+    """
+    growth = (1 + monthly_rates) ** terms
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = values * (monthly_rates * growth) / (growth - 1)
+    return np.where(monthly_rates == 0, values / terms, price)
 
 
 class FinanceEngineAPI:
@@ -13,23 +41,54 @@ class FinanceEngineAPI:
     
     def __init__(self, db: Session):
         self.db = db
+        
+        # Memo por instância (uma instância por requisição): cada mês é calculado uma vez
+        self._month_cache: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._installments_cache: Dict[Tuple[int, int], float] = {}
+        self._settings = None
+    
+    def clear_cache(self):
+        """Descarta valores memorizados (usar após alterar transações na mesma sessão)"""
+        self._month_cache.clear()
+        self._installments_cache.clear()
+        self._settings = None
+    
+    def get_settings(self) -> UserSettings:
+        """Retorna configurações do usuário (consulta feita uma vez por instância)"""
+        if self._settings is None:
+            settings = self.db.query(UserSettings).filter(UserSettings.id == 1).first()
+            self._settings = settings or UserSettings()
+        return self._settings
     
     def get_month_performance(self, year: int, month: int) -> Dict[str, Any]:
         """Calcula performance de um mês específico"""
+        key = (year, month)
+        if key not in self._month_cache:
+            self._month_cache[key] = self._compute_month_performance(year, month)
+        return dict(self._month_cache[key])
+    
+    def _compute_month_performance(self, year: int, month: int) -> Dict[str, Any]:
+        """Consulta o banco e calcula a performance do mês"""
         start_date = f"{year}-{month:02d}-01"
         last_day = calendar.monthrange(year, month)[1]
         end_date = f"{year}-{month:02d}-{last_day}"
         
-        # Buscar transações do mês
-        transactions = self.db.query(Transaction).filter(
-            Transaction.date >= start_date,
-            Transaction.date <= end_date
-        ).all()
+        # Somar por tipo direto no banco (índice cobre date, type, amount)
+        totals = dict(
+            self.db.query(Transaction.type, func.sum(Transaction.amount)).filter(
+                Transaction.date >= start_date,
+                Transaction.date <= end_date,
+                or_(
+                    and_(Transaction.type == 'income', Transaction.amount > 0),
+                    and_(Transaction.type.in_(['fixed', 'variable']), Transaction.amount < 0)
+                )
+            ).group_by(Transaction.type).all()
+        )
         
         # Separar por tipo
-        entradas = sum(t.amount for t in transactions if t.type == 'income' and t.amount > 0)
-        fixos = abs(sum(t.amount for t in transactions if t.type == 'fixed' and t.amount < 0))
-        variaveis = abs(sum(t.amount for t in transactions if t.type == 'variable' and t.amount < 0))
+        entradas = totals.get('income') or 0
+        fixos = abs(totals.get('fixed') or 0)
+        variaveis = abs(totals.get('variable') or 0)
         
         # Calcular parcelas do mês
         parcelas = self._calculate_installments_for_month(year, month)
@@ -50,40 +109,30 @@ class FinanceEngineAPI:
     
     def _calculate_installments_for_month(self, year: int, month: int) -> float:
         """Calcula total de parcelas para um mês específico"""
-        groups = self.db.query(InstallmentGroup).filter(
-            InstallmentGroup.is_simulation == False
-        ).all()
-        
-        total = 0.0
-        
-        for group in groups:
-            start = datetime.strptime(group.start_date, '%Y-%m-%d')
-            month_date = datetime(year, month, 1)
-            
-            months_passed = (month_date.year - start.year) * 12 + (month_date.month - start.month)
-            
-            if months_passed >= 0 and months_passed < group.total_installments:
-                if group.remaining_installments > (group.total_installments - months_passed - 1):
-                    total += group.installment_value
-        
-        return total
+        key = (year, month)
+        if key not in self._installments_cache:
+            self._installments_cache[key] = self._compute_installments_for_month(year, month)
+        return self._installments_cache[key]
+    
+    def _compute_installments_for_month(self, year: int, month: int) -> float:
+        """Soma as parcelas ativas no mês (grupos não simulados)"""
+        return get_installment_schedule(self.db).total_for_month(year, month)
     
     def get_current_balance(self) -> float:
-        """Calcula saldo atual"""
-        transactions = self.db.query(Transaction).all()
-        return sum(t.amount for t in transactions)
+        """Retorna saldo atual (consulta direta ao ledger de saldos diários)"""
+        return BalanceLedger(self.db).get_balance()
     
     def get_commitment_ratio(self) -> Tuple[float, Dict[str, Any]]:
         """Calcula comprometimento"""
         today = datetime.now()
         receitas_3_meses = []
         
-        for i in range(3):
-            month_date = today - timedelta(days=30 * (i + 1))
-            month_perf = self.get_month_performance(month_date.year, month_date.month)
+        for i in range(HISTORY_MONTHS):
+            hist_year, hist_month = add_months(today.year, today.month, -(i + 1))
+            month_perf = self.get_month_performance(hist_year, hist_month)
             receitas_3_meses.append(month_perf['entradas'])
         
-        media_receita = sum(receitas_3_meses) / 3 if receitas_3_meses else 0
+        media_receita = sum(receitas_3_meses) / HISTORY_MONTHS
         
         current_perf = self.get_month_performance(today.year, today.month)
         fixos_parcelas = current_perf['fixos'] + current_perf['parcelas']
@@ -101,9 +150,7 @@ class FinanceEngineAPI:
         today = datetime.now()
         perf = self.get_month_performance(today.year, today.month)
         
-        settings = self.db.query(UserSettings).filter(UserSettings.id == 1).first()
-        if not settings:
-            settings = UserSettings()
+        settings = self.get_settings()
         
         performance = perf['performance']
         
@@ -123,86 +170,208 @@ class FinanceEngineAPI:
             return 'red', '🔴 Crítico', performance
     
     def project_future_balance(self, months: int = 6) -> List[Dict[str, Any]]:
-        """Projeta saldo futuro"""
+        """
+        Projeta saldo futuro mês a mês (calendário real, sem passos de 30 dias)
+        
+        Histórico e meses projetados são carregados em uma única consulta agrupada,
+        então o número de consultas não cresce com o horizonte.
+        """
+        if months <= 0:
+            return []
+        
         today = datetime.now()
         current_balance = self.get_current_balance()
         
-        settings = self.db.query(UserSettings).filter(UserSettings.id == 1).first()
-        if not settings:
-            settings = UserSettings()
+        # Janela: 3 meses de histórico + horizonte da projeção
+        hist_year, hist_month = add_months(today.year, today.month, -HISTORY_MONTHS)
+        window = self._load_month_window(hist_year, hist_month, HISTORY_MONTHS + months)
         
-        # Calcular médias históricas
-        receitas_3_meses = []
-        variaveis_3_meses = []
+        entradas = window['entradas']
+        fixos = window['fixos']
+        variaveis = window['variaveis']
+        parcelas = window['parcelas']
         
-        for i in range(3):
-            month_date = today - timedelta(days=30 * (i + 1))
-            month_perf = self.get_month_performance(month_date.year, month_date.month)
-            receitas_3_meses.append(month_perf['entradas'])
-            variaveis_3_meses.append(month_perf['variaveis'])
+        # Médias históricas (meses anteriores ao atual)
+        media_receita = entradas[:HISTORY_MONTHS].mean()
+        media_variavel = variaveis[:HISTORY_MONTHS].mean()
+        media_fixos = fixos[:HISTORY_MONTHS].mean()
         
-        media_receita = sum(receitas_3_meses) / 3 if receitas_3_meses else settings.average_income
-        media_variavel = sum(variaveis_3_meses) / 3 if variaveis_3_meses else (settings.daily_average_expense * 30)
+        # Meses projetados (o atual fica com os valores reais)
+        entradas = entradas[HISTORY_MONTHS:].copy()
+        fixos = fixos[HISTORY_MONTHS:].copy()
+        variaveis = variaveis[HISTORY_MONTHS:].copy()
+        parcelas = parcelas[HISTORY_MONTHS:]
         
-        # Projeção
-        projections = []
-        balance = current_balance
+        entradas[1:] = media_receita
+        variaveis[1:] = media_variavel
+        fixos[1:] = np.where(fixos[1:] > 0, fixos[1:], media_fixos)
+        
+        saidas = fixos + variaveis + parcelas
+        performance = entradas - saidas
+        balances = current_balance + np.cumsum(performance)
         
+        projections = []
         for i in range(months):
-            month_date = today + timedelta(days=30 * i)
-            year = month_date.year
-            month = month_date.month
-            
-            if i == 0:
-                perf = self.get_month_performance(year, month)
-            else:
-                # Projeção
-                month_perf_real = self.get_month_performance(year, month)
-                fixos = month_perf_real['fixos'] if month_perf_real['fixos'] > 0 else self._get_fixed_expenses_for_month(year, month)
-                parcelas = self._calculate_installments_for_month(year, month)
-                
-                perf = {
-                    'entradas': media_receita,
-                    'fixos': fixos,
-                    'variaveis': media_variavel,
-                    'parcelas': parcelas,
-                    'performance': media_receita - (fixos + media_variavel + parcelas)
-                }
-            
-            balance += perf['performance']
-            
+            year, month = add_months(today.year, today.month, i)
             projections.append({
                 'year': year,
                 'month': month,
                 'month_name': calendar.month_name[month],
-                'performance': perf['performance'],
-                'balance': balance,
-                'entradas': perf['entradas'],
-                'saidas': perf.get('fixos', 0) + perf.get('variaveis', 0) + perf.get('parcelas', 0)
+                'performance': float(performance[i]),
+                'balance': float(balances[i]),
+                'entradas': float(entradas[i]),
+                'saidas': float(saidas[i])
             })
         
         return projections
     
+    def simulate_loan_scenarios(self, scenarios: List[Tuple[float, float, int]],
+                                start_date: str = None) -> List[Dict[str, Any]]:
+        """
+        Avalia vários cenários de empréstimo em memória (nada é gravado no banco)
+        
+        O histórico e a projeção base são calculados uma vez e cada cenário só
+        desconta suas parcelas da projeção base.
+        
+        Como no cronograma de parcelas (InstallmentSchedule), parcelas de meses anteriores
+        ao atual são consideradas pagas: só os meses de max(início, atual) até o fim entram.
+        
+        Args:
+            scenarios: Tuplas (valor, taxa mensal em %, prazo em meses)
+            start_date: Início das parcelas ('YYYY-MM-DD'), padrão mês atual
+        """
+        if not scenarios:
+            return []
+        
+        today = datetime.now()
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else today
+        # Mês da primeira parcela relativo ao atual (negativo se o empréstimo já começou)
+        offset = (start.year - today.year) * 12 + (start.month - today.month)
+        first = max(offset, 0)
+        
+        values = np.array([s[0] for s in scenarios], dtype=float)
+        rates = np.array([s[1] for s in scenarios], dtype=float)
+        terms = np.array([s[2] for s in scenarios], dtype=int)
+        installments = calculate_loan_installments(values, rates / 100, terms)
+        
+        # Projeção base até o fim do empréstimo mais longo (já sem nenhuma simulação)
+        horizon = max(int((offset + terms).max()), 1)
+        baseline = self.project_future_balance(horizon)
+        base_balance = np.array([p['balance'] for p in baseline])
+        
+        _, commitment = self.get_commitment_ratio()
+        media_receita = commitment['media_receita']
+        
+        # Matriz cenários x meses com a parcela nos meses em que o empréstimo está ativo
+        months = np.arange(horizon)
+        active = (months[None, :] >= offset) & (months[None, :] < offset + terms[:, None])
+        payments = active * installments[:, None]
+        balances = base_balance[None, :] - np.cumsum(payments, axis=1)
+        
+        # Empréstimos já quitados não comprometem a renda
+        ongoing = (offset + terms) > 0
+        new_ratios = (commitment['fixos_parcelas'] + installments * ongoing) / media_receita * 100 if media_receita > 0 else np.zeros(len(scenarios))
+        
+        results = []
+        for idx, (value, rate, term) in enumerate(scenarios):
+            # Meses em que o empréstimo está ativo a partir de agora: [first, offset + term)
+            end = offset + term
+            # Saldos mínimo e final no mês atual se não restam parcelas
+            last = max(end, first + 1)
+            projections = []
+            for i in range(first, end):
+                base = baseline[i]
+                payment = float(payments[idx, i])
+                projections.append({
+                    **base,
+                    'performance': base['performance'] - payment,
+                    'balance': float(balances[idx, i]),
+                    'saidas': base['saidas'] + payment
+                })
+            
+            results.append({
+                'value': value,
+                'monthly_rate': rate,
+                'term': term,
+                'installment': float(installments[idx]),
+                'total_payable': float(installments[idx] * term),
+                'new_commitment_ratio': float(new_ratios[idx]),
+                'min_balance': float(balances[idx, first:last].min()),
+                'final_balance': float(balances[idx, last - 1]),
+                'projections': projections
+            })
+        
+        return results
+    
+    def _load_month_window(self, year: int, month: int, count: int) -> Dict[str, np.ndarray]:
+        """
+        Carrega totais por mês de `count` meses a partir de (ano, mês) em uma consulta
+        
+        Também preenche o cache de performance mensal da instância.
+        """
+        end_year, end_month = add_months(year, month, count - 1)
+        start_date = f"{year}-{month:02d}-01"
+        end_date = f"{end_year}-{end_month:02d}-{calendar.monthrange(end_year, end_month)[1]}"
+        
+        month_key = func.substr(Transaction.date, 1, 7)
+        rows = self.db.query(month_key, Transaction.type, func.sum(Transaction.amount)).filter(
+            Transaction.date >= start_date,
+            Transaction.date <= end_date,
+            or_(
+                and_(Transaction.type == 'income', Transaction.amount > 0),
+                and_(Transaction.type.in_(['fixed', 'variable']), Transaction.amount < 0)
+            )
+        ).group_by(month_key, Transaction.type).all()
+        
+        columns = {'income': 'entradas', 'fixed': 'fixos', 'variable': 'variaveis'}
+        window = {name: np.zeros(count) for name in columns.values()}
+        base = year * 12 + (month - 1)
+        
+        for ym, tx_type, total in rows:
+            idx = int(ym[:4]) * 12 + int(ym[5:7]) - 1 - base
+            window[columns[tx_type]][idx] = abs(total or 0)
+        
+        window['parcelas'] = get_installment_schedule(self.db).totals_for_range(year, month, count)
+        
+        for i in range(count):
+            key = add_months(year, month, i)
+            self._installments_cache.setdefault(key, float(window['parcelas'][i]))
+            if key not in self._month_cache:
+                entradas = float(window['entradas'][i])
+                fixos = float(window['fixos'][i])
+                variaveis = float(window['variaveis'][i])
+                parcelas = float(window['parcelas'][i])
+                self._month_cache[key] = {
+                    'year': key[0],
+                    'month': key[1],
+                    'entradas': entradas,
+                    'fixos': fixos,
+                    'variaveis': variaveis,
+                    'parcelas': parcelas,
+                    'performance': entradas - (fixos + variaveis + parcelas),
+                    'total_saidas': fixos + variaveis + parcelas
+                }
+        
+        return window
+    
     def _get_fixed_expenses_for_month(self, year: int, month: int) -> float:
         """Calcula fixos recorrentes de um mês"""
         today = datetime.now()
         fixos_3_meses = []
         
-        for i in range(3):
-            month_date = today - timedelta(days=30 * (i + 1))
-            month_perf = self.get_month_performance(month_date.year, month_date.month)
+        for i in range(HISTORY_MONTHS):
+            hist_year, hist_month = add_months(today.year, today.month, -(i + 1))
+            month_perf = self.get_month_performance(hist_year, hist_month)
             fixos_3_meses.append(month_perf['fixos'])
         
-        return sum(fixos_3_meses) / 3 if fixos_3_meses else 0
+        return sum(fixos_3_meses) / HISTORY_MONTHS
     
     def calculate_max_installment(self, keep_status: str = 'yellow') -> float:
         """Calcula parcela máxima que aguenta"""
         today = datetime.now()
         perf = self.get_month_performance(today.year, today.month)
         
-        settings = self.db.query(UserSettings).filter(UserSettings.id == 1).first()
-        if not settings:
-            settings = UserSettings()
+        settings = self.get_settings()
         
         _, commitment = self.get_commitment_ratio()
         media_receita = commitment['media_receita']
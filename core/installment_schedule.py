@@ -0,0 +1,138 @@
+"""
+Cronograma de parcelas vetorizado (NumPy)
+Monta uma matriz meses x grupos uma única vez e responde totais mensais por fatiamento
+"""
+import threading
+from datetime import datetime
+from typing import Iterable, Tuple, Optional
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from core.models_sqlalchemy import InstallmentGroup
+
+
+def month_index(year: int, month: int) -> int:
+    """Converte (ano, mês) em índice absoluto de meses"""
+    return year * 12 + (month - 1)
+
+
+class InstallmentSchedule:
+    """Totais de parcelas por mês a partir de (início, total, restantes, valor) de cada grupo"""
+    
+    def __init__(self, groups: Iterable[Tuple[str, int, int, float]]):
+        """
+        Args:
+            groups: Tuplas (start_date 'YYYY-MM-DD', total_installments, remaining_installments, installment_value)
+        """
+        rows = list(groups)
+        self.groups = rows
+        
+        if not rows:
+            self.first_month = 0
+            self.matrix = np.zeros((0, 0))
+            self.totals = np.zeros(0)
+            return
+        
+        starts = [datetime.strptime(start_date, '%Y-%m-%d') for start_date, _, _, _ in rows]
+        start = np.array([month_index(d.year, d.month) for d in starts])
+        total = np.array([r[1] for r in rows])
+        remaining = np.array([r[2] for r in rows])
+        value = np.array([r[3] for r in rows], dtype=float)
+        
+        # Parcelas já pagas não entram: o grupo fica ativo do mês (total - restantes) até o último
+        first_active = start + np.maximum(total - remaining, 0)
+        last_active = start + total - 1
+        
+        self.first_month = int(first_active.min())
+        months = np.arange(self.first_month, int(last_active.max()) + 1)
+        
+        # Matriz meses x grupos com o valor da parcela nos meses ativos
+        active = (months[:, None] >= first_active[None, :]) & (months[:, None] <= last_active[None, :])
+        self.matrix = active * value[None, :]
+        self.totals = self.matrix.sum(axis=1)
+    
+    def with_group(self, start_date: str, total_installments: int, installment_value: float,
+                   remaining_installments: Optional[int] = None) -> 'InstallmentSchedule':
+        """Retorna novo cronograma incluindo um grupo hipotético (não altera este)"""
+        if remaining_installments is None:
+            remaining_installments = total_installments
+        return InstallmentSchedule(
+            self.groups + [(start_date, total_installments, remaining_installments, installment_value)]
+        )
+    
+    def total_for_month(self, year: int, month: int) -> float:
+        """Total de parcelas de um mês"""
+        idx = month_index(year, month) - self.first_month
+        if 0 <= idx < len(self.totals):
+            return float(self.totals[idx])
+        return 0.0
+    
+    def totals_for_range(self, year: int, month: int, count: int) -> np.ndarray:
+        """Totais de parcelas para `count` meses consecutivos a partir de (ano, mês)"""
+        result = np.zeros(count)
+        start = month_index(year, month) - self.first_month
+        lo = max(start, 0)
+        hi = min(start + count, len(self.totals))
+        if lo < hi:
+            result[lo - start:hi - start] = self.totals[lo:hi]
+        return result
+
+
+# Cronograma compartilhado pelo processo, reconstruído quando algum InstallmentGroup muda
+_lock = threading.Lock()
+_version = 0
+_cached: Tuple[int, Optional[InstallmentSchedule]] = (-1, None)
+
+
+def get_installment_schedule(db: Session) -> InstallmentSchedule:
+    """Retorna o cronograma dos grupos reais (não simulados), usando cache"""
+    global _cached
+    with _lock:
+        version, schedule = _cached
+        if schedule is not None and version == _version:
+            return schedule
+        version = _version
+    
+    groups = db.query(
+        InstallmentGroup.start_date,
+        InstallmentGroup.total_installments,
+        InstallmentGroup.remaining_installments,
+        InstallmentGroup.installment_value
+    ).filter(InstallmentGroup.is_simulation == False).all()
+    schedule = InstallmentSchedule(tuple(g) for g in groups)
+    
+    with _lock:
+        # Só guarda se nenhum grupo mudou durante a leitura
+        if version == _version:
+            _cached = (version, schedule)
+    return schedule
+
+
+def invalidate_installment_schedule():
+    """Força reconstrução do cronograma na próxima consulta"""
+    global _version
+    with _lock:
+        _version += 1
+
+
+@event.listens_for(InstallmentGroup, 'after_insert')
+@event.listens_for(InstallmentGroup, 'after_update')
+@event.listens_for(InstallmentGroup, 'after_delete')
+def _mark_installments_changed(mapper, connection, target):
+    """Marca a sessão para invalidar o cronograma quando o commit acontecer"""
+    session = Session.object_session(target)
+    if session is not None:
+        session.info['installments_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    """Invalida o cronograma após commit de alterações em InstallmentGroup"""
+    if session.info.pop('installments_changed', False):
+        invalidate_installment_schedule()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    """Alterações desfeitas não invalidam o cronograma"""
+    session.info.pop('installments_changed', None)
@@ -1,26 +1,64 @@
 """
 Modelos SQLAlchemy para FastAPI
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from datetime import date
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Date, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.types import TypeDecorator
 from app.database import Base
 
 
+class IsoDate(TypeDecorator):
+    """Coluna DATE; aceita date ou 'YYYY-MM-DD' e devolve sempre 'YYYY-MM-DD'"""
+    impl = Date
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return date.fromisoformat(value)  # Rejeita datas inválidas antes de gravar
+        return value
+    
+    def process_result_value(self, value, dialect):
+        return value.isoformat() if value is not None else None
+
+
+class Cents(TypeDecorator):
+    """Valor em centavos inteiros no banco; lido e escrito em reais (float)"""
+    impl = Integer
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        return int(round(value * 100)) if value is not None else None
+    
+    def process_result_value(self, value, dialect):
+        return value / 100 if value is not None else None
+
+
 class Transaction(Base):
     """Modelo de transação financeira"""
     __tablename__ = "transactions"
     
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String, nullable=False, index=True)  # YYYY-MM-DD
+    date = Column(IsoDate, nullable=False)  # YYYY-MM-DD
     description = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Cents, nullable=False)
     type = Column(String, nullable=False)  # 'income', 'fixed', 'variable', 'installment'
     category = Column(String)
     installment_group_id = Column(Integer, ForeignKey("installment_groups.id"), nullable=True)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
     
     installment_group = relationship("InstallmentGroup", back_populates="transactions")
+    
+    __table_args__ = (
+        # Índice de cobertura para somas mensais por tipo (get_month_performance);
+        # também atende filtros por (date, type) e por intervalo de datas
+        Index('ix_transactions_date_type_amount', 'date', 'type', 'amount'),
+        # Transações recentes do dashboard (order_by created_at desc)
+        Index('ix_transactions_created_at', 'created_at'),
+        # Listagem paginada por cursor (order_by date, created_at, id desc)
+        Index('ix_transactions_date_created_id', 'date', 'created_at', 'id'),
+    )
 
 
 class InstallmentGroup(Base):
@@ -38,6 +76,15 @@ class InstallmentGroup(Base):
     created_at = Column(DateTime, server_default=func.now())
     
     transactions = relationship("Transaction", back_populates="installment_group")
+    
+    __table_args__ = (
+        # Parcelas ativas (cronograma e dashboard): índice parcial de cobertura, sem as simulações
+        Index(
+            'ix_installment_groups_active',
+            'start_date', 'total_installments', 'remaining_installments', 'installment_value',
+            sqlite_where=text('is_simulation = 0')
+        ),
+    )
 
 
 class UserSettings(Base):
@@ -50,3 +97,34 @@ class UserSettings(Base):
     warning_threshold = Column(Float, default=70.0)
     critical_threshold = Column(Float, default=90.0)
     daily_average_expense = Column(Float, default=0.0)
+
+
+class DailyBalance(Base):
+    """Saldo acumulado por dia (ledger mantido pelas rotas de transações)"""
+    __tablename__ = "daily_balances"
+    
+    date = Column(String, primary_key=True)  # YYYY-MM-DD
+    net_amount = Column(Cents, nullable=False, default=0.0)  # Soma das transações do dia
+    balance = Column(Cents, nullable=False, default=0.0)  # Saldo acumulado até o fim do dia
+
+
+class CategoryKeyword(Base):
+    """Palavra-chave de categorização adicionada pelo usuário"""
+    __tablename__ = "category_keywords"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    category = Column(String, nullable=False)
+    keyword = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('category', 'keyword', name='uq_category_keywords_category_keyword'),
+    )
+
+
+class CategoryVersion(Base):
+    """Versão do dicionário de palavras-chave de cada categoria (incrementada a cada alteração)"""
+    __tablename__ = "category_versions"
+    
+    category = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
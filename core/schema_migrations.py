@@ -0,0 +1,168 @@
+"""
+Migrações do esquema SQLite (executadas por init_db)
+create_all não altera tabelas existentes; aqui ficam as mudanças que exigem reconstruir tabelas.
+"""
+from datetime import date
+from typing import Dict, List
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+
+def _tipos_colunas(conn, tabela: str) -> Dict[str, str]:
+    """Tipo declarado de cada coluna da tabela (vazio se a tabela não existe)"""
+    return {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({tabela})")}
+
+
+def _colunas_not_null(conn, tabela: str) -> List[str]:
+    """Colunas declaradas NOT NULL"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({tabela})") if row[3]]
+
+
+def _normalizar_datas(conn, tabela: str) -> List[int]:
+    """
+    Regrava datas em YYYY-MM-DD quando possível
+    
+    Returns:
+        IDs das linhas com data que não pôde ser interpretada
+    """
+    invalidas = []
+    for row_id, valor in conn.execute(f"SELECT id, date FROM {tabela}").fetchall():
+        try:
+            normalizada = date.fromisoformat(str(valor).strip()).isoformat()
+        except ValueError:
+            invalidas.append(row_id)
+            continue
+        if normalizada != valor:
+            conn.execute(f"UPDATE {tabela} SET date = ? WHERE id = ?", (normalizada, row_id))
+    return invalidas
+
+
+def _colocar_em_quarentena(conn, tabela: str, ids: List[int]) -> str:
+    """
+    Move linhas para {tabela}_quarentena (mesmas colunas + motivo e data da migração)
+    
+    Returns:
+        Nome da tabela de quarentena
+    """
+    quarentena = f"{tabela}_quarentena"
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {quarentena} AS SELECT * FROM {tabela} WHERE 0")
+    colunas_quarentena = _tipos_colunas(conn, quarentena)
+    for coluna in ('motivo', 'quarentena_em'):
+        if coluna not in colunas_quarentena:
+            conn.execute(f"ALTER TABLE {quarentena} ADD COLUMN {coluna} TEXT")
+    
+    colunas = ', '.join(_tipos_colunas(conn, tabela))
+    for inicio in range(0, len(ids), 500):  # Limite de parâmetros por instrução do SQLite
+        lote = ids[inicio:inicio + 500]
+        placeholders = ','.join('?' * len(lote))
+        conn.execute(
+            f"INSERT INTO {quarentena} ({colunas}, motivo, quarentena_em) "
+            f"SELECT {colunas}, 'data inválida', datetime('now') FROM {tabela} WHERE id IN ({placeholders})",
+            lote
+        )
+        conn.execute(f"DELETE FROM {tabela} WHERE id IN ({placeholders})", lote)
+    return quarentena
+
+
+def migrar_transactions(engine: Engine) -> bool:
+    """
+    Converte transactions para date DATE e amount em centavos INTEGER (antes VARCHAR e FLOAT)
+    e created_at NOT NULL (linhas sem created_at recebem a meia-noite da própria data)
+    
+    SQLite não altera o tipo nem a nulidade de colunas: a tabela é reconstruída com o esquema
+    atual do modelo em uma única transação. Linhas com data que não pode ser interpretada vão para
+    transactions_quarentena (com o texto original) em vez de impedir a migração.
+    Valores com mais de 2 casas decimais são arredondados para o centavo.
+    
+    Returns:
+        True se a tabela foi migrada
+    """
+    from core.models_sqlalchemy import Transaction
+    
+    table = Transaction.__table__
+    raw = engine.raw_connection()
+    conn = raw.driver_connection
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # BEGIN/COMMIT explícitos: DDL e cópia na mesma transação
+    try:
+        tipos = _tipos_colunas(conn, table.name)
+        if not tipos or (
+            tipos.get('date') == 'DATE' and tipos.get('amount') == 'INTEGER'
+            and 'created_at' in _colunas_not_null(conn, table.name)
+        ):
+            return False
+        
+        # Expressões que convertem cada coluna antiga (amount só se ainda estiver em reais)
+        conversoes = {'created_at': "COALESCE(created_at, date || ' 00:00:00')"}
+        if tipos.get('amount') != 'INTEGER':
+            conversoes['amount'] = "CAST(ROUND(amount * 100) AS INTEGER)"
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            invalidas = _normalizar_datas(conn, table.name)
+            if invalidas:
+                quarentena = _colocar_em_quarentena(conn, table.name, invalidas)
+                print(f"⚠️  {len(invalidas)} transações com data inválida movidas para {quarentena} "
+                      f"(ids {invalidas[:20]})")
+            
+            # Nomes de índices são globais no SQLite: os antigos saem antes de recriar a tabela
+            for _, nome, _, origem, _ in conn.execute(f"PRAGMA index_list({table.name})").fetchall():
+                if origem == 'c':
+                    conn.execute(f"DROP INDEX {nome}")
+            
+            antiga = f"{table.name}_pre_migracao"
+            conn.execute(f"ALTER TABLE {table.name} RENAME TO {antiga}")
+            conn.execute(str(CreateTable(table).compile(dialect=engine.dialect)))
+            
+            colunas = [c.name for c in table.columns]
+            origem_colunas = [conversoes.get(c, c) for c in colunas]
+            conn.execute(
+                f"INSERT INTO {table.name} ({', '.join(colunas)}) "
+                f"SELECT {', '.join(origem_colunas)} FROM {antiga}"
+            )
+            conn.execute(f"DROP TABLE {antiga}")
+            
+            for index in table.indexes:
+                conn.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+    finally:
+        conn.isolation_level = isolation_level
+        raw.close()
+
+
+def migrar_daily_balances(engine: Engine) -> bool:
+    """
+    Descarta daily_balances com valores em FLOAT (agora centavos INTEGER)
+    
+    O ledger é derivado das transações: create_all recria a tabela e init_db o reconstrói.
+    
+    Returns:
+        True se a tabela foi descartada
+    """
+    from core.models_sqlalchemy import DailyBalance
+    
+    tabela = DailyBalance.__tablename__
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        if _tipos_colunas(conn, tabela).get('balance') not in (None, 'INTEGER'):
+            conn.execute(f"DROP TABLE {tabela}")
+            conn.commit()
+            return True
+        return False
+    finally:
+        raw.close()
+
+
+def migrar(engine: Engine) -> List[str]:
+    """Aplica as migrações pendentes. Retorna as tabelas migradas"""
+    migradas = []
+    if migrar_transactions(engine):
+        migradas.append('transactions')
+    if migrar_daily_balances(engine):
+        migradas.append('daily_balances')
+    return migradas
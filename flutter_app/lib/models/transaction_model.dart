@@ -47,6 +47,19 @@ class Transaction {
   }
 }
 
+/// Página de transações (paginação por cursor)
+class TransactionPage {
+  final List<Transaction> items;
+  final String? nextCursor; // null na última página
+
+  TransactionPage({
+    required this.items,
+    this.nextCursor,
+  });
+
+  bool get hasMore => nextCursor != null;
+}
+
 /// Modelo de Simulação de Empréstimo
 class LoanSimulation {
   final double value;
@@ -68,17 +68,21 @@ class _SpreadsheetScreenState extends State<SpreadsheetScreen> {
       final lastDay = DateTime(year, month + 1, 0).day;
       final endDate = '$year-${month.toString().padLeft(2, '0')}-$lastDay';
 
-      // Calcular saldo inicial do mês (saldo atual menos transações deste mês em diante)
-      final allTransactions = await _apiService.getTransactions();
+      // Calcular saldo inicial do mês (soma das transações dos meses anteriores)
+      final previousMonthEnd = DateFormat('yyyy-MM-dd').format(DateTime(year, month, 0));
       double initialBalance = 0.0;
-      for (final t in allTransactions) {
-        final tDate = DateTime.parse(t.date);
-        if (tDate.year < year || (tDate.year == year && tDate.month < month)) {
-          initialBalance += t.amount;
-        }
-      }
+      await _forEachPage(
+        (page) {
+          for (final t in page) {
+            initialBalance += t.amount;
+          }
+        },
+        endDate: previousMonthEnd,
+      );
 
-      final transactions = await _apiService.getTransactions(
+      final transactions = <Transaction>[];
+      await _forEachPage(
+        transactions.addAll,
         startDate: startDate,
         endDate: endDate,
       );
@@ -102,6 +106,25 @@ class _SpreadsheetScreenState extends State<SpreadsheetScreen> {
     }
   }
 
+  /// Percorre as transações página a página, sem baixar tudo de uma vez
+  Future<void> _forEachPage(
+    void Function(List<Transaction> page) onPage, {
+    String? startDate,
+    String? endDate,
+  }) async {
+    String? cursor;
+    do {
+      final page = await _apiService.getTransactionsPage(
+        pageSize: 200,
+        cursor: cursor,
+        startDate: startDate,
+        endDate: endDate,
+      );
+      onPage(page.items);
+      cursor = page.nextCursor;
+    } while (cursor != null);
+  }
+
   void _calculateDailyBalances(List<Transaction> transactions, double initialBalance) {
     _dailyBalances.clear();
     
@@ -251,6 +251,47 @@ class ApiService {
     }
   }
 
+  /// Busca uma página de transações (mais recentes primeiro)
+  ///
+  /// Passe o [TransactionPage.nextCursor] da página anterior em [cursor]
+  /// para continuar a listagem.
+  Future<TransactionPage> getTransactionsPage({
+    int pageSize = 100,
+    String? cursor,
+    String? type,
+    String? startDate,
+    String? endDate,
+  }) async {
+    try {
+      final queryParams = <String, String>{'limit': pageSize.toString()};
+      if (cursor != null) queryParams['cursor'] = cursor;
+      if (type != null) queryParams['type_filter'] = type;
+      if (startDate != null) queryParams['start_date'] = startDate;
+      if (endDate != null) queryParams['end_date'] = endDate;
+
+      final uri = Uri.parse('$baseUrl/api/transactions').replace(
+        queryParameters: queryParams,
+      );
+
+      final response = await client.get(
+        uri,
+        headers: {'Content-Type': 'application/json'},
+      ).timeout(const Duration(seconds: 10));
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body) as List;
+        return TransactionPage(
+          items: data.map((t) => Transaction.fromJson(t)).toList(),
+          nextCursor: response.headers['x-next-cursor'],
+        );
+      } else {
+        throw Exception('Erro ao buscar transações: ${response.statusCode}');
+      }
+    } catch (e) {
+      throw Exception('Erro de conexão: $e');
+    }
+  }
+
   /// Simula empréstimo
   Future<LoanSimulation> simulateLoan({
     required double value,
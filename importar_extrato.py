@@ -0,0 +1,57 @@
+"""
+Script para importar extrato bancário (CSV ou OFX) para o banco
+Uso:
+    python importar_extrato.py extrato.csv
+    python importar_extrato.py extrato.ofx
+    python importar_extrato.py extrato.txt --formato csv
+    python importar_extrato.py --formato ofx extrato.txt
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Configurar encoding UTF-8 para Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import SessionLocal, init_db
+from services.statement_import import StatementImporter, abrir_texto
+
+parser = argparse.ArgumentParser(description="Importa extrato bancário (CSV ou OFX) para o banco")
+parser.add_argument('arquivo', type=Path, help="Arquivo do extrato")
+parser.add_argument('--formato', choices=['csv', 'ofx'],
+                    help="Formato do arquivo (padrão: pela extensão ou pelo conteúdo)")
+args = parser.parse_args()
+
+caminho = args.arquivo
+formato = args.formato
+if formato is None and caminho.suffix.lower() in ('.csv', '.ofx'):
+    formato = caminho.suffix.lower()[1:]
+
+init_db()
+db = SessionLocal()
+
+try:
+    print(f"📥 Importando {caminho.name}...")
+    with open(caminho, 'rb') as arquivo:
+        resultado = StatementImporter(db).importar(abrir_texto(arquivo), formato)
+    
+    print(f"✅ {resultado['importadas']} transações importadas ({resultado['formato'].upper()})")
+    print(f"📄 Linhas lidas: {resultado['lidas']}")
+    print(f"🔁 Já existentes (ignoradas): {resultado['duplicadas']}")
+    if resultado['erros']:
+        print(f"⚠️  Linhas com erro: {resultado['erros']}")
+        for erro in resultado['detalhes_erros']:
+            print(f"   linha {erro['linha']}: {erro['erro']}")
+
+except Exception as e:
+    print(f"❌ Erro: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+finally:
+    db.close()
@@ -0,0 +1,53 @@
+"""
+Script para reconstruir e verificar o ledger de saldos diários
+Uso:
+    python reconstruir_ledger.py           -> reconstrói do zero a partir das transações
+    python reconstruir_ledger.py --check   -> apenas verifica consistência
+"""
+import sys
+from pathlib import Path
+
+# Configurar encoding UTF-8 para Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import SessionLocal, init_db
+from core.balance_ledger import BalanceLedger
+
+init_db()
+db = SessionLocal()
+
+try:
+    ledger = BalanceLedger(db)
+    
+    if '--check' not in sys.argv:
+        print("🔄 Reconstruindo ledger de saldos...")
+        dias = ledger.rebuild()
+        print(f"✅ {dias} dias reconstruídos")
+        print()
+    
+    print("🔍 Verificando consistência...")
+    resultado = ledger.check()
+    
+    if resultado['ok']:
+        print(f"✅ Ledger consistente ({resultado['days']} dias)")
+        print(f"💰 Saldo atual: R$ {ledger.get_balance():,.2f}")
+    else:
+        print(f"❌ {len(resultado['divergences'])} dias divergentes:")
+        for d in resultado['divergences'][:20]:
+            print(f"   {d['date']}: saldo {d['balance']} (esperado {d['expected_balance']:.2f})")
+        print()
+        print("💡 Execute sem --check para reconstruir.")
+        sys.exit(1)
+
+except Exception as e:
+    print(f"❌ Erro: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+finally:
+    db.close()
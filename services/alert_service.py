@@ -1,59 +1,254 @@
 """
 Serviço de alertas baseado no Método Breno
 Alertas para performance negativa, gastos diários, saldo baixo, etc.
+
+As regras são declaradas em AlertService.REGRAS e avaliadas sobre um único
+AlertSnapshot (status, projeção e diários lidos uma vez por verificação).
+Alertas já enviados ficam registrados em SQLite por impressão digital até expirar.
 """
-from datetime import datetime
+import os
+import time
+import sqlite3
+from pathlib import Path
+from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from services.google_sheets_breno import GoogleSheetsBreno
 
+DEFAULT_ALERTS_PATH = Path(__file__).parent.parent / 'data' / 'alerts.db'
+
+
+class AlertFingerprintStore:
+    """Registro persistente dos alertas enviados (impressão digital + expiração)"""
+    
+    def __init__(self, db_path: str = None):
+        """
+        Args:
+            db_path: Arquivo SQLite do registro
+        """
+        self.db_path = str(db_path or os.getenv('ALERTS_DB_PATH', DEFAULT_ALERTS_PATH))
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+    
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sent_alerts (
+                    fingerprint TEXT PRIMARY KEY,
+                    sent_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+        finally:
+            conn.close()
+    
+    def filtrar_novos(self, alertas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Retorna os alertas ainda não enviados (ou cujo envio já expirou)"""
+        if not alertas:
+            return []
+        
+        fingerprints = [a['fingerprint'] for a in alertas]
+        placeholders = ','.join('?' * len(fingerprints))
+        conn = self._connect()
+        try:
+            enviados = {row[0] for row in conn.execute(
+                f"SELECT fingerprint FROM sent_alerts WHERE expires_at > ? AND fingerprint IN ({placeholders})",
+                (time.time(), *fingerprints)
+            )}
+        finally:
+            conn.close()
+        return [a for a in alertas if a['fingerprint'] not in enviados]
+    
+    def marcar_enviados(self, alertas: List[Dict[str, Any]]):
+        """Registra alertas enviados e remove registros expirados"""
+        agora = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO sent_alerts (fingerprint, sent_at, expires_at) VALUES (?, ?, ?)",
+                [(a['fingerprint'], agora, agora + a.get('expira_horas', 24) * 3600) for a in alertas]
+            )
+            conn.execute("DELETE FROM sent_alerts WHERE expires_at <= ?", (agora,))
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+class AlertSnapshot:
+    """
+    Dados de uma verificação de alertas, carregados sob demanda e uma única vez
+    
+    Todas as regras leem daqui; os blocos mensais ficam em memória (ou no espelho local)
+    no serviço de planilha, então status, projeção e diários custam no máximo uma leitura.
+    """
+    
+    def __init__(self, sheets_service: GoogleSheetsBreno, status: Dict[str, Any] = None,
+                 meses_projecao: int = 6):
+        """
+        Args:
+            sheets_service: Serviço da planilha
+            status: Status já obtido (evita nova leitura)
+            meses_projecao: Meses futuros considerados pelas regras de projeção
+        """
+        self.sheets_service = sheets_service
+        self.agora = datetime.now()
+        self.meses_projecao = meses_projecao
+        self._status = status
+        self._projecao = None
+        self._diarios = None
+    
+    @property
+    def status(self) -> Dict[str, Any]:
+        if self._status is None:
+            self._status = self.sheets_service.obter_status_atual()
+        return self._status
+    
+    @property
+    def projecao(self) -> Dict[str, Any]:
+        if self._projecao is None:
+            self._projecao = self.sheets_service.calcular_projecao_futura(self.meses_projecao)
+        return self._projecao
+    
+    def diarios_recentes(self, dias: int = 14) -> List[tuple]:
+        """
+        Diários dos últimos `dias` dias completos (sem hoje), do mais antigo ao mais recente
+        
+        Returns:
+            Lista de (data, valor); dias de outro ano (fora da planilha) não entram
+        """
+        if self._diarios is None or len(self._diarios) < dias:
+            hoje = self.agora.date()
+            datas = [hoje - timedelta(days=i) for i in range(dias, 0, -1)]
+            datas = [d for d in datas if d.year == hoje.year]
+            
+            service = self.sheets_service
+            service._load_month_blocks(sorted({d.month for d in datas}))
+            self._diarios = [
+                (d, service._parse_currency(service._get_cell_value(
+                    service._get_day_row(d.day), service._get_month_column_offset(d.month) + 3
+                )))
+                for d in datas
+            ]
+        return self._diarios[-dias:]
+
 
 class AlertService:
     """Gerencia alertas e notificações financeiras"""
     
-    def __init__(self, sheets_service: GoogleSheetsBreno):
+    # Regras avaliadas a cada verificação: (método, horas até o mesmo alerta poder ser reenviado)
+    REGRAS = [
+        ('_verificar_performance_negativa', 24),
+        ('_verificar_gasto_diario', 12),
+        ('_verificar_saldo_baixo', 24),
+        ('_verificar_meta_economia', 24),
+        ('_verificar_saldo_projetado_negativo', 72),
+        ('_verificar_tendencia_semanal', 24 * 7),
+        ('_verificar_pico_parcelas', 24 * 7),
+    ]
+    
+    # Regras que dependem só do status e mudam a cada registro (avaliadas em alertas_do_registro)
+    REGRAS_REGISTRO = (
+        '_verificar_performance_negativa',
+        '_verificar_gasto_diario',
+        '_verificar_saldo_baixo',
+    )
+    
+    VALOR_PREVISTO_DIARIO = 50.0   # Diário previsto padrão da planilha
+    LIMIAR_TENDENCIA = 0.20        # Última semana 20% acima da anterior
+    LIMIAR_PICO = 0.20             # Saídas do mês 20% acima do mês anterior
+    PICO_MINIMO = 200.0            # Aumento mínimo (R$) para alertar pico de saídas
+    
+    def __init__(self, sheets_service: GoogleSheetsBreno, store: AlertFingerprintStore = None):
         self.sheets_service = sheets_service
-        self.alertas_enviados = set()  # Para evitar spam
+        self._store = store  # Registro de alertas enviados, para evitar spam
     
-    def verificar_alertas(self) -> List[Dict[str, Any]]:
+    @property
+    def store(self) -> AlertFingerprintStore:
+        if self._store is None:
+            self._store = AlertFingerprintStore()
+        return self._store
+    
+    def verificar_alertas(self, status: Dict[str, Any] = None,
+                          regras: Optional[tuple] = None) -> List[Dict[str, Any]]:
         """
         Verifica todos os alertas possíveis e retorna lista de alertas ativos
         
+        Args:
+            status: Status já obtido com obter_status_atual (opcional)
+            regras: Avaliar apenas estas regras (nomes dos métodos em REGRAS)
+        
         Returns:
-            Lista de alertas com tipo, mensagem e prioridade
+            Lista de alertas com tipo, mensagem, prioridade e fingerprint
         """
-        alertas = []
+        snapshot = AlertSnapshot(self.sheets_service, status)
         
-        # Obter status atual
-        status = self.sheets_service.obter_status_atual()
+        # Sem status confiável, regras de saldo gerariam alertas falsos (saldo 0)
+        if snapshot.status.get('erro'):
+            return []
         
-        # 1. Alerta de performance negativa (sem economia)
-        alerta_perf = self._verificar_performance_negativa(status)
-        if alerta_perf:
-            alertas.append(alerta_perf)
+        alertas = []
+        for nome, expira_horas in self.REGRAS:
+            if regras is not None and nome not in regras:
+                continue
+            try:
+                alerta = getattr(self, nome)(snapshot)
+            except Exception as e:
+                print(f"Erro na regra de alerta {nome}: {e}")
+                continue
+            if alerta:
+                alerta.setdefault('fingerprint', f"{alerta['tipo']}:{snapshot.agora.strftime('%Y-%m-%d')}")
+                alerta['expira_horas'] = expira_horas
+                alertas.append(alerta)
         
-        # 2. Alerta de gasto diário próximo do limite (80%)
-        alerta_gasto = self._verificar_gasto_diario(status)
-        if alerta_gasto:
-            alertas.append(alerta_gasto)
+        return alertas
+    
+    def alertas_pendentes(self, status: Dict[str, Any] = None,
+                          prioridades: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Alertas ativos que ainda não foram enviados
+        Após enviar, registre com marcar_enviados para não repetir até expirar.
+        """
+        alertas = self.verificar_alertas(status)
+        if prioridades is not None:
+            alertas = [a for a in alertas if a.get('prioridade') in prioridades]
+        return self.store.filtrar_novos(alertas)
+    
+    def marcar_enviados(self, alertas: List[Dict[str, Any]]):
+        """Registra alertas como enviados"""
+        if alertas:
+            self.store.marcar_enviados(alertas)
+    
+    def alertas_do_registro(self, status_estimado: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Alertas disparados por um registro, para ir na mesma resposta
         
-        # 3. Alerta de saldo baixo
-        alerta_saldo = self._verificar_saldo_baixo(status)
-        if alerta_saldo:
-            alertas.append(alerta_saldo)
+        Reavalia só as regras afetadas pelo registro sobre o status estimado pela fila
+        de escrita (status anterior + delta), sem ler a planilha. Os alertas retornados
+        são marcados como enviados, então a verificação periódica não os repete.
         
-        # 4. Alerta de meta de economia
-        alerta_meta = self._verificar_meta_economia(status)
-        if alerta_meta:
-            alertas.append(alerta_meta)
+        Args:
+            status_estimado: 'status_estimado' retornado por SheetsWriteQueue.registrar_*
+        """
+        if not status_estimado:
+            return []
         
+        alertas = self.store.filtrar_novos(self.verificar_alertas(status_estimado, self.REGRAS_REGISTRO))
+        self.marcar_enviados(alertas)
         return alertas
     
-    def _verificar_performance_negativa(self, status: Dict) -> Optional[Dict]:
+    def _verificar_performance_negativa(self, snapshot: AlertSnapshot) -> Optional[Dict]:
         """
         Verifica se performance está negativa
         Baseado no e-book: performance negativa é problema se não está economizando
         """
-        performance = status.get('performance', 0)
+        performance = snapshot.status.get('performance', 0)
         
         if performance < 0:
             # Performance negativa - alertar
@@ -72,10 +267,10 @@ class AlertService:
             }
         return None
     
-    def _verificar_gasto_diario(self, status: Dict) -> Optional[Dict]:
+    def _verificar_gasto_diario(self, snapshot: AlertSnapshot) -> Optional[Dict]:
         """Verifica se gasto diário está próximo ou acima do limite"""
-        gasto_diario = status.get('gasto_diario', 0)
-        limite_diario = status.get('limite_diario', 0)
+        gasto_diario = snapshot.status.get('gasto_diario', 0)
+        limite_diario = snapshot.status.get('limite_diario', 0)
         
         if limite_diario > 0:
             percentual = (gasto_diario / limite_diario) * 100
@@ -110,9 +305,9 @@ class AlertService:
         
         return None
     
-    def _verificar_saldo_baixo(self, status: Dict) -> Optional[Dict]:
+    def _verificar_saldo_baixo(self, snapshot: AlertSnapshot) -> Optional[Dict]:
         """Verifica se saldo está baixo"""
-        saldo = status.get('saldo', 0)
+        saldo = snapshot.status.get('saldo', 0)
         
         # Considerar saldo baixo se estiver abaixo de R$ 500
         if saldo < 500 and saldo >= 0:
@@ -142,12 +337,99 @@ class AlertService:
         
         return None
     
-    def _verificar_meta_economia(self, status: Dict) -> Optional[Dict]:
+    def _verificar_meta_economia(self, snapshot: AlertSnapshot) -> Optional[Dict]:
         """Verifica progresso da meta de economia mensal"""
         # Esta função pode ser expandida quando implementarmos sistema de metas
         # Por enquanto, apenas verifica se há meta configurada
         return None
     
+    def _verificar_saldo_projetado_negativo(self, snapshot: AlertSnapshot) -> Optional[Dict]:
+        """Verifica se a projeção dos próximos meses indica saldo negativo"""
+        projecao = snapshot.projecao
+        if not projecao.get('sucesso'):
+            return None
+        
+        negativos = [p for p in projecao.get('projecoes', []) if p['saldo_final'] < 0]
+        if not negativos:
+            return None
+        
+        primeiro = negativos[0]
+        pior = min(negativos, key=lambda p: p['saldo_final'])
+        return {
+            'tipo': 'saldo_projetado_negativo',
+            'prioridade': 'alta' if pior['saldo_final'] < -1000 else 'media',
+            'titulo': '🔮 Saldo Projetado Negativo',
+            'mensagem': (
+                f"📉 A projeção indica saldo negativo a partir de "
+                f"{primeiro['nome_mes']}/{primeiro['ano']}: {self._format_currency(primeiro['saldo_final'])}\n"
+                f"🔻 Pior mês: {pior['nome_mes']}/{pior['ano']} ({self._format_currency(pior['saldo_final'])})\n\n"
+                f"💡 Revise entradas e saídas previstas.\n"
+                f"📊 Use `/projecao` para ver todos os meses."
+            ),
+            'emoji': '🔮',
+            'fingerprint': f"saldo_projetado_negativo:{primeiro['ano']}-{primeiro['mes']:02d}"
+        }
+    
+    def _verificar_tendencia_semanal(self, snapshot: AlertSnapshot) -> Optional[Dict]:
+        """Verifica se os gastos diários da última semana subiram em relação à anterior"""
+        diarios = snapshot.diarios_recentes(14)
+        if len(diarios) < 14:
+            return None
+        
+        semana_anterior = sum(valor for _, valor in diarios[:7])
+        ultima_semana = sum(valor for _, valor in diarios[7:])
+        previsto = self.VALOR_PREVISTO_DIARIO * 7
+        
+        if ultima_semana <= previsto or ultima_semana <= semana_anterior * (1 + self.LIMIAR_TENDENCIA):
+            return None
+        
+        aumento = (ultima_semana / semana_anterior - 1) * 100 if semana_anterior > 0 else 100.0
+        inicio = diarios[7][0]
+        return {
+            'tipo': 'tendencia_gasto_semanal',
+            'prioridade': 'media',
+            'titulo': '📈 Gastos da Semana em Alta',
+            'mensagem': (
+                f"📅 Últimos 7 dias: {self._format_currency(ultima_semana)}\n"
+                f"📅 7 dias anteriores: {self._format_currency(semana_anterior)}\n"
+                f"📊 Aumento: {aumento:.0f}% (previsto: {self._format_currency(previsto)})\n\n"
+                f"💡 Segure os gastos diários nos próximos dias."
+            ),
+            'emoji': '📈',
+            'fingerprint': f"tendencia_gasto_semanal:{inicio.isoformat()}"
+        }
+    
+    def _verificar_pico_parcelas(self, snapshot: AlertSnapshot) -> Optional[Dict]:
+        """
+        Verifica se as saídas previstas (parcelas e contas fixas) saltam em algum mês futuro
+        Compara cada mês projetado com o mês anterior, começando pelo mês atual
+        """
+        projecao = snapshot.projecao
+        if not projecao.get('sucesso'):
+            return None
+        
+        anterior = snapshot.status.get('saida', 0)
+        for p in projecao.get('projecoes', []):
+            saida = p['saida_prevista']
+            aumento = saida - anterior
+            if aumento >= self.PICO_MINIMO and saida > anterior * (1 + self.LIMIAR_PICO):
+                return {
+                    'tipo': 'pico_parcelas',
+                    'prioridade': 'media',
+                    'titulo': '📆 Pico de Saídas Previsto',
+                    'mensagem': (
+                        f"💳 As saídas previstas para {p['nome_mes']}/{p['ano']} somam "
+                        f"{self._format_currency(saida)}\n"
+                        f"🔺 {self._format_currency(aumento)} a mais que o mês anterior\n\n"
+                        f"💡 Confira parcelas e contas fixas desse mês e reserve o valor com antecedência."
+                    ),
+                    'emoji': '📆',
+                    'fingerprint': f"pico_parcelas:{p['ano']}-{p['mes']:02d}"
+                }
+            anterior = saida
+        
+        return None
+    
     def _format_currency(self, value: float) -> str:
         """Formata valor como moeda brasileira"""
         return f"R$ {value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
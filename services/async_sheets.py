@@ -0,0 +1,60 @@
+"""
+Acesso assíncrono ao Google Sheets
+Executa as chamadas bloqueantes do gspread em um pool de threads limitado, com timeout por chamada
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class SheetsTimeoutError(TimeoutError):
+    """Chamada ao Google Sheets excedeu o tempo limite"""
+
+
+class AsyncSheetsExecutor:
+    """Roda funções síncronas (GoogleSheetsBreno, serviços) fora do event loop"""
+    
+    def __init__(self, max_workers: int = None, timeout: float = None):
+        """
+        Args:
+            max_workers: Máximo de chamadas simultâneas à planilha
+            timeout: Segundos que uma chamada pode levar antes de falhar
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv('SHEETS_MAX_WORKERS', '4'))
+        if timeout is None:
+            timeout = float(os.getenv('SHEETS_CALL_TIMEOUT', '20'))
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Cria o pool de threads na primeira chamada"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sheets')
+        return self._executor
+    
+    async def run(self, func: Callable[..., Any], *args, timeout: float = None) -> Any:
+        """
+        Executa func(*args) no pool e aguarda sem bloquear o event loop
+        
+        A thread não é interrompida em caso de timeout (gspread não é cancelável),
+        mas a requisição é liberada imediatamente.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), func, *args)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise SheetsTimeoutError(f"Google Sheets não respondeu em {timeout or self.timeout:g}s")
+    
+    def shutdown(self):
+        """Encerra o pool de threads (sem esperar chamadas pendentes)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Executor único do processo da API
+sheets_executor = AsyncSheetsExecutor()
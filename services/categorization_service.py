@@ -1,8 +1,77 @@
 """
 Serviço de categorização de gastos baseado em palavras-chave
+
+As palavras adicionadas pelo usuário ficam no banco (category_keywords), com uma versão
+por categoria (category_versions). A expressão compilada é compartilhada por todas as
+instâncias do processo e só é refeita quando a versão de alguma categoria muda.
 """
-from typing import Dict, List, Optional
+import os
 import re
+import time
+import threading
+from typing import Dict, List, Optional, Iterable, Tuple, Callable
+from sqlalchemy.orm import Session
+from services.category_classifier import prever_categoria, prever_categorias
+
+# Segundos entre verificações de versão do dicionário no banco (alterações de outros processos)
+KEYWORDS_CHECK_INTERVAL = float(os.getenv('KEYWORDS_CHECK_INTERVAL', '30'))
+
+
+class CompiledKeywords:
+    """Dicionário compilado em uma única expressão regular (imutável, compartilhado)"""
+    
+    def __init__(self, palavras_por_categoria: Dict[str, Tuple[str, ...]]):
+        """
+        Compila todas as palavras-chave em uma única expressão regular
+        
+        Palavras mais longas vêm primeiro na alternância, então em uma mesma posição
+        vence o termo mais específico ('uber eats' antes de 'uber'). As bordas exigem
+        palavra inteira: 'oi' não casa dentro de 'biscoito'.
+        
+        Args:
+            palavras_por_categoria: Palavras de cada categoria, na ordem de prioridade
+        """
+        self.palavras_categorias: Dict[str, List[str]] = {}
+        for categoria, palavras in palavras_por_categoria.items():
+            for palavra in palavras:
+                categorias = self.palavras_categorias.setdefault(palavra, [])
+                if categoria not in categorias:
+                    categorias.append(categoria)
+        
+        # Prioridade de desempate: ordem de declaração das categorias
+        self.prioridade = {categoria: i for i, categoria in enumerate(palavras_por_categoria)}
+        
+        if self.palavras_categorias:
+            alternativas = sorted(self.palavras_categorias, key=lambda p: (-len(p), p))
+            pattern = '|'.join(re.escape(p) for p in alternativas)
+            self.matcher = re.compile(rf'(?<!\w)(?:{pattern})(?!\w)', re.IGNORECASE)
+        else:
+            self.matcher = None
+
+
+# Estado compartilhado pelo processo: palavras do usuário por categoria e versões já carregadas
+_lock = threading.Lock()
+_user_keywords: Dict[str, Tuple[str, ...]] = {}
+_versions: Optional[Dict[str, int]] = None
+_checked_at = 0.0
+_compiled: Optional[CompiledKeywords] = None
+
+
+def _default_session_factory() -> Session:
+    from app.database import SessionLocal
+    return SessionLocal()
+
+
+def _ensure_tables(session_factory: Callable[[], Session]):
+    """Cria as tabelas do dicionário (bot e scripts não chamam init_db)"""
+    from core.models_sqlalchemy import CategoryKeyword, CategoryVersion
+    db = session_factory()
+    try:
+        bind = db.get_bind()
+        CategoryKeyword.__table__.create(bind=bind, checkfirst=True)
+        CategoryVersion.__table__.create(bind=bind, checkfirst=True)
+    finally:
+        db.close()
 
 
 class CategorizationService:
@@ -41,40 +110,169 @@ class CategorizationService:
         'Serviços': [
             'internet', 'net', 'vivo', 'claro', 'oi', 'tim', 'telefone',
             'celular', 'energia', 'luz', 'água', 'gás', 'condomínio',
-            'aluguel', 'iptu', 'iptu', 'seguro', 'banco', 'tarifa'
+            'aluguel', 'iptu', 'seguro', 'banco', 'tarifa'
         ],
         'Outros': []  # Categoria padrão
     }
     
-    def __init__(self):
-        """Inicializa o serviço de categorização"""
-        # Criar regex patterns para cada categoria
-        self.patterns = {}
-        for categoria, palavras in self.CATEGORIES.items():
-            if palavras:
-                # Criar pattern case-insensitive
-                pattern = '|'.join([re.escape(p) for p in palavras])
-                self.patterns[categoria] = re.compile(pattern, re.IGNORECASE)
+    def __init__(self, session_factory: Callable[[], Session] = None):
+        """
+        Inicializa o serviço de categorização
+        Não acessa o banco: o dicionário é carregado no primeiro uso (_sincronizar).
+        
+        Args:
+            session_factory: Cria sessões do banco do dicionário (padrão: SessionLocal)
+        """
+        self.session_factory = session_factory or _default_session_factory
+    
+    def _sincronizar(self, force: bool = False) -> CompiledKeywords:
+        """
+        Retorna o dicionário compilado, recarregando do banco o que mudou
+        
+        Uma consulta às versões por categoria (no máximo a cada KEYWORDS_CHECK_INTERVAL);
+        só as categorias com versão diferente têm as palavras relidas, e a expressão
+        só é recompilada quando algo mudou.
+        """
+        global _versions, _checked_at, _compiled
+        with _lock:
+            if not force and _compiled is not None and time.monotonic() - _checked_at < KEYWORDS_CHECK_INTERVAL:
+                return _compiled
+            
+            try:
+                versoes = self._carregar_versoes()
+                alteradas = [
+                    categoria for categoria in set(versoes) | set(_versions or {})
+                    if versoes.get(categoria) != (_versions or {}).get(categoria)
+                ]
+                if alteradas:
+                    palavras = self._carregar_palavras(alteradas)
+                    for categoria in alteradas:
+                        _user_keywords[categoria] = tuple(palavras.get(categoria, ()))
+                _versions = versoes
+            except Exception as e:
+                print(f"Erro ao carregar palavras-chave do banco (usando as já carregadas): {e}")
+                alteradas = []
+            
+            _checked_at = time.monotonic()
+            if _compiled is None or alteradas:
+                _compiled = CompiledKeywords(self._palavras_por_categoria())
+            return _compiled
+    
+    def _carregar_versoes(self) -> Dict[str, int]:
+        from core.models_sqlalchemy import CategoryVersion
+        db = self.session_factory()
+        try:
+            try:
+                return dict(db.query(CategoryVersion.category, CategoryVersion.version).all())
+            except Exception:
+                db.rollback()
+                _ensure_tables(self.session_factory)
+                return dict(db.query(CategoryVersion.category, CategoryVersion.version).all())
+        finally:
+            db.close()
+    
+    def _carregar_palavras(self, categorias: List[str]) -> Dict[str, List[str]]:
+        from core.models_sqlalchemy import CategoryKeyword
+        db = self.session_factory()
+        try:
+            rows = db.query(CategoryKeyword.category, CategoryKeyword.keyword).filter(
+                CategoryKeyword.category.in_(categorias)
+            ).order_by(CategoryKeyword.id).all()
+        finally:
+            db.close()
+        
+        palavras: Dict[str, List[str]] = {}
+        for categoria, palavra in rows:
+            palavras.setdefault(categoria, []).append(palavra)
+        return palavras
+    
+    def _palavras_por_categoria(self) -> Dict[str, Tuple[str, ...]]:
+        """Palavras padrão (CATEGORIES) somadas às do usuário, por categoria"""
+        return {
+            categoria: tuple(p.lower() for p in palavras) + _user_keywords.get(categoria, ())
+            for categoria, palavras in self.CATEGORIES.items()
+        }
+    
+    @property
+    def palavras_categorias(self) -> Dict[str, List[str]]:
+        return self._sincronizar().palavras_categorias
+    
+    def encontrar_palavras(self, descricao: str) -> List[Tuple[str, List[str]]]:
+        """
+        Todas as palavras-chave encontradas na descrição, em uma única varredura
+        
+        Returns:
+            Lista de (palavra, categorias da palavra) na ordem em que aparecem
+        """
+        compilado = self._sincronizar()
+        if compilado.matcher is None:
+            return []
+        return [
+            (palavra, compilado.palavras_categorias[palavra])
+            for palavra in (m.group(0).lower() for m in compilado.matcher.finditer(descricao.strip()))
+        ]
     
     def categorizar(self, descricao: str) -> str:
         """
         Categoriza uma descrição de gasto
         
+        Com várias palavras encontradas vence a categoria com a palavra mais longa;
+        empate vai para a que teve mais palavras e depois para a ordem de CATEGORIES
+        ('viagem' fica em Transporte, declarado antes de Lazer). Sem palavra-chave,
+        usa o classificador treinado com as transações (se houver modelo salvo).
+        
         Args:
             descricao: Descrição do gasto
             
         Returns:
             Nome da categoria
         """
-        descricao_lower = descricao.lower().strip()
+        categoria = self._categorizar_por_palavras(descricao)
+        if categoria is None:
+            # Se não encontrou, tentar o modelo; sem modelo, retornar "Outros"
+            return prever_categoria(descricao)
+        return categoria
+    
+    def _categorizar_por_palavras(self, descricao: str) -> Optional[str]:
+        """Categoria pelas palavras-chave (None se nenhuma palavra foi encontrada)"""
+        prioridade = self._sincronizar().prioridade
+        pontuacao: Dict[str, Tuple[int, int]] = {}
+        for palavra, categorias in self.encontrar_palavras(descricao):
+            for categoria in categorias:
+                maior, quantidade = pontuacao.get(categoria, (0, 0))
+                pontuacao[categoria] = (max(maior, len(palavra)), quantidade + 1)
+        
+        if not pontuacao:
+            return None
+        
+        return max(
+            pontuacao,
+            key=lambda c: (pontuacao[c][0], pontuacao[c][1], -prioridade.get(c, len(prioridade)))
+        )
+    
+    def categorizar_many(self, descricoes: Iterable[str]) -> List[str]:
+        """
+        Categoriza várias descrições (importações em lote)
+        Descrições repetidas são categorizadas uma única vez, e as que não têm
+        palavra-chave vão para o classificador em uma única previsão em lote.
         
-        # Verificar cada categoria
-        for categoria, pattern in self.patterns.items():
-            if pattern.search(descricao_lower):
-                return categoria
+        Args:
+            descricoes: Descrições dos gastos
+            
+        Returns:
+            Categorias na mesma ordem das descrições
+        """
+        chaves = [descricao.strip().lower() for descricao in descricoes]
+        
+        cache: Dict[str, Optional[str]] = {}
+        for chave in chaves:
+            if chave not in cache:
+                cache[chave] = self._categorizar_por_palavras(chave)
+        
+        sem_palavra = [chave for chave, categoria in cache.items() if categoria is None]
+        cache.update(zip(sem_palavra, prever_categorias(sem_palavra)))
         
-        # Se não encontrou, retornar "Outros"
-        return 'Outros'
+        return [cache[chave] for chave in chaves]
     
     def listar_categorias(self) -> List[str]:
         """Retorna lista de todas as categorias"""
@@ -84,6 +282,9 @@ class CategorizationService:
         """
         Adiciona uma nova palavra-chave para uma categoria
         
+        A palavra é gravada no banco e a versão da categoria incrementada; as demais
+        instâncias e processos recarregam só essa categoria na próxima verificação.
+        
         Args:
             categoria: Nome da categoria
             palavra: Palavra-chave a adicionar
@@ -94,12 +295,33 @@ class CategorizationService:
         if categoria not in self.CATEGORIES:
             return False
         
-        if palavra.lower() not in [p.lower() for p in self.CATEGORIES[categoria]]:
-            self.CATEGORIES[categoria].append(palavra.lower())
-            # Recriar pattern
-            pattern = '|'.join([re.escape(p) for p in self.CATEGORIES[categoria]])
-            self.patterns[categoria] = re.compile(pattern, re.IGNORECASE)
+        palavra = palavra.lower().strip()
+        if palavra in self._palavras_por_categoria()[categoria]:
+            return True
+        
+        from core.models_sqlalchemy import CategoryKeyword, CategoryVersion
+        db = self.session_factory()
+        try:
+            existe = db.query(CategoryKeyword.id).filter(
+                CategoryKeyword.category == categoria,
+                CategoryKeyword.keyword == palavra
+            ).first()
+            if not existe:
+                db.add(CategoryKeyword(category=categoria, keyword=palavra))
+                versao = db.query(CategoryVersion).filter(CategoryVersion.category == categoria).first()
+                if versao is None:
+                    db.add(CategoryVersion(category=categoria, version=1))
+                else:
+                    versao.version = CategoryVersion.version + 1
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Erro ao salvar palavra-chave: {e}")
+            return False
+        finally:
+            db.close()
         
+        self._sincronizar(force=True)
         return True
     
     def obter_estatisticas_categoria(self, transacoes: List[Dict]) -> Dict[str, float]:
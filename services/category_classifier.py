@@ -0,0 +1,242 @@
+"""
+Classificador de categorias aprendido das transações (NumPy, só CPU)
+N-gramas de caracteres com hashing + regressão logística multinomial.
+Treinado offline (treinar_categorias.py), salvo em disco e carregado sob demanda;
+usado quando nenhuma palavra-chave encontra a categoria.
+"""
+import os
+import zlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+
+DEFAULT_MODEL_PATH = Path(os.getenv('CATEGORY_MODEL_PATH', Path(__file__).parent.parent / 'data' / 'category_model.npz'))
+
+# Confiança mínima para aceitar a previsão (abaixo disso fica 'Outros')
+MIN_CONFIDENCE = float(os.getenv('CATEGORY_MODEL_MIN_CONFIDENCE', '0.5'))
+
+
+def _ngramas(texto: str, ngram_min: int, ngram_max: int) -> List[str]:
+    """N-gramas de caracteres do texto normalizado (com bordas de palavra)"""
+    texto = f" {' '.join(texto.lower().split())} "
+    return [
+        texto[i:i + n]
+        for n in range(ngram_min, ngram_max + 1)
+        for i in range(len(texto) - n + 1)
+    ]
+
+
+class CategoryClassifier:
+    """Regressão logística sobre n-gramas de caracteres com hashing"""
+    
+    def __init__(self, n_features: int = 2 ** 16, ngram_range: Tuple[int, int] = (2, 4)):
+        """
+        Args:
+            n_features: Tamanho do espaço de hashing
+            ngram_range: Tamanhos mínimo e máximo dos n-gramas
+        """
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.classes: List[str] = []
+        self.weights: Optional[np.ndarray] = None  # n_features x classes
+        self.bias: Optional[np.ndarray] = None
+    
+    def _indices(self, texto: str) -> np.ndarray:
+        """Índices (sem repetição) dos n-gramas no espaço de hashing"""
+        gramas = _ngramas(texto, *self.ngram_range)
+        hashes = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in gramas), dtype=np.uint32, count=len(gramas))
+        return np.unique(hashes % self.n_features)
+    
+    def _features(self, textos: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Representação esparsa de vários textos
+        
+        Returns:
+            (índices concatenados, peso de cada índice, início de cada texto)
+            Cada texto tem norma L2 igual a 1.
+        """
+        indices = [self._indices(t) for t in textos]
+        tamanhos = np.array([len(i) for i in indices])
+        inicios = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+        pesos = np.repeat(1.0 / np.sqrt(tamanhos), tamanhos)
+        return np.concatenate(indices), pesos, inicios
+    
+    def _logits(self, indices: np.ndarray, pesos: np.ndarray, inicios: np.ndarray) -> np.ndarray:
+        contrib = self.weights[indices] * pesos[:, None]
+        return np.add.reduceat(contrib, inicios, axis=0) + self.bias
+    
+    def fit(self, descricoes: List[str], categorias: List[str], epochs: int = 150,
+            learning_rate: float = 0.1, l2: float = 1e-4) -> 'CategoryClassifier':
+        """
+        Treina com gradiente completo (Adam) sobre todas as amostras
+        
+        Args:
+            descricoes: Descrições das transações
+            categorias: Categoria de cada descrição
+            epochs: Passos de otimização
+            learning_rate: Taxa de aprendizado
+            l2: Regularização dos pesos
+        """
+        self.classes = sorted(set(categorias))
+        if len(self.classes) < 2:
+            raise ValueError("São necessárias ao menos 2 categorias para treinar")
+        
+        posicao = {c: i for i, c in enumerate(self.classes)}
+        y = np.array([posicao[c] for c in categorias])
+        n, k = len(y), len(self.classes)
+        alvo = np.zeros((n, k))
+        alvo[np.arange(n), y] = 1.0
+        
+        indices, pesos, inicios = self._features(descricoes)
+        linhas = np.repeat(np.arange(n), np.diff(np.append(inicios, len(indices))))
+        
+        self.weights = np.zeros((self.n_features, k))
+        self.bias = np.zeros(k)
+        params = [self.weights, self.bias]
+        m = [np.zeros_like(p) for p in params]
+        v = [np.zeros_like(p) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        
+        for step in range(1, epochs + 1):
+            logits = self._logits(indices, pesos, inicios)
+            logits -= logits.max(axis=1, keepdims=True)
+            prob = np.exp(logits)
+            prob /= prob.sum(axis=1, keepdims=True)
+            erro = (prob - alvo) / n
+            
+            grad_w = l2 * self.weights
+            np.add.at(grad_w, indices, erro[linhas] * pesos[:, None])
+            grads = [grad_w, erro.sum(axis=0)]
+            
+            for p, g, m_i, v_i in zip(params, grads, m, v):
+                m_i *= beta1
+                m_i += (1 - beta1) * g
+                v_i *= beta2
+                v_i += (1 - beta2) * g * g
+                p -= learning_rate * (m_i / (1 - beta1 ** step)) / (np.sqrt(v_i / (1 - beta2 ** step)) + eps)
+        
+        return self
+    
+    def predict_proba_many(self, descricoes: List[str]) -> np.ndarray:
+        """Probabilidades (descrições x classes)"""
+        if not descricoes:
+            return np.zeros((0, len(self.classes)))
+        logits = self._logits(*self._features(list(descricoes)))
+        logits -= logits.max(axis=1, keepdims=True)
+        prob = np.exp(logits)
+        return prob / prob.sum(axis=1, keepdims=True)
+    
+    def predict_many(self, descricoes: Iterable[str]) -> List[Tuple[str, float]]:
+        """Categoria prevista e confiança de cada descrição"""
+        prob = self.predict_proba_many(list(descricoes))
+        melhores = prob.argmax(axis=1)
+        return [(self.classes[i], float(prob[j, i])) for j, i in enumerate(melhores)]
+    
+    def predict(self, descricao: str) -> Tuple[str, float]:
+        """Categoria prevista e confiança de uma descrição"""
+        indices = self._indices(descricao)
+        logits = self.weights[indices].sum(axis=0) / np.sqrt(len(indices)) + self.bias
+        prob = np.exp(logits - logits.max())
+        prob /= prob.sum()
+        i = int(prob.argmax())
+        return self.classes[i], float(prob[i])
+    
+    def save(self, path: str = None):
+        """Salva o modelo (arquivo .npz)"""
+        path = Path(path or DEFAULT_MODEL_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + '.tmp.npz')
+        np.savez_compressed(
+            tmp,
+            weights=self.weights.astype(np.float32),
+            bias=self.bias,
+            classes=np.array(self.classes),
+            n_features=self.n_features,
+            ngram_range=np.array(self.ngram_range)
+        )
+        os.replace(tmp, path)  # Troca atômica: processos em execução nunca leem arquivo pela metade
+    
+    @classmethod
+    def load(cls, path: str = None) -> 'CategoryClassifier':
+        """Carrega modelo salvo com save()"""
+        with np.load(str(path or DEFAULT_MODEL_PATH), allow_pickle=False) as dados:
+            modelo = cls(int(dados['n_features']), tuple(int(n) for n in dados['ngram_range']))
+            modelo.weights = dados['weights'].astype(np.float64)
+            modelo.bias = dados['bias']
+            modelo.classes = [str(c) for c in dados['classes']]
+        return modelo
+
+
+def treinar_de_transacoes(db: Session, path: str = None, **kwargs) -> Dict[str, object]:
+    """
+    Treina o classificador com os pares (descrição, categoria) da tabela transactions e salva
+    Transações sem categoria ou em 'Outros' não entram no treino.
+    """
+    from core.models_sqlalchemy import Transaction
+    
+    rows = db.query(Transaction.description, Transaction.category).filter(
+        Transaction.category.isnot(None),
+        Transaction.category != 'Outros',
+        Transaction.description.isnot(None)
+    ).all()
+    descricoes = [d for d, _ in rows]
+    categorias = [c for _, c in rows]
+    
+    modelo = CategoryClassifier().fit(descricoes, categorias, **kwargs)
+    modelo.save(path)
+    
+    previstas = [c for c, _ in modelo.predict_many(descricoes)]
+    acertos = sum(p == c for p, c in zip(previstas, categorias))
+    return {
+        'amostras': len(descricoes),
+        'categorias': modelo.classes,
+        'acuracia_treino': acertos / len(descricoes)
+    }
+
+
+# Modelo carregado sob demanda e recarregado quando o arquivo muda
+_lock = threading.Lock()
+_loaded: Tuple[Optional[float], Optional[CategoryClassifier]] = (None, None)
+
+
+def get_category_classifier(path: str = None) -> Optional[CategoryClassifier]:
+    """Modelo salvo em disco (None se ainda não foi treinado)"""
+    global _loaded
+    path = str(path or DEFAULT_MODEL_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    
+    with _lock:
+        loaded_mtime, modelo = _loaded
+        if modelo is None or loaded_mtime != mtime:
+            try:
+                modelo = CategoryClassifier.load(path)
+            except Exception as e:
+                print(f"Erro ao carregar modelo de categorias: {e}")
+                return None
+            _loaded = (mtime, modelo)
+        return modelo
+
+
+def prever_categorias(descricoes: List[str], padrao: str = 'Outros') -> List[str]:
+    """Categorias previstas pelo modelo; padrao sem modelo ou com confiança baixa"""
+    modelo = get_category_classifier()
+    if modelo is None or not descricoes:
+        return [padrao] * len(descricoes)
+    return [
+        categoria if confianca >= MIN_CONFIDENCE else padrao
+        for categoria, confianca in modelo.predict_many(descricoes)
+    ]
+
+
+def prever_categoria(descricao: str, padrao: str = 'Outros') -> str:
+    """Categoria prevista pelo modelo para uma descrição; padrao sem modelo ou com confiança baixa"""
+    modelo = get_category_classifier()
+    if modelo is None:
+        return padrao
+    categoria, confianca = modelo.predict(descricao)
+    return categoria if confianca >= MIN_CONFIDENCE else padrao
@@ -4,10 +4,13 @@ Estrutura: Data, Entrada, Saída, Diário, Saldo (por mês)
 """
 import os
 import sys
+import time
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
 import re
 
@@ -18,13 +21,14 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 class GoogleSheetsBreno:
     """Integração com Google Sheets - Método Breno"""
     
-    def __init__(self, spreadsheet_id: str, credentials_path: str = None):
+    def __init__(self, spreadsheet_id: str, credentials_path: str = None, mirror=None):
         """
         Inicializa serviço do Google Sheets
         
         Args:
             spreadsheet_id: ID da planilha (da URL)
             credentials_path: Caminho para arquivo de credenciais JSON
+            mirror: SheetsMirror opcional - leituras usam o espelho local quando sincronizado
         """
         self.spreadsheet_id = spreadsheet_id
         self.credentials_path = credentials_path or os.getenv('GOOGLE_CREDENTIALS_PATH')
@@ -36,6 +40,33 @@ class GoogleSheetsBreno:
             raise FileNotFoundError(f"Arquivo de credenciais não encontrado: {self.credentials_path}")
         
         # Autenticar
+        self._connect()
+        
+        # Mapeamento de meses
+        self.month_names = {
+            1: 'JANEIRO', 2: 'FEVEREIRO', 3: 'MARÇO', 4: 'ABRIL',
+            5: 'MAIO', 6: 'JUNHO', 7: 'JULHO', 8: 'AGOSTO',
+            9: 'SETEMBRO', 10: 'OUTUBRO', 11: 'NOVEMBRO', 12: 'DEZEMBRO'
+        }
+        
+        # Cada mês ocupa 6 colunas (Data, Entrada, Saída, Diário, Saldo, vazio)
+        self.cols_per_month = 6
+        
+        # Bloco do mês: linhas 1-2 cabeçalho, 3-33 dias, 37/38 totais
+        self.rows_per_month = 38
+        
+        # Blocos mensais já lidos: {mês: (timestamp, grade de valores)}
+        # Cada bloco é lido em uma única chamada e serve todas as leituras de célula
+        self.block_ttl = float(os.getenv('SHEETS_BLOCK_TTL', '5'))
+        # A instância é compartilhada entre threads (pool da API, espelho): o lock protege o dict e
+        # a geração muda a cada invalidação, descartando leituras iniciadas antes de uma escrita
+        self._month_blocks: Dict[int, tuple] = {}
+        self._blocks_lock = threading.Lock()
+        self._blocks_generation = 0
+        self.mirror = mirror
+    
+    def _connect(self):
+        """Autentica e abre a planilha (também usado para renovar a conexão)"""
         try:
             scope = [
                 'https://spreadsheets.google.com/feeds',
@@ -45,8 +76,12 @@ class GoogleSheetsBreno:
                 self.credentials_path,
                 scopes=scope
             )
+            self.credentials = creds
             self.client = gspread.authorize(creds)
-            self.spreadsheet = self.client.open_by_key(spreadsheet_id)
+            # gspread não tem timeout padrão: sem ele uma chamada travada segura a fila de escrita
+            if hasattr(self.client, 'set_timeout'):
+                self.client.set_timeout(float(os.getenv('SHEETS_HTTP_TIMEOUT', '60')))
+            self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
             self.worksheet = self.spreadsheet.sheet1
         except Exception as e:
             error_msg = str(e)
@@ -60,16 +95,26 @@ class GoogleSheetsBreno:
                     "4. Execute: python test_google_auth.py para diagnóstico"
                 ) from e
             raise
-        
-        # Mapeamento de meses
-        self.month_names = {
-            1: 'JANEIRO', 2: 'FEVEREIRO', 3: 'MARÇO', 4: 'ABRIL',
-            5: 'MAIO', 6: 'JUNHO', 7: 'JULHO', 8: 'AGOSTO',
-            9: 'SETEMBRO', 10: 'OUTUBRO', 11: 'NOVEMBRO', 12: 'DEZEMBRO'
-        }
-        
-        # Cada mês ocupa 6 colunas (Data, Entrada, Saída, Diário, Saldo, vazio)
-        self.cols_per_month = 6
+    
+    def reconnect(self):
+        """Refaz autenticação e descarta dados em memória"""
+        self._connect()
+        self._invalidate_month_blocks()
+    
+    def get_modified_time(self) -> str:
+        """Retorna modifiedTime da planilha no Drive (muda a cada edição)"""
+        if hasattr(self.spreadsheet, 'get_lastUpdateTime'):
+            return self.spreadsheet.get_lastUpdateTime()
+        return self.spreadsheet.lastUpdateTime  # gspread 5.x
+    
+    def health_check(self) -> bool:
+        """Verifica se a conexão com a planilha está respondendo"""
+        try:
+            self.spreadsheet.fetch_sheet_metadata()
+            return True
+        except Exception as e:
+            print(f"Health check da planilha falhou: {e}")
+            return False
     
     def _parse_currency(self, value: str) -> float:
         """Converte string de moeda para float"""
@@ -95,14 +140,134 @@ class GoogleSheetsBreno:
         """Retorna linha do dia (0-indexed, linha 2 = cabeçalho, linha 3+ = dias)"""
         return day + 1  # Linha 2 é cabeçalho, linha 3 é dia 1
     
+    def _get_month_range(self, month: int) -> str:
+        """Retorna range A1 do bloco completo do mês (dias + linha de totais)"""
+        col_offset = self._get_month_column_offset(month)
+        inicio = rowcol_to_a1(1, col_offset + 1)  # gspread é 1-indexed
+        fim = rowcol_to_a1(self.rows_per_month, col_offset + self.cols_per_month)
+        return f"{inicio}:{fim}"
+    
+    def _load_month_blocks(self, months: List[int], fresh: bool = False) -> Dict[int, list]:
+        """
+        Carrega blocos mensais em uma única chamada (batch_get)
+        Meses já carregados e dentro do TTL não são lidos novamente
+        
+        Com espelho local, os meses sincronizados vêm do disco. Use fresh=True antes de
+        ler-modificar-escrever uma célula: lê direto da planilha, ignorando memória e espelho.
+        
+        Returns:
+            Blocos dos meses pedidos (guardados em memória só se nenhuma escrita invalidou
+            os blocos durante a leitura)
+        """
+        now = time.monotonic()
+        resultado = {}
+        pendentes = []
+        with self._blocks_lock:
+            generation = self._blocks_generation
+            for month in months:
+                cached = self._month_blocks.get(month)
+                if not fresh and cached is not None and now - cached[0] <= self.block_ttl:
+                    resultado[month] = cached[1]
+                elif month not in pendentes:
+                    pendentes.append(month)
+        
+        if not pendentes:
+            return resultado
+        
+        if self.mirror is not None and not fresh:
+            try:
+                espelhados = self.mirror.get_months(pendentes)
+            except Exception as e:
+                print(f"Erro ao ler espelho local, lendo da planilha: {e}")
+                espelhados = {}
+            self._store_month_blocks(espelhados, generation, now)
+            resultado.update(espelhados)
+            pendentes = [month for month in pendentes if month not in espelhados]
+            if not pendentes:
+                return resultado
+            mirror_generation = self.mirror.generation()
+        
+        ranges = [self._get_month_range(month) for month in pendentes]
+        blocos = self.worksheet.batch_get(ranges)
+        
+        lidos = {month: [list(linha) for linha in bloco] for month, bloco in zip(pendentes, blocos)}
+        self._store_month_blocks(lidos, generation, now)
+        resultado.update(lidos)
+        
+        if self.mirror is not None and not fresh:
+            # Aproveitar a leitura para completar o espelho
+            self.mirror.store_months(lidos, mirror_generation)
+        return resultado
+    
+    def _store_month_blocks(self, blocos: Dict[int, list], generation: int, now: float) -> bool:
+        """Guarda blocos lidos, exceto se houve invalidação desde que a leitura começou"""
+        with self._blocks_lock:
+            if generation != self._blocks_generation:
+                return False
+            for month, bloco in blocos.items():
+                self._month_blocks[month] = (now, bloco)
+            return True
+    
+    def _load_all_month_blocks(self) -> Dict[int, list]:
+        """
+        Carrega os 12 blocos mensais com uma única leitura da planilha inteira (get_all_values)
+        Usa o espelho local quando todos os meses estão sincronizados
+        """
+        now = time.monotonic()
+        meses = list(range(1, 13))
+        with self._blocks_lock:
+            generation = self._blocks_generation
+        
+        blocos = {}
+        if self.mirror is not None:
+            try:
+                blocos = self.mirror.get_months(meses)
+            except Exception as e:
+                print(f"Erro ao ler espelho local, lendo da planilha: {e}")
+                blocos = {}
+        
+        if len(blocos) < len(meses):
+            valores = self.worksheet.get_all_values()[:self.rows_per_month]
+            blocos = {}
+            for month in meses:
+                col_offset = self._get_month_column_offset(month)
+                blocos[month] = [linha[col_offset:col_offset + self.cols_per_month] for linha in valores]
+        
+        self._store_month_blocks(blocos, generation, now)
+        return blocos
+    
+    def _invalidate_month_blocks(self, month: Optional[int] = None):
+        """Descarta blocos em memória (um mês ou todos) para forçar nova leitura"""
+        with self._blocks_lock:
+            if month is None:
+                self._month_blocks.clear()
+            else:
+                self._month_blocks.pop(month, None)
+            self._blocks_generation += 1
+    
     def _get_cell_value(self, row: int, col: int) -> str:
-        """Obtém valor de uma célula"""
+        """Obtém valor de uma célula a partir do bloco do mês em memória"""
         try:
-            cell = self.worksheet.cell(row + 1, col + 1)  # gspread é 1-indexed
-            return cell.value or ''
+            month = col // self.cols_per_month + 1
+            return self._get_block_value(self._load_month_blocks([month])[month], row, col)
         except:
             return ''
     
+    def _get_block_value(self, bloco: list, row: int, col: int) -> str:
+        """
+        Obtém valor de uma célula dentro de um bloco já lido
+        Ler-modificar-escrever usa o bloco retornado por _load_month_blocks(fresh=True),
+        que pode não ter sido guardado em memória (invalidação durante a leitura).
+        
+        Args:
+            bloco: Bloco do mês da célula
+            row, col: Posição da célula na planilha (0-indexed)
+        """
+        col_bloco = col % self.cols_per_month
+        if row < len(bloco) and col_bloco < len(bloco[row]):
+            return bloco[row][col_bloco] or ''
+        return ''  # Células vazias no fim do range não são retornadas pela API
+    
     def _set_cell_value(self, row: int, col: int, value: Any):
         """
         Define valor de uma célula
@@ -121,14 +286,61 @@ class GoogleSheetsBreno:
             self.worksheet.update_cell(row + 1, col + 1, value)  # gspread é 1-indexed
         except Exception as e:
             print(f"Erro ao atualizar célula ({row}, {col}): {e}")
+        finally:
+            # A planilha recalcula o saldo via fórmulas - descartar o bloco do mês
+            self._discard_written_months([col // self.cols_per_month + 1])
     
-    def _get_current_month_data(self) -> Dict[str, Any]:
-        """Obtém dados do mês atual"""
+    def _set_cell_values(self, cells: List[tuple]):
+        """
+        Define várias células em uma única chamada (batch_update)
+        PROTEÇÃO: NUNCA atualiza a coluna Saldo (col_offset + 4)
+        
+        Args:
+            cells: Tuplas (row, col, valor), 0-indexed como em _set_cell_value
+        """
+        for row, col, _ in cells:
+            if (col % self.cols_per_month) == 4:
+                raise ValueError(
+                    f"PROTEÇÃO: Tentativa de atualizar coluna Saldo bloqueada! "
+                    f"O bot NUNCA atualiza a coluna Saldo - apenas Entrada, Saída e Diário."
+                )
+        
+        if not cells:
+            return
+        
+        data = [
+            {'range': rowcol_to_a1(row + 1, col + 1), 'values': [[value]]}  # gspread é 1-indexed
+            for row, col, value in cells
+        ]
+        try:
+            self.worksheet.batch_update(data, value_input_option='USER_ENTERED')
+        finally:
+            self._discard_written_months(sorted({col // self.cols_per_month + 1 for _, col, _ in cells}))
+    
+    def _discard_written_months(self, months: List[int]):
+        """Descarta blocos em memória e no espelho dos meses que acabaram de ser escritos"""
+        for month in months:
+            self._invalidate_month_blocks(month)
+        if self.mirror is not None:
+            try:
+                self.mirror.discard(months)
+            except Exception as e:
+                print(f"Erro ao descartar meses do espelho local: {e}")
+    
+    def _get_current_month_data(self, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Obtém dados do mês atual
+        
+        Args:
+            fresh: Ler direto da planilha (para ler-modificar-escrever)
+        """
         now = datetime.now()
         month = now.month
         year = now.year
         day = now.day
         
+        bloco = self._load_month_blocks([month], fresh=fresh)[month]
+        
         col_offset = self._get_month_column_offset(month)
         
         # Colunas: Data=0, Entrada=1, Saída=2, Diário=3, Saldo=4
@@ -141,10 +353,10 @@ class GoogleSheetsBreno:
         # Ler dados do dia atual
         row = self._get_day_row(day)
         
-        entrada = self._parse_currency(self._get_cell_value(row, col_entrada))
-        saida = self._parse_currency(self._get_cell_value(row, col_saida))
-        diario = self._parse_currency(self._get_cell_value(row, col_diario))
-        saldo = self._parse_currency(self._get_cell_value(row, col_saldo))
+        entrada = self._parse_currency(self._get_block_value(bloco, row, col_entrada))
+        saida = self._parse_currency(self._get_block_value(bloco, row, col_saida))
+        diario = self._parse_currency(self._get_block_value(bloco, row, col_diario))
+        saldo = self._parse_currency(self._get_block_value(bloco, row, col_saldo))
         
         return {
             'month': month,
@@ -227,7 +439,7 @@ class GoogleSheetsBreno:
         - Se não registrar nada, o bot zera automaticamente ao final do dia
         """
         try:
-            month_data = self._get_current_month_data()
+            month_data = self._get_current_month_data(fresh=True)
             
             # Valor atual do diário
             valor_atual = month_data['diario']
@@ -293,8 +505,9 @@ class GoogleSheetsBreno:
             col_diario = col_offset + 3
             row = self._get_day_row(dia)
             
-            # Ler valor atual do diário
-            valor_atual = self._parse_currency(self._get_cell_value(row, col_diario))
+            # Ler valor atual do diário (direto da planilha, não do espelho)
+            bloco = self._load_month_blocks([mes], fresh=True)[mes]
+            valor_atual = self._parse_currency(self._get_block_value(bloco, row, col_diario))
             
             # Valor previsto padrão (você pode ajustar isso)
             VALOR_PREVISTO_PADRAO = 50.0
@@ -348,7 +561,7 @@ class GoogleSheetsBreno:
     def registrar_entrada(self, valor: float, descricao: str = "Entrada") -> Dict[str, Any]:
         """Registra entrada na coluna 'Entrada'"""
         try:
-            month_data = self._get_current_month_data()
+            month_data = self._get_current_month_data(fresh=True)
             
             # Adicionar à entrada atual
             nova_entrada = month_data['entrada'] + valor
@@ -376,7 +589,7 @@ class GoogleSheetsBreno:
     def registrar_saida_fixa(self, valor: float, descricao: str = "Saída fixa") -> Dict[str, Any]:
         """Registra saída fixa na coluna 'Saída'"""
         try:
-            month_data = self._get_current_month_data()
+            month_data = self._get_current_month_data(fresh=True)
             
             # Adicionar à saída atual
             nova_saida = month_data['saida'] + valor
@@ -502,6 +715,10 @@ class GoogleSheetsBreno:
             mes_atual = now.month
             ano_atual = now.year
             
+            # Ler em uma única chamada os blocos do mês atual e dos meses projetados
+            meses_necessarios = [(mes_atual + i - 1) % 12 + 1 for i in range(meses_futuros + 1)]
+            self._load_month_blocks(meses_necessarios)
+            
             # Obter saldo atual do mês atual
             status_atual = self.obter_status_atual()
             saldo_inicial = status_atual.get('saldo', 0.0)
@@ -6,10 +6,13 @@ import sys
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Any
+import calendar
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
 from sqlalchemy.orm import Session
 from core.models_sqlalchemy import Transaction
+from core.balance_ledger import BalanceLedger
 
 # Adicionar diretório raiz ao path
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -43,6 +46,22 @@ class GoogleSheetsService:
         )
         self.client = gspread.authorize(creds)
         self.spreadsheet = self.client.open_by_key(spreadsheet_id)
+        
+        # Cada mês ocupa 6 colunas (Data, Entrada, Saída, Diário, Saldo, vazio)
+        self.cols_per_month = 6
+    
+    def _check_saldo_protection(self, col_start: int, col_end: int):
+        """
+        PROTEÇÃO: bloqueia escrita em qualquer range que inclua a coluna Saldo
+        
+        Colunas 1-indexed; Saldo é a 5ª coluna de cada bloco de 6 (offset + 5)
+        """
+        for col in range(col_start, col_end + 1):
+            if (col - 1) % self.cols_per_month == 4:
+                raise ValueError(
+                    f"PROTEÇÃO: Tentativa de atualizar coluna Saldo bloqueada! "
+                    f"A sincronização NUNCA atualiza a coluna Saldo - apenas Entrada, Saída e Diário."
+                )
     
     def sync_transactions_to_sheet(self, db: Session, month: int = None, year: int = None):
         """
@@ -68,7 +87,7 @@ class GoogleSheetsService:
         
         # Buscar transações do mês
         start_date = f"{year}-{month:02d}-01"
-        last_day = (datetime(year, month + 1, 1) - timedelta(days=1)).day
+        last_day = calendar.monthrange(year, month)[1]
         end_date = f"{year}-{month:02d}-{last_day}"
         
         transactions = db.query(Transaction).filter(
@@ -79,7 +98,7 @@ class GoogleSheetsService:
         # Calcular qual coluna do mês na planilha
         # A planilha tem 12 meses em colunas: JAN, FEV, MAR, etc.
         # Cada mês ocupa 6 colunas (Data, Entrada, Saída, Diário, Saldo, vazio)
-        month_col_offset = (month - 1) * 6
+        month_col_offset = (month - 1) * self.cols_per_month
         
         # Estrutura da planilha (baseada no CSV):
         # Linha 1: Cabeçalho dos meses
@@ -90,11 +109,8 @@ class GoogleSheetsService:
             # Tentar acessar a aba correta (geralmente a primeira)
             worksheet = self.spreadsheet.sheet1
             
-            # Calcular saldo inicial do mês
-            all_before = db.query(Transaction).filter(
-                Transaction.date < start_date
-            ).all()
-            initial_balance = sum(t.amount for t in all_before)
+            # Saldo inicial do mês (ledger de saldos diários)
+            initial_balance = BalanceLedger(db).get_balance_before(start_date)
             
             running_balance = initial_balance
             
@@ -113,43 +129,39 @@ class GoogleSheetsService:
                     else:
                         transactions_by_day[day]['saida'] += abs(t.amount)
             
-            # Preencher planilha (começando na linha 3, que é o dia 1)
+            # Montar o bloco Entrada/Saída/Diário do mês inteiro em memória
+            # None = célula não enviada (a API ignora valores nulos e mantém o conteúdo atual)
+            block = []
             for day in range(1, last_day + 1):
-                row = day + 2  # Linha 3 = dia 1, linha 4 = dia 2, etc.
-                
                 day_data = transactions_by_day.get(day, {'entrada': 0, 'saida': 0, 'diario': 0})
                 
-                # Calcular saldo acumulado
+                # Saldo acumulado (apenas informativo - a planilha calcula a coluna Saldo)
                 running_balance += day_data['entrada'] - day_data['saida'] - day_data['diario']
                 
-                # Colunas do mês (baseado na estrutura do CSV)
-                # Coluna 1: Data (já preenchida)
-                # Coluna 2: Entrada
-                # Coluna 3: Saída
-                # Coluna 4: Diário
-                # Coluna 5: Saldo
-                
-                col_data = month_col_offset + 1  # Primeira coluna do mês
-                col_entrada = month_col_offset + 2
-                col_saida = month_col_offset + 3
-                col_diario = month_col_offset + 4
-                col_saldo = month_col_offset + 5
-                
-                # Atualizar células
-                if day_data['entrada'] > 0:
-                    worksheet.update_cell(row, col_entrada, day_data['entrada'])
-                if day_data['saida'] > 0:
-                    worksheet.update_cell(row, col_saida, day_data['saida'])
-                if day_data['diario'] > 0:
-                    worksheet.update_cell(row, col_diario, day_data['diario'])
-                
-                # Sempre atualizar saldo
-                worksheet.update_cell(row, col_saldo, running_balance)
+                block.append([
+                    day_data['entrada'] if day_data['entrada'] > 0 else None,
+                    day_data['saida'] if day_data['saida'] > 0 else None,
+                    day_data['diario'] if day_data['diario'] > 0 else None
+                ])
+            
+            # Colunas do mês (1-indexed): Data, Entrada, Saída, Diário, Saldo
+            # Linha 3 = dia 1, linha 4 = dia 2, etc.
+            col_entrada = month_col_offset + 2
+            col_diario = month_col_offset + 4
+            first_row = 3
+            last_row = last_day + 2
+            
+            self._check_saldo_protection(col_entrada, col_diario)
+            
+            # Uma única requisição para o mês inteiro
+            range_name = f"{rowcol_to_a1(first_row, col_entrada)}:{rowcol_to_a1(last_row, col_diario)}"
+            worksheet.update(range_name=range_name, values=block)
             
             return {
                 'success': True,
                 'message': f'Planilha sincronizada para {month_name}/{year}',
-                'transactions_synced': len(transactions)
+                'transactions_synced': len(transactions),
+                'balance': running_balance
             }
             
         except Exception as e:
@@ -2,8 +2,10 @@
 Serviço de relatórios automáticos - Semanal e Mensal
 Baseado no Método Breno
 """
+import calendar
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
+import numpy as np
 from services.google_sheets_breno import GoogleSheetsBreno
 from services.categorization_service import CategorizationService
 
@@ -35,12 +37,14 @@ class ReportService:
             total_previsto = 0
             total_real = 0
             
-            for i in range(7):
-                dia = inicio_semana + timedelta(days=i)
-                if dia > now:
-                    break
-                
-                # Ler dados do dia
+            dias = [inicio_semana + timedelta(days=i) for i in range(7)]
+            dias = [dia for dia in dias if dia <= now]
+            
+            # Semana pode cruzar dois meses: ler os blocos necessários em uma única chamada
+            self.sheets_service._load_month_blocks(sorted({dia.month for dia in dias}))
+            
+            for dia in dias:
+                # Ler dados do dia (do bloco já carregado)
                 month_data = self._get_day_data(dia.day, dia.month)
                 if month_data:
                     previsto = 50.0  # Valor previsto padrão
@@ -113,12 +117,16 @@ class ReportService:
             mes_atual = mes or now.month
             ano_atual = ano or now.year
             
+            mes_anterior = mes_atual - 1 if mes_atual > 1 else 12
+            ano_anterior = ano_atual if mes_atual > 1 else ano_atual - 1
+            
+            # Ler os dois meses em uma única chamada
+            self.sheets_service._load_month_blocks([mes_atual, mes_anterior])
+            
             # Obter dados do mês atual
             dados_mes_atual = self._get_month_data(mes_atual, ano_atual)
             
             # Obter dados do mês anterior
-            mes_anterior = mes_atual - 1 if mes_atual > 1 else 12
-            ano_anterior = ano_atual if mes_atual > 1 else ano_atual - 1
             dados_mes_anterior = self._get_month_data(mes_anterior, ano_anterior)
             
             # Calcular comparações
@@ -148,6 +156,126 @@ class ReportService:
                 'erro': str(e)
             }
     
+    def gerar_relatorio_anual(self, ano: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Gera relatório anual com uma única leitura da planilha:
+        - Totais e performance de cada mês
+        - Performance acumulada e saldo no fim de cada mês
+        - Melhor e pior mês
+        - Distribuição por tipo (entradas, saídas fixas, diário)
+        - Variação de cada mês em relação ao anterior
+        
+        A planilha (sheet1) tem os 12 meses em blocos de 6 colunas lado a lado, sem ano:
+        só o ano corrente pode ser consultado. No mês atual entram só os dias até hoje.
+        
+        Args:
+            ano: Ano do relatório (None ou o ano atual; outro ano retorna erro)
+        """
+        try:
+            now = datetime.now()
+            if ano is not None and ano != now.year:
+                return {
+                    'sucesso': False,
+                    'erro': f'A planilha só contém o ano de {now.year}; não há dados de {ano}'
+                }
+            ano = now.year
+            
+            blocos = self.sheets_service._load_all_month_blocks()
+            dados = self._blocos_para_array(blocos)
+            
+            # Ignorar linhas de dias que não existem no mês (ex: 30/02) e, no mês atual,
+            # os dias seguintes a hoje (só têm valores previstos)
+            ultimo_dia = np.array([calendar.monthrange(ano, mes)[1] for mes in range(1, 13)])
+            ultimo_dia[now.month - 1] = now.day
+            dias_validos = np.arange(31)[None, :] < ultimo_dia[:, None]
+            
+            # Totais por mês: colunas entrada, saída, diário
+            totais = (dados[:, :, :3] * dias_validos[:, :, None]).sum(axis=1)
+            entradas, saidas, diarios = totais[:, 0], totais[:, 1], totais[:, 2]
+            performance = entradas - saidas - diarios
+            acumulada = np.cumsum(performance)
+            saldo_final = dados[np.arange(12), ultimo_dia - 1, 3]
+            variacao = np.diff(performance, prepend=np.nan)
+            
+            # Meses realizados (até o mês atual) e com algum lançamento
+            # Meses futuros só têm valores previstos e ficam fora de totais e melhor/pior mês
+            realizados = np.arange(1, 13) <= now.month
+            com_dados = realizados & totais.any(axis=1)
+            
+            meses = []
+            for i in range(12):
+                meses.append({
+                    'mes': i + 1,
+                    'nome_mes': self.sheets_service.month_names.get(i + 1, f'Mês {i + 1}'),
+                    'entrada': float(entradas[i]),
+                    'saida': float(saidas[i]),
+                    'diario': float(diarios[i]),
+                    'performance': float(performance[i]),
+                    'performance_acumulada': float(acumulada[i]),
+                    'saldo_final': float(saldo_final[i]),
+                    'variacao_mes_anterior': None if np.isnan(variacao[i]) else float(variacao[i]),
+                    'realizado': bool(realizados[i])
+                })
+            
+            melhor_mes = None
+            pior_mes = None
+            if com_dados.any():
+                indices = np.flatnonzero(com_dados)
+                melhor_mes = meses[indices[np.argmax(performance[indices])]]
+                pior_mes = meses[indices[np.argmin(performance[indices])]]
+            
+            total_entrada = float(entradas[realizados].sum())
+            total_saida = float(saidas[realizados].sum())
+            total_diario = float(diarios[realizados].sum())
+            total_gastos = total_saida + total_diario
+            
+            return {
+                'sucesso': True,
+                'ano': ano,
+                'meses': meses,
+                'totais': {
+                    'entrada': total_entrada,
+                    'saida': total_saida,
+                    'diario': total_diario,
+                    'performance': total_entrada - total_gastos
+                },
+                'media_mensal': {
+                    'entrada': total_entrada / com_dados.sum() if com_dados.any() else 0.0,
+                    'gastos': total_gastos / com_dados.sum() if com_dados.any() else 0.0
+                },
+                'melhor_mes': melhor_mes,
+                'pior_mes': pior_mes,
+                'distribuicao_gastos': {
+                    'saida': {
+                        'total': total_saida,
+                        'percentual': total_saida / total_gastos * 100 if total_gastos else 0.0
+                    },
+                    'diario': {
+                        'total': total_diario,
+                        'percentual': total_diario / total_gastos * 100 if total_gastos else 0.0
+                    }
+                },
+                'meses_realizados': int(realizados.sum())
+            }
+        except Exception as e:
+            return {
+                'sucesso': False,
+                'erro': str(e)
+            }
+    
+    def _blocos_para_array(self, blocos: Dict[int, list]) -> np.ndarray:
+        """Converte blocos mensais em array 12 meses x 31 dias x (entrada, saída, diário, saldo)"""
+        dados = np.zeros((12, 31, 4))
+        for mes, bloco in blocos.items():
+            for dia in range(1, 32):
+                row = self.sheets_service._get_day_row(dia)
+                if row >= len(bloco):
+                    break
+                linha = bloco[row]
+                for j, valor in enumerate(linha[1:5]):
+                    dados[mes - 1, dia - 1, j] = self.sheets_service._parse_currency(valor)
+        return dados
+    
     def _get_day_data(self, dia: int, mes: int) -> Optional[Dict]:
         """Obtém dados de um dia específico"""
         try:
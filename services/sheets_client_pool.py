@@ -0,0 +1,119 @@
+"""
+Pool de conexões com o Google Sheets compartilhado pelo processo
+Evita autenticar e abrir a planilha a cada requisição/job
+"""
+import os
+import time
+import threading
+from typing import Dict, Optional
+from google.auth.transport.requests import Request
+from services.google_sheets_breno import GoogleSheetsBreno
+from services.sheets_mirror import SheetsMirror
+
+# Espelho local da planilha (desligar com SHEETS_MIRROR=0)
+MIRROR_ENABLED = os.getenv('SHEETS_MIRROR', '1') != '0'
+
+
+class SheetsClientPool:
+    """Mantém um GoogleSheetsBreno autenticado por planilha, reutilizado entre chamadas"""
+    
+    def __init__(self, health_check_interval: float = None):
+        """
+        Args:
+            health_check_interval: Segundos sem verificação antes de testar a conexão novamente
+        """
+        if health_check_interval is None:
+            health_check_interval = float(os.getenv('SHEETS_HEALTH_CHECK_INTERVAL', '300'))
+        self.health_check_interval = health_check_interval
+        self._services: Dict[str, GoogleSheetsBreno] = {}
+        self._last_check: Dict[str, float] = {}
+        self._mirrors: Dict[str, SheetsMirror] = {}
+        # _lock só protege os dicionários; autenticação, renovação e health check (rede)
+        # acontecem sob a trava da planilha, sem bloquear as demais
+        self._lock = threading.Lock()
+        self._spreadsheet_locks: Dict[str, threading.Lock] = {}
+    
+    def get(self, spreadsheet_id: str, credentials_path: str = None) -> GoogleSheetsBreno:
+        """
+        Retorna o serviço compartilhado da planilha, criando na primeira chamada
+        
+        Renova o token quando expirado e refaz a conexão se o health check falhar.
+        Só uma thread por vez faz essa manutenção; as outras seguem com o serviço atual.
+        """
+        with self._lock:
+            service = self._services.get(spreadsheet_id)
+            last_check = self._last_check.get(spreadsheet_id, 0.0)
+            spreadsheet_lock = self._spreadsheet_locks.setdefault(spreadsheet_id, threading.Lock())
+        
+        if service is None:
+            with spreadsheet_lock:
+                return self._create(spreadsheet_id, credentials_path)
+        
+        check_due = time.monotonic() - last_check > self.health_check_interval
+        if (service.credentials.valid and not check_due) or not spreadsheet_lock.acquire(blocking=False):
+            return service
+        
+        try:
+            self._refresh_if_expired(service)
+            if check_due:
+                if not service.health_check():
+                    service.reconnect()
+                with self._lock:
+                    self._last_check[spreadsheet_id] = time.monotonic()
+        finally:
+            spreadsheet_lock.release()
+        return service
+    
+    def _create(self, spreadsheet_id: str, credentials_path: str = None) -> GoogleSheetsBreno:
+        """Autentica e guarda o serviço (chamado com a trava da planilha)"""
+        with self._lock:
+            service = self._services.get(spreadsheet_id)
+        if service is not None:
+            return service  # Criado por outra thread enquanto esta esperava a trava
+        
+        mirror = self._get_mirror(spreadsheet_id, credentials_path)
+        service = GoogleSheetsBreno(spreadsheet_id, credentials_path, mirror=mirror)
+        with self._lock:
+            self._services[spreadsheet_id] = service
+            self._last_check[spreadsheet_id] = time.monotonic()
+        return service
+    
+    def _get_mirror(self, spreadsheet_id: str, credentials_path: str = None) -> Optional[SheetsMirror]:
+        """Espelho local da planilha, com sincronização em segundo plano (um por planilha; chamado com a trava da planilha)"""
+        if not MIRROR_ENABLED:
+            return None
+        mirror = self._mirrors.get(spreadsheet_id)
+        if mirror is None:
+            mirror = SheetsMirror(spreadsheet_id)
+            mirror.start(lambda: self.get(spreadsheet_id, credentials_path))
+            self._mirrors[spreadsheet_id] = mirror
+        return mirror
+    
+    def _refresh_if_expired(self, service: GoogleSheetsBreno):
+        """Renova o token de acesso antes de expirar; em caso de falha, reconecta"""
+        if service.credentials.valid:
+            return
+        try:
+            service.credentials.refresh(Request())
+        except Exception as e:
+            print(f"Falha ao renovar token do Google Sheets, reconectando: {e}")
+            service.reconnect()
+    
+    def invalidate(self, spreadsheet_id: Optional[str] = None):
+        """Remove conexões do pool (todas ou de uma planilha)"""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._services.clear()
+                self._last_check.clear()
+            else:
+                self._services.pop(spreadsheet_id, None)
+                self._last_check.pop(spreadsheet_id, None)
+
+
+# Pool único do processo (API, bot e agendador)
+sheets_pool = SheetsClientPool()
+
+
+def get_shared_sheets_service(spreadsheet_id: str, credentials_path: str = None) -> GoogleSheetsBreno:
+    """Atalho para obter o serviço compartilhado do pool do processo"""
+    return sheets_pool.get(spreadsheet_id, credentials_path)
@@ -0,0 +1,225 @@
+"""
+Espelho local da planilha do Método Breno
+Guarda em SQLite a grade dos 12 meses; uma sincronização em segundo plano consulta o
+modifiedTime da planilha no Drive e só baixa os blocos quando a planilha mudou.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Callable, Optional, Any
+
+DEFAULT_MIRROR_PATH = Path(__file__).parent.parent / 'data' / 'sheets_mirror.db'
+
+
+class SheetsMirror:
+    """Cópia local dos blocos mensais, lida por GoogleSheetsBreno no lugar da API"""
+    
+    def __init__(self, spreadsheet_id: str, db_path: str = None,
+                 sync_interval: float = None, max_age: float = None):
+        """
+        Args:
+            spreadsheet_id: ID da planilha
+            db_path: Arquivo SQLite do espelho
+            sync_interval: Segundos entre verificações de modificação no Drive
+            max_age: Segundos sem sincronizar após os quais o espelho deixa de ser usado
+        """
+        self.spreadsheet_id = spreadsheet_id
+        self.db_path = str(db_path or os.getenv('SHEETS_MIRROR_PATH', DEFAULT_MIRROR_PATH))
+        if sync_interval is None:
+            sync_interval = float(os.getenv('SHEETS_MIRROR_INTERVAL', '20'))
+        if max_age is None:
+            max_age = float(os.getenv('SHEETS_MIRROR_MAX_AGE', '300'))
+        self.sync_interval = sync_interval
+        self.max_age = max_age
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+    
+    def _init_db(self):
+        """Cria tabelas dos blocos e do controle de sincronização"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS mirror_blocks (
+                    spreadsheet_id TEXT NOT NULL,
+                    month INTEGER NOT NULL,
+                    grid TEXT NOT NULL,
+                    PRIMARY KEY (spreadsheet_id, month)
+                )
+            """)
+            # generation muda a cada escrita local; sincronizações iniciadas antes são descartadas
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS mirror_meta (
+                    spreadsheet_id TEXT PRIMARY KEY,
+                    modified_time TEXT,
+                    checked_at REAL,
+                    generation INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute(
+                "INSERT OR IGNORE INTO mirror_meta (spreadsheet_id) VALUES (?)",
+                (self.spreadsheet_id,)
+            )
+        finally:
+            conn.close()
+    
+    def _get_meta(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        modified_time, checked_at, generation = conn.execute(
+            "SELECT modified_time, checked_at, generation FROM mirror_meta WHERE spreadsheet_id = ?",
+            (self.spreadsheet_id,)
+        ).fetchone()
+        return {'modified_time': modified_time, 'checked_at': checked_at, 'generation': generation}
+    
+    def generation(self) -> int:
+        """Geração atual (usar antes de ler a planilha e passar para store_months)"""
+        conn = self._connect()
+        try:
+            return self._get_meta(conn)['generation']
+        finally:
+            conn.close()
+    
+    def get_months(self, months: List[int]) -> Dict[int, list]:
+        """
+        Blocos espelhados dos meses pedidos
+        
+        Retorna vazio se o espelho nunca sincronizou ou está sem sincronizar há mais de max_age.
+        """
+        conn = self._connect()
+        try:
+            meta = self._get_meta(conn)
+            if meta['checked_at'] is None or time.time() - meta['checked_at'] > self.max_age:
+                return {}
+            
+            placeholders = ','.join('?' * len(months))
+            rows = conn.execute(
+                f"SELECT month, grid FROM mirror_blocks WHERE spreadsheet_id = ? AND month IN ({placeholders})",
+                (self.spreadsheet_id, *months)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {month: json.loads(grid) for month, grid in rows}
+    
+    def store_months(self, blocks: Dict[int, list], generation: int, modified_time: str = None) -> bool:
+        """
+        Grava blocos lidos da planilha (apenas os que mudaram)
+        
+        Não grava se houve escrita local desde que a leitura começou (generation diferente).
+        Com modified_time, marca o espelho como sincronizado com essa versão da planilha.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            meta = self._get_meta(conn)
+            if meta['generation'] != generation:
+                conn.execute("ROLLBACK")
+                return False
+            
+            atuais = dict(conn.execute(
+                "SELECT month, grid FROM mirror_blocks WHERE spreadsheet_id = ?",
+                (self.spreadsheet_id,)
+            ).fetchall())
+            for month, bloco in blocks.items():
+                grid = json.dumps(bloco, ensure_ascii=False)
+                if atuais.get(month) != grid:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO mirror_blocks (spreadsheet_id, month, grid) VALUES (?, ?, ?)",
+                        (self.spreadsheet_id, month, grid)
+                    )
+            
+            if modified_time is not None:
+                conn.execute(
+                    "UPDATE mirror_meta SET modified_time = ?, checked_at = ? WHERE spreadsheet_id = ?",
+                    (modified_time, time.time(), self.spreadsheet_id)
+                )
+            conn.execute("COMMIT")
+            return True
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    def discard(self, months: List[int]):
+        """Descarta meses alterados localmente; a próxima sincronização baixa tudo de novo"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ','.join('?' * len(months))
+            conn.execute(
+                f"DELETE FROM mirror_blocks WHERE spreadsheet_id = ? AND month IN ({placeholders})",
+                (self.spreadsheet_id, *months)
+            )
+            conn.execute(
+                "UPDATE mirror_meta SET modified_time = NULL, generation = generation + 1 WHERE spreadsheet_id = ?",
+                (self.spreadsheet_id,)
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    
+    def sync(self, service, force: bool = False) -> bool:
+        """
+        Sincroniza com a planilha se ela mudou desde a última sincronização
+        
+        Custa uma chamada ao Drive quando nada mudou e mais uma (batch_get dos 12 meses) quando mudou.
+        Retorna True se os blocos foram baixados.
+        """
+        conn = self._connect()
+        try:
+            meta = self._get_meta(conn)
+        finally:
+            conn.close()
+        
+        modified_time = service.get_modified_time()
+        
+        if not force and meta['modified_time'] == modified_time:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE mirror_meta SET checked_at = ? WHERE spreadsheet_id = ? AND generation = ?",
+                    (time.time(), self.spreadsheet_id, meta['generation'])
+                )
+            finally:
+                conn.close()
+            return False
+        
+        months = list(range(1, 13))
+        blocos = service.worksheet.batch_get([service._get_month_range(month) for month in months])
+        blocks = {month: [list(linha) for linha in bloco] for month, bloco in zip(months, blocos)}
+        
+        return self.store_months(blocks, meta['generation'], modified_time)
+    
+    def start(self, service_factory: Callable[[], Any]):
+        """Inicia a sincronização em segundo plano (primeira sincronização imediata)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(service_factory,), name='sheets-mirror', daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Para a sincronização em segundo plano"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sync_interval + 5)
+            self._thread = None
+    
+    def _run(self, service_factory: Callable[[], Any]):
+        while True:
+            try:
+                self.sync(service_factory())
+            except Exception as e:
+                print(f"Erro ao sincronizar espelho da planilha: {e}")
+            if self._stop.wait(self.sync_interval):
+                break
@@ -0,0 +1,498 @@
+"""
+Fila de escrita (write-behind) para registros na planilha
+Gastos, entradas e saídas são gravados primeiro em um SQLite local e confirmados na hora;
+uma thread em segundo plano soma os incrementos pendentes por célula (dia, coluna)
+e grava tudo em uma única chamada à planilha.
+"""
+import os
+import sys
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# Adicionar diretório raiz ao path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.google_sheets_breno import GoogleSheetsBreno
+from services.sheets_client_pool import sheets_pool
+
+# Valor previsto padrão do diário (substituído pelo primeiro gasto do dia)
+VALOR_PREVISTO_PADRAO = 50.0
+
+# Posição de cada campo dentro do bloco de 6 colunas do mês
+FIELD_OFFSETS = {'entrada': 1, 'saida': 2, 'diario': 3}
+
+DEFAULT_QUEUE_PATH = Path(__file__).parent.parent / 'data' / 'sheets_write_queue.db'
+
+
+def apply_increment(field: str, atual: float, total: float) -> float:
+    """
+    Novo valor da célula após somar os incrementos pendentes
+    
+    No diário, se a célula ainda tem o previsto padrão, o primeiro gasto substitui
+    o previsto e os demais somam - equivalente a substituir pelo total.
+    """
+    if field == 'diario' and abs(atual - VALOR_PREVISTO_PADRAO) < 0.01:
+        return total
+    return atual + total
+
+
+class SheetsWriteQueue:
+    """Fila durável de incrementos, com gravação em lote e trava por célula"""
+    
+    def __init__(self, spreadsheet_id: str, service_factory: Callable[[], GoogleSheetsBreno],
+                 db_path: str = None, flush_interval: float = None, lock_ttl: float = 120):
+        """
+        Args:
+            spreadsheet_id: ID da planilha (separa filas de planilhas diferentes)
+            service_factory: Retorna o GoogleSheetsBreno usado na gravação
+            db_path: Arquivo SQLite da fila
+            flush_interval: Segundos entre gravações em segundo plano
+            lock_ttl: Segundos sem renovação após os quais a trava de uma célula é considerada
+                abandonada (a gravação renova a cada lock_ttl/4)
+        """
+        self.spreadsheet_id = spreadsheet_id
+        self.service_factory = service_factory
+        self.db_path = str(db_path or os.getenv('SHEETS_QUEUE_PATH', DEFAULT_QUEUE_PATH))
+        if flush_interval is None:
+            flush_interval = float(os.getenv('SHEETS_FLUSH_INTERVAL', '2'))
+        self.flush_interval = flush_interval
+        self.lock_ttl = lock_ttl
+        
+        self._listeners: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Nova conexão (uma por operação, segura entre threads e processos)"""
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+    
+    def _init_db(self):
+        """Cria tabelas da fila e das travas por célula"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_writes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    spreadsheet_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    amount REAL NOT NULL,
+                    description TEXT,
+                    created_at TEXT NOT NULL,
+                    claim TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS ix_pending_writes_cell
+                ON pending_writes (spreadsheet_id, date, field)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cell_locks (
+                    cell TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    acquired_at REAL NOT NULL
+                )
+            """)
+        finally:
+            conn.close()
+    
+    def _cell_key(self, date: str, field: str) -> str:
+        return f"{self.spreadsheet_id}:{date}:{field}"
+    
+    def enqueue(self, field: str, amount: float, description: str = None, date: str = None) -> int:
+        """Grava um incremento na fila e retorna seu id (não acessa a planilha)"""
+        if field not in FIELD_OFFSETS:
+            raise ValueError(f"Campo inválido: {field}. Use: {', '.join(FIELD_OFFSETS)}")
+        
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "INSERT INTO pending_writes (spreadsheet_id, date, field, amount, description, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.spreadsheet_id, date, field, amount, description, datetime.now().isoformat())
+            )
+            row_id = cursor.lastrowid
+        finally:
+            conn.close()
+        
+        self._notify()
+        return row_id
+    
+    def pending_totals(self, date: str, exclude_id: int = None) -> Dict[str, float]:
+        """Soma dos incrementos ainda não gravados de um dia, por campo (opcionalmente sem um registro)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT field, SUM(amount) FROM pending_writes "
+                "WHERE spreadsheet_id = ? AND date = ? AND id IS NOT ? GROUP BY field",
+                (self.spreadsheet_id, date, exclude_id)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {field: total for field, total in rows}
+    
+    def pending_entry(self, row_id: int) -> Optional[Tuple[str, str, float]]:
+        """(data, campo, valor) de um registro ainda não gravado, ou None"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT date, field, amount FROM pending_writes WHERE id = ?",
+                (row_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+    
+    def pending_count(self) -> int:
+        """Quantidade de registros aguardando gravação"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM pending_writes WHERE spreadsheet_id = ?",
+                (self.spreadsheet_id,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+    
+    def _claim(self, token: str) -> Dict[Tuple[str, str], Tuple[float, int]]:
+        """
+        Trava as células com registros pendentes e reserva esses registros
+        
+        Células travadas por outra gravação em andamento ficam para a próxima.
+        Retorna {(data, campo): (total, quantidade de registros)}.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cell_locks WHERE acquired_at < ?", (time.time() - self.lock_ttl,))
+            
+            cells = conn.execute(
+                "SELECT DISTINCT date, field FROM pending_writes WHERE spreadsheet_id = ?",
+                (self.spreadsheet_id,)
+            ).fetchall()
+            
+            for date, field in cells:
+                locked = conn.execute(
+                    "INSERT OR IGNORE INTO cell_locks (cell, owner, acquired_at) VALUES (?, ?, ?)",
+                    (self._cell_key(date, field), token, time.time())
+                ).rowcount
+                if locked:
+                    # Registros da célula passam a ser desta gravação (inclusive de uma gravação abandonada)
+                    conn.execute(
+                        "UPDATE pending_writes SET claim = ? WHERE spreadsheet_id = ? AND date = ? AND field = ?",
+                        (token, self.spreadsheet_id, date, field)
+                    )
+            
+            rows = conn.execute(
+                "SELECT date, field, SUM(amount), COUNT(*) FROM pending_writes "
+                "WHERE claim = ? GROUP BY date, field",
+                (token,)
+            ).fetchall()
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        
+        return {(date, field): (total, count) for date, field, total, count in rows}
+    
+    def _renew_locks(self, token: str, done: threading.Event):
+        """Renova as travas da gravação enquanto ela não termina (não expiram em gravações lentas)"""
+        while not done.wait(self.lock_ttl / 4):
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute("UPDATE cell_locks SET acquired_at = ? WHERE owner = ?", (time.time(), token))
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"Erro ao renovar travas da fila de escrita: {e}")
+    
+    def _release(self, token: str, written: bool):
+        """
+        Libera as travas; remove os registros gravados ou devolve-os à fila
+        
+        Só mexe nos registros das células cuja trava ainda é desta gravação: uma trava
+        expirada pode ter passado os registros para outra gravação.
+        """
+        owned = (
+            "spreadsheet_id || ':' || date || ':' || field IN "
+            "(SELECT cell FROM cell_locks WHERE owner = ?)"
+        )
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if written:
+                perdidas = conn.execute(
+                    f"SELECT COUNT(*) FROM pending_writes WHERE claim = ? AND NOT ({owned})",
+                    (token, token)
+                ).fetchone()[0]
+                if perdidas:
+                    print(f"⚠️  Trava expirada durante a gravação: {perdidas} registros gravados ficaram com outra gravação")
+                conn.execute(f"DELETE FROM pending_writes WHERE claim = ? AND {owned}", (token, token))
+            else:
+                conn.execute(f"UPDATE pending_writes SET claim = NULL WHERE claim = ? AND {owned}", (token, token))
+            conn.execute("DELETE FROM cell_locks WHERE owner = ?", (token,))
+            conn.execute("COMMIT")
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    def flush(self) -> Dict[str, Any]:
+        """
+        Grava os incrementos pendentes na planilha
+        
+        Uma leitura em lote dos meses envolvidos e uma escrita em lote de todas as células.
+        As travas são renovadas enquanto a gravação está em andamento.
+        """
+        token = uuid.uuid4().hex
+        cells = self._claim(token)
+        
+        if not cells:
+            return {'sucesso': True, 'celulas': 0, 'registros': 0}
+        
+        done = threading.Event()
+        threading.Thread(target=self._renew_locks, args=(token, done), daemon=True).start()
+        try:
+            service = self.service_factory()
+            
+            # Ler valores atuais direto da planilha (ignorando memória e espelho local)
+            months = sorted({int(date[5:7]) for date, _ in cells})
+            blocos = service._load_month_blocks(months, fresh=True)
+            
+            updates = []
+            for (date, field), (total, _) in cells.items():
+                month = int(date[5:7])
+                row = service._get_day_row(int(date[8:10]))
+                col = service._get_month_column_offset(month) + FIELD_OFFSETS[field]
+                atual = service._parse_currency(service._get_block_value(blocos[month], row, col))
+                novo = apply_increment(field, atual, total)
+                updates.append((row, col, service._format_currency(novo)))
+            
+            service._set_cell_values(updates)
+        except Exception as e:
+            done.set()
+            self._release(token, written=False)
+            print(f"Erro ao gravar fila na planilha (registros mantidos): {e}")
+            return {'sucesso': False, 'erro': str(e)}
+        
+        done.set()
+        self._release(token, written=True)
+        self._notify()
+        
+        return {
+            'sucesso': True,
+            'celulas': len(cells),
+            'registros': sum(count for _, count in cells.values())
+        }
+    
+    def add_listener(self, listener: Callable[[], None]):
+        """
+        Registra função chamada quando a fila muda: novo registro ou gravação na planilha
+        (ex: invalidar caches de leitura). Registrar a mesma função de novo não tem efeito.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+    
+    def _notify(self):
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"Erro em listener da fila de escrita: {e}")
+    
+    def start(self):
+        """Inicia a thread que grava a fila periodicamente"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sheets-write-queue', daemon=True)
+        self._thread.start()
+    
+    def stop(self, flush: bool = True):
+        """Para a thread (gravando o que estiver pendente)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        if flush:
+            self.flush()
+    
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                if self.pending_count():
+                    self.flush()
+            except Exception as e:
+                print(f"Erro na fila de escrita da planilha: {e}")
+    
+    def _preview(self, service: GoogleSheetsBreno, exclude_id: int = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Dados do dia (blocos em memória) e valores efetivos já considerando a fila"""
+        month_data = service._get_current_month_data()
+        pendentes = self.pending_totals(datetime.now().strftime('%Y-%m-%d'), exclude_id)
+        efetivo = {
+            field: apply_increment(field, month_data[field], pendentes[field]) if field in pendentes else month_data[field]
+            for field in FIELD_OFFSETS
+        }
+        return month_data, efetivo
+    
+    def obter_status(self) -> Dict[str, Any]:
+        """
+        Status atual já com os registros pendentes do dia (mesmo retorno de obter_status_atual)
+        
+        Mantém leituras feitas antes da gravação coerentes com o status_estimado dos registros.
+        """
+        service = self.service_factory()
+        status = service.obter_status_atual()
+        if 'erro' in status:
+            return status
+        
+        month_data, efetivo = self._preview(service)
+        if all(efetivo[field] == month_data[field] for field in FIELD_OFFSETS):
+            return status
+        return self._estimate(service, month_data, efetivo)['status']
+    
+    def _estimate(self, service: GoogleSheetsBreno, month_data: Dict[str, Any],
+                  novo: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Estima saldo e semáforo após o registro (a planilha recalcula o valor real ao gravar)
+        
+        O status estimado (status atual + delta do registro) permite avaliar alertas
+        sem nova leitura da planilha.
+        """
+        delta = (
+            (novo['entrada'] - month_data['entrada'])
+            - (novo['saida'] - month_data['saida'])
+            - (novo['diario'] - month_data['diario'])
+        )
+        saldo = month_data['saldo'] + delta
+        
+        status = service.obter_status_atual()
+        performance = status.get('performance', 0.0) + delta
+        semaforo_info = service._calculate_semaforo(saldo, performance, novo['diario'], status.get('limite_diario', 0.0))
+        
+        status_estimado = {
+            **status,
+            'saldo': saldo,
+            'gasto_diario': novo['diario'],
+            'entrada': status.get('entrada', 0.0) + (novo['entrada'] - month_data['entrada']),
+            'saida': status.get('saida', 0.0) + (novo['saida'] - month_data['saida']),
+            'diario_total': status.get('diario_total', 0.0) + (novo['diario'] - month_data['diario']),
+            'performance': performance,
+            **semaforo_info
+        }
+        
+        return {
+            'saldo': saldo,
+            'semaforo': semaforo_info['semaforo'],
+            'status_text': semaforo_info['status_text'],
+            'status': status_estimado
+        }
+    
+    def estimar_registro(self, row_id: int) -> Dict[str, Any]:
+        """
+        Saldo e semáforo estimados após um registro já enfileirado (lê a planilha)
+        
+        Os valores "antes" são os da planilha com os demais pendentes do dia.
+        Se o registro já foi gravado, retorna {} (o status real já o inclui).
+        
+        Args:
+            row_id: Id retornado por enqueue
+        """
+        registro = self.pending_entry(row_id)
+        if registro is None:
+            return {}
+        _, field, valor = registro
+        
+        service = self.service_factory()
+        month_data, efetivo = self._preview(service, exclude_id=row_id)
+        
+        if field != 'diario':
+            estimativa = self._estimate(service, month_data, {**efetivo, field: efetivo[field] + valor})
+            return {
+                'saldo_atual': estimativa['saldo'],
+                'status_estimado': estimativa['status']
+            }
+        
+        valor_atual = efetivo['diario']
+        if abs(valor_atual - VALOR_PREVISTO_PADRAO) < 0.01:
+            novo_diario = valor
+            diferenca = valor - valor_atual
+            acao = "substituído"
+        else:
+            novo_diario = valor_atual + valor
+            diferenca = valor
+            acao = "adicionado"
+        
+        estimativa = self._estimate(service, month_data, {**efetivo, 'diario': novo_diario})
+        return {
+            'saldo_atual': estimativa['saldo'],
+            'gasto_diario': novo_diario,
+            'previsto': valor_atual,
+            'acao': acao,
+            'diferenca': diferenca,
+            'semaforo': estimativa['semaforo'],
+            'status': estimativa['status_text'],
+            'status_estimado': estimativa['status']
+        }
+    
+    def _registrar(self, field: str, valor: float, descricao: str) -> Dict[str, Any]:
+        """
+        Enfileira o registro e acrescenta a estimativa se a planilha responder
+        
+        O registro é confirmado assim que está na fila; falha ao ler a planilha
+        só deixa a resposta sem estimativa.
+        """
+        try:
+            row_id = self.enqueue(field, valor, descricao)
+        except Exception as e:
+            return {
+                'sucesso': False,
+                'erro': str(e)
+            }
+        
+        result = {'sucesso': True, 'enfileirado': True, 'id': row_id}
+        try:
+            result.update(self.estimar_registro(row_id))
+        except Exception as e:
+            print(f"Erro ao estimar saldo do registro {row_id} (registro mantido na fila): {e}")
+        return result
+    
+    def registrar_gasto_diario(self, valor: float, descricao: str = "Gasto diário") -> Dict[str, Any]:
+        """Enfileira gasto diário (mesmo retorno de GoogleSheetsBreno.registrar_gasto_diario)"""
+        return self._registrar('diario', valor, descricao)
+    
+    def registrar_entrada(self, valor: float, descricao: str = "Entrada") -> Dict[str, Any]:
+        """Enfileira entrada (mesmo retorno de GoogleSheetsBreno.registrar_entrada)"""
+        return self._registrar('entrada', valor, descricao)
+    
+    def registrar_saida_fixa(self, valor: float, descricao: str = "Saída fixa") -> Dict[str, Any]:
+        """Enfileira saída fixa (mesmo retorno de GoogleSheetsBreno.registrar_saida_fixa)"""
+        return self._registrar('saida', valor, descricao)
+
+
+# Uma fila por planilha no processo
+_queues: Dict[str, SheetsWriteQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_shared_write_queue(spreadsheet_id: str, credentials_path: str = None) -> SheetsWriteQueue:
+    """Retorna a fila de escrita da planilha, iniciando a gravação em segundo plano"""
+    with _queues_lock:
+        queue = _queues.get(spreadsheet_id)
+        if queue is None:
+            queue = SheetsWriteQueue(spreadsheet_id, lambda: sheets_pool.get(spreadsheet_id, credentials_path))
+            queue.start()
+            _queues[spreadsheet_id] = queue
+        return queue
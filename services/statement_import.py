@@ -0,0 +1,321 @@
+"""
+Importação de extratos bancários (CSV/OFX) para a tabela transactions
+Pipeline de geradores: leitura incremental -> registros normalizados -> blocos.
+Cada bloco é categorizado, deduplicado e gravado com um commit, então a memória
+usada não cresce com o tamanho do arquivo.
+"""
+import io
+import csv
+import hashlib
+import unicodedata
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Any, List, Iterator, Iterable, Optional, TextIO, BinaryIO
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from core.models_sqlalchemy import Transaction
+from core.balance_ledger import BalanceLedger
+from services.categorization_service import CategorizationService
+from bot.parser import CommandParser
+
+# Linhas do extrato gravadas por commit
+IMPORT_CHUNK_SIZE = 1000
+
+# Erros de linha detalhados no resultado (os demais só entram na contagem)
+MAX_ERROS_LISTADOS = 20
+
+# Nomes de coluna aceitos no cabeçalho do CSV (sem acento, minúsculos)
+CSV_COLUMNS = {
+    'date': ['data', 'date', 'dt', 'data lancamento', 'data do lancamento', 'data movimento'],
+    'description': ['descricao', 'description', 'historico', 'lancamento', 'memo', 'detalhes'],
+    'amount': ['valor', 'amount', 'value', 'quantia', 'valor (r$)'],
+    'credit': ['credito', 'entrada', 'credit'],
+    'debit': ['debito', 'saida', 'debit'],
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y']
+
+
+class _CsvPontoEVirgula(csv.excel):
+    """Dialeto padrão quando o separador não é detectado (extratos brasileiros)"""
+    delimiter = ';'
+
+
+def _sem_acentos(texto: str) -> str:
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+def parse_data(valor: str) -> str:
+    """Converte data do extrato para YYYY-MM-DD"""
+    valor = valor.strip()
+    for formato in DATE_FORMATS:
+        try:
+            return datetime.strptime(valor, formato).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {valor!r}")
+
+
+def parse_valor(valor: str) -> float:
+    """Converte valor do extrato ('-1.234,56', 'R$ 10,00', '(45,90)', '12.5') para float"""
+    texto = valor.strip().replace('R$', '').replace(' ', '')
+    negativo = texto.startswith('(') and texto.endswith(')')
+    texto = texto.strip('()')
+    if texto.endswith('-'):
+        negativo, texto = True, texto[:-1]
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    numero = float(texto)
+    return -abs(numero) if negativo else numero
+
+
+def abrir_texto(binario: BinaryIO) -> TextIO:
+    """
+    Abre o arquivo binário como texto, sem carregá-lo inteiro
+    UTF-8 quando o início do arquivo decodifica; senão cp1252 (comum em extratos de bancos).
+    """
+    inicio = binario.read(64 * 1024)
+    binario.seek(0)
+    try:
+        inicio.decode('utf-8-sig')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'cp1252'
+    return io.TextIOWrapper(binario, encoding=encoding, errors='replace', newline='')
+
+
+def detectar_formato(texto: TextIO) -> str:
+    """'ofx' ou 'csv' pelo início do arquivo (volta ao começo depois de ler)"""
+    inicio = texto.read(4096)
+    texto.seek(0)
+    return 'ofx' if 'OFXHEADER' in inicio.upper() or '<OFX>' in inicio.upper() else 'csv'
+
+
+def ler_csv(texto: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Registros de um extrato CSV, linha a linha
+    
+    Aceita separador ';', ',' ou tab, cabeçalho com os nomes de CSV_COLUMNS (ou sem
+    cabeçalho: data, descrição, valor) e colunas separadas de crédito/débito.
+    Linhas inválidas viram registros com 'erro'.
+    """
+    amostra = texto.read(8192)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+    except csv.Error:
+        dialeto = _CsvPontoEVirgula
+    
+    reader = csv.reader(texto, dialeto)
+    cabecalho = next(reader, None)
+    if cabecalho is None:
+        return
+    
+    nomes = [_sem_acentos(c).strip().lower() for c in cabecalho]
+    colunas = {}
+    for campo, aceitos in CSV_COLUMNS.items():
+        for i, nome in enumerate(nomes):
+            if nome in aceitos and campo not in colunas:
+                colunas[campo] = i
+    
+    linhas: Iterable = reader
+    if 'date' not in colunas:
+        # Sem cabeçalho reconhecido: primeira linha já é dado (data, descrição, valor)
+        colunas = {'date': 0, 'description': 1, 'amount': 2}
+        linhas = _com_primeira(cabecalho, reader)
+    elif 'description' not in colunas or ('amount' not in colunas and 'credit' not in colunas and 'debit' not in colunas):
+        raise ValueError("Cabeçalho do CSV sem colunas de descrição e valor")
+    
+    for numero, campos in enumerate(linhas, start=1 if linhas is not reader else 2):
+        if not any(c.strip() for c in campos):
+            continue
+        try:
+            if 'amount' in colunas:
+                valor = parse_valor(campos[colunas['amount']])
+            else:
+                credito = campos[colunas['credit']].strip() if 'credit' in colunas else ''
+                debito = campos[colunas['debit']].strip() if 'debit' in colunas else ''
+                valor = parse_valor(credito) if credito else -abs(parse_valor(debito))
+            yield {
+                'linha': numero,
+                'date': parse_data(campos[colunas['date']]),
+                'description': ' '.join(campos[colunas['description']].split()),
+                'amount': valor
+            }
+        except (ValueError, IndexError) as e:
+            yield {'linha': numero, 'erro': str(e) or 'Linha incompleta'}
+
+
+def _com_primeira(primeira: List[str], reader: Iterator[List[str]]) -> Iterator[List[str]]:
+    yield primeira
+    yield from reader
+
+
+def _tags_ofx(texto: TextIO, tamanho_bloco: int = 64 * 1024) -> Iterator[tuple]:
+    """
+    Tags (nome, valor) de um arquivo OFX (SGML ou XML), lendo em blocos
+    Funciona com uma tag por linha ou com o arquivo inteiro em uma linha só.
+    """
+    resto = ''
+    for bloco in iter(lambda: texto.read(tamanho_bloco), ''):
+        partes = (resto + bloco).split('<')
+        resto = partes.pop()
+        for parte in partes:
+            if '>' in parte:
+                nome, _, valor = parte.partition('>')
+                yield nome.strip().upper(), valor.strip()
+    if '>' in resto:
+        nome, _, valor = resto.partition('>')
+        yield nome.strip().upper(), valor.strip()
+
+
+def ler_ofx(texto: TextIO) -> Iterator[Dict[str, Any]]:
+    """Registros de um extrato OFX (um por <STMTTRN>)"""
+    atual = None
+    numero = 0
+    for nome, valor in _tags_ofx(texto):
+        if nome == 'STMTTRN':
+            numero += 1
+            atual = {}
+        elif nome == '/STMTTRN' and atual is not None:
+            try:
+                descricao = atual.get('MEMO') or atual.get('NAME') or ''
+                yield {
+                    'linha': numero,
+                    'date': datetime.strptime(atual['DTPOSTED'][:8], '%Y%m%d').strftime('%Y-%m-%d'),
+                    'description': ' '.join(descricao.split()),
+                    'amount': parse_valor(atual['TRNAMT'])
+                }
+            except (KeyError, ValueError) as e:
+                yield {'linha': numero, 'erro': f"Transação OFX inválida: {e}"}
+            atual = None
+        elif atual is not None and not nome.startswith('/'):
+            atual[nome] = valor
+
+
+def em_blocos(registros: Iterable[Dict[str, Any]], tamanho: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa o fluxo de registros em listas de até `tamanho` itens"""
+    iterador = iter(registros)
+    while True:
+        bloco = list(islice(iterador, tamanho))
+        if not bloco:
+            return
+        yield bloco
+
+
+def chave_conteudo(date: str, amount: float, description: str) -> int:
+    """Hash do conteúdo de uma transação (data, valor em centavos, descrição normalizada)"""
+    texto = f"{date}|{round(amount * 100)}|{' '.join(description.lower().split())}"
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class StatementImporter:
+    """Importa extratos em blocos, categorizando e ignorando transações já existentes"""
+    
+    def __init__(self, db: Session, chunk_size: int = IMPORT_CHUNK_SIZE,
+                 categorization: CategorizationService = None, parser: CommandParser = None):
+        """
+        Args:
+            db: Sessão do banco
+            chunk_size: Registros gravados por commit
+            categorization: Serviço de categorização (padrão: novo CategorizationService)
+            parser: Classificador de tipo (padrão: CommandParser)
+        """
+        self.db = db
+        self.chunk_size = chunk_size
+        self.categorization = categorization or CategorizationService()
+        self.parser = parser or CommandParser()
+    
+    def importar(self, texto: TextIO, formato: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Importa um extrato
+        
+        Args:
+            texto: Arquivo aberto em modo texto (ver abrir_texto)
+            formato: 'csv', 'ofx' ou None para detectar
+        
+        Returns:
+            Contagens de linhas lidas, importadas, duplicadas e com erro
+        """
+        formato = (formato or detectar_formato(texto)).lower()
+        if formato not in ('csv', 'ofx'):
+            raise ValueError("Formato inválido. Use: csv ou ofx")
+        registros = ler_ofx(texto) if formato == 'ofx' else ler_csv(texto)
+        
+        resultado = {'formato': formato, 'lidas': 0, 'importadas': 0, 'duplicadas': 0, 'erros': 0, 'detalhes_erros': []}
+        
+        # Ocorrências de cada conteúdo já vistas no arquivo: duas transações iguais no mesmo
+        # dia são legítimas e só contam como duplicadas se o banco já tiver as duas
+        ocorrencias: Dict[int, int] = {}
+        
+        for bloco in em_blocos(registros, self.chunk_size):
+            validos = []
+            for registro in bloco:
+                resultado['lidas'] += 1
+                if 'erro' in registro:
+                    resultado['erros'] += 1
+                    if len(resultado['detalhes_erros']) < MAX_ERROS_LISTADOS:
+                        resultado['detalhes_erros'].append({'linha': registro['linha'], 'erro': registro['erro']})
+                else:
+                    validos.append(registro)
+            
+            novos = self._remover_existentes(validos, ocorrencias)
+            resultado['duplicadas'] += len(validos) - len(novos)
+            resultado['importadas'] += self._gravar_bloco(novos)
+        
+        return resultado
+    
+    def _remover_existentes(self, registros: List[Dict[str, Any]], ocorrencias: Dict[int, int]) -> List[Dict[str, Any]]:
+        """
+        Mantém só os registros que ainda não estão no banco
+        
+        O k-ésimo registro com um mesmo conteúdo no arquivo é novo se o banco tem menos
+        de k+1 transações com esse conteúdo (reimportar o mesmo arquivo não duplica nada).
+        """
+        if not registros:
+            return []
+        
+        datas = sorted({r['date'] for r in registros})
+        valores = sorted({r['amount'] for r in registros})
+        no_banco: Dict[int, int] = {}
+        for date, amount, description in self.db.query(
+            Transaction.date, Transaction.amount, Transaction.description
+        ).filter(Transaction.date.in_(datas), Transaction.amount.in_(valores)):
+            chave = chave_conteudo(date, amount, description)
+            no_banco[chave] = no_banco.get(chave, 0) + 1
+        
+        novos = []
+        for registro in registros:
+            chave = chave_conteudo(registro['date'], registro['amount'], registro['description'])
+            ordem = ocorrencias.get(chave, 0)
+            ocorrencias[chave] = ordem + 1
+            if ordem >= no_banco.get(chave, 0):
+                novos.append(registro)
+        return novos
+    
+    def _gravar_bloco(self, registros: List[Dict[str, Any]]) -> int:
+        """Categoriza, classifica e grava um bloco (um INSERT em lote e um commit)"""
+        if not registros:
+            return 0
+        
+        categorias = self.categorization.categorizar_many(r['description'] for r in registros)
+        rows = [
+            {
+                'date': r['date'],
+                'description': r['description'],
+                'amount': r['amount'],
+                'type': self.parser.infer_type(r['description'], r['amount']),
+                'category': categoria,
+                'installment_group_id': None
+            }
+            for r, categoria in zip(registros, categorias)
+        ]
+        
+        try:
+            self.db.execute(insert(Transaction), rows)
+            BalanceLedger(self.db).apply_many((row['date'], row['amount']) for row in rows)
+            self.db.commit()
+        except:
+            self.db.rollback()
+            raise
+        return len(rows)
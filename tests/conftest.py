@@ -0,0 +1,68 @@
+"""
+Fixtures compartilhadas: banco SQLite em memória (nunca toca data/finance.db)
+"""
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import Base
+import core.models_sqlalchemy  # noqa: F401  (registra as tabelas em Base.metadata)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def worksheet():
+    from tests.fake_sheets import FakeWorksheet
+    return FakeWorksheet()
+
+
+@pytest.fixture
+def sheets_service(worksheet, tmp_path, monkeypatch):
+    """GoogleSheetsBreno ligado à planilha em memória (sem autenticação)"""
+    from services.google_sheets_breno import GoogleSheetsBreno
+    
+    def connect(self):
+        self.worksheet = worksheet
+    
+    monkeypatch.setattr(GoogleSheetsBreno, '_connect', connect)
+    credenciais = tmp_path / 'credenciais.json'
+    credenciais.write_text('{}')
+    return GoogleSheetsBreno('planilha-teste', str(credenciais))
+
+
+@pytest.fixture
+def dicionario(engine, monkeypatch):
+    """Dicionário de palavras-chave vazio, lido do banco em memória (padrão de CategorizationService)"""
+    import services.categorization_service as categorization_service
+    
+    monkeypatch.setattr(categorization_service, '_user_keywords', {})
+    monkeypatch.setattr(categorization_service, '_versions', None)
+    monkeypatch.setattr(categorization_service, '_checked_at', 0.0)
+    monkeypatch.setattr(categorization_service, '_compiled', None)
+    monkeypatch.setattr(categorization_service, '_default_session_factory', sessionmaker(bind=engine))
@@ -0,0 +1,50 @@
+"""
+Planilha em memória para os testes (mesma interface de gspread.Worksheet usada pelos serviços)
+"""
+from typing import Callable, List, Optional
+
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+class FakeWorksheet:
+    """Grade de valores com batch_get, get_all_values e batch_update"""
+    
+    def __init__(self, rows: int = 40, cols: int = 72):
+        self.grid = [['' for _ in range(cols)] for _ in range(rows)]
+        self.on_read: Optional[Callable[[], None]] = None  # Chamado no meio de cada leitura
+    
+    def set(self, row: int, col: int, value: str):
+        """Define célula (0-indexed, como GoogleSheetsBreno)"""
+        self.grid[row][col] = value
+    
+    def get(self, row: int, col: int) -> str:
+        return self.grid[row][col]
+    
+    def _read(self, a1: str) -> List[list]:
+        g = a1_range_to_grid_range(a1)
+        return [
+            linha[g['startColumnIndex']:g['endColumnIndex']]
+            for linha in self.grid[g['startRowIndex']:g['endRowIndex']]
+        ]
+    
+    def batch_get(self, ranges, **kwargs):
+        blocos = [self._read(r) for r in ranges]
+        if self.on_read:
+            self.on_read()
+        return blocos
+    
+    def get_all_values(self, **kwargs):
+        valores = [list(linha) for linha in self.grid]
+        if self.on_read:
+            self.on_read()
+        return valores
+    
+    def batch_update(self, data, **kwargs):
+        for item in data:
+            g = a1_range_to_grid_range(item['range'])
+            for i, linha in enumerate(item['values']):
+                for j, valor in enumerate(linha):
+                    self.grid[g['startRowIndex'] + i][g['startColumnIndex'] + j] = valor
+    
+    def update_cell(self, row: int, col: int, value):
+        self.batch_update([{'range': rowcol_to_a1(row, col), 'values': [[value]]}])
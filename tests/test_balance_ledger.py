@@ -0,0 +1,49 @@
+"""
+Testes do ledger de saldos diários
+"""
+from core.balance_ledger import BalanceLedger
+from core.models_sqlalchemy import Transaction, DailyBalance
+
+
+def _adicionar(db, date: str, amount: float):
+    db.add(Transaction(date=date, description='teste', amount=amount, type='variable'))
+    BalanceLedger(db).apply(date, amount)
+    db.commit()
+
+
+def test_transacao_de_valor_zero_nao_diverge(db):
+    _adicionar(db, '2026-03-01', 100.0)
+    _adicionar(db, '2026-03-02', 0.0)
+    
+    ledger = BalanceLedger(db)
+    assert ledger.check()['ok']
+    
+    # rebuild produz o mesmo conteúdo que o caminho incremental
+    antes = db.query(DailyBalance.date, DailyBalance.balance).order_by(DailyBalance.date).all()
+    ledger.rebuild()
+    depois = db.query(DailyBalance.date, DailyBalance.balance).order_by(DailyBalance.date).all()
+    assert antes == depois
+    assert ledger.check()['ok']
+
+
+def test_dia_que_soma_zero_nao_diverge(db):
+    _adicionar(db, '2026-03-01', 100.0)
+    _adicionar(db, '2026-03-02', -40.0)
+    _adicionar(db, '2026-03-02', 40.0)
+    
+    ledger = BalanceLedger(db)
+    assert ledger.check()['ok']
+    assert ledger.get_balance() == 100.0
+    
+    ledger.rebuild()
+    assert ledger.check()['ok']
+    assert ledger.get_balance() == 100.0
+
+
+def test_saldo_em_centavos_nao_acumula_erro(db):
+    for _ in range(10):
+        _adicionar(db, '2026-03-01', 0.1)
+    
+    ledger = BalanceLedger(db)
+    assert ledger.get_balance() == 1.0
+    assert ledger.check()['ok']
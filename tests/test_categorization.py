@@ -0,0 +1,26 @@
+"""
+Testes do serviço de categorização (dicionário em banco em memória)
+"""
+from sqlalchemy.orm import sessionmaker
+
+from services.categorization_service import CategorizationService
+
+
+def test_construtor_nao_consulta_o_banco(engine, dicionario):
+    sessoes = []
+    fabrica = sessionmaker(bind=engine)
+    
+    def session_factory():
+        sessoes.append(1)
+        return fabrica()
+    
+    service = CategorizationService(session_factory=session_factory)
+    assert sessoes == []
+    
+    assert service.categorizar('almoço no restaurante') == 'Alimentação'
+    consultas = len(sessoes)
+    assert consultas > 0
+    
+    # Dentro de KEYWORDS_CHECK_INTERVAL novas instâncias reaproveitam o dicionário
+    assert CategorizationService(session_factory=session_factory).categorizar('uber para casa') == 'Transporte'
+    assert len(sessoes) == consultas
@@ -0,0 +1,54 @@
+"""
+Planos das consultas principais: cada uma deve usar o índice esperado (EXPLAIN QUERY PLAN)
+"""
+import pytest
+from sqlalchemy import select, func, and_, or_
+
+from core.models_sqlalchemy import Transaction, InstallmentGroup
+
+# (descrição, consulta, índice que o plano deve usar)
+CONSULTAS = [
+    (
+        "Performance do mês (soma por tipo)",
+        select(Transaction.type, func.sum(Transaction.amount)).where(
+            Transaction.date >= '2026-01-01',
+            Transaction.date <= '2026-01-31',
+            or_(
+                and_(Transaction.type == 'income', Transaction.amount > 0),
+                and_(Transaction.type.in_(['fixed', 'variable']), Transaction.amount < 0)
+            )
+        ).group_by(Transaction.type),
+        'ix_transactions_date_type_amount'
+    ),
+    (
+        "Listagem por período e tipo",
+        select(Transaction.id, Transaction.description).where(
+            Transaction.date >= '2026-01-01',
+            Transaction.date <= '2026-01-31',
+            Transaction.type == 'variable'
+        ).order_by(Transaction.date.desc(), Transaction.created_at.desc(), Transaction.id.desc()),
+        'ix_transactions_date_created_id'
+    ),
+    (
+        "Transações recentes do dashboard",
+        select(Transaction).order_by(Transaction.created_at.desc()).limit(10),
+        'ix_transactions_created_at'
+    ),
+    (
+        "Cronograma de parcelas ativas",
+        select(
+            InstallmentGroup.start_date,
+            InstallmentGroup.total_installments,
+            InstallmentGroup.remaining_installments,
+            InstallmentGroup.installment_value
+        ).where(InstallmentGroup.is_simulation == False),
+        'ix_installment_groups_active'
+    ),
+]
+
+
+@pytest.mark.parametrize('descricao, consulta, indice', CONSULTAS, ids=[c[0] for c in CONSULTAS])
+def test_consulta_usa_indice(db, descricao, consulta, indice):
+    sql = consulta.compile(db.get_bind(), compile_kwargs={'literal_binds': True})
+    plano = [row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    assert any(indice in detalhe for detalhe in plano), plano
@@ -0,0 +1,61 @@
+"""
+Testes do serviço de relatórios (planilha em memória)
+"""
+from datetime import datetime
+
+import pytest
+
+import services.report_service as report_service
+from services.report_service import ReportService
+
+
+class Hoje15DeMarco(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 3, 15, 12, 0)
+
+
+def test_relatorio_anual_de_outro_ano_e_recusado():
+    # A recusa acontece antes de qualquer leitura da planilha
+    relatorio = ReportService(sheets_service=None).gerar_relatorio_anual(datetime.now().year - 1)
+    assert relatorio['sucesso'] is False
+    assert str(datetime.now().year - 1) in relatorio['erro']
+
+
+def test_relatorio_anual(sheets_service, worksheet, monkeypatch):
+    monkeypatch.setattr(report_service, 'datetime', Hoje15DeMarco)
+    
+    def lancar(mes, dia, coluna, valor):
+        worksheet.set(sheets_service._get_day_row(dia), sheets_service._get_month_column_offset(mes) + coluna,
+                      sheets_service._format_currency(valor))
+    
+    ENTRADA, SAIDA, DIARIO, SALDO = 1, 2, 3, 4
+    lancar(1, 1, ENTRADA, 1000)
+    lancar(1, 10, DIARIO, 100)
+    lancar(1, 31, SALDO, 900)
+    lancar(2, 5, SAIDA, 500)
+    lancar(2, 28, DIARIO, 50)
+    lancar(2, 28, SALDO, 350)
+    lancar(2, 30, ENTRADA, 9999)  # Linha de dia que não existe em fevereiro
+    lancar(3, 15, ENTRADA, 300)
+    lancar(3, 15, SALDO, 650)
+    lancar(3, 16, DIARIO, 50)  # Amanhã: só previsto
+    lancar(3, 31, SALDO, 600)
+    lancar(4, 1, ENTRADA, 2000)  # Mês futuro
+    
+    relatorio = ReportService(sheets_service).gerar_relatorio_anual()
+    assert relatorio['sucesso'], relatorio.get('erro')
+    meses = relatorio['meses']
+    
+    assert [m['performance'] for m in meses[:3]] == [900.0, -550.0, 300.0]
+    assert [m['performance_acumulada'] for m in meses[:3]] == [900.0, 350.0, 650.0]
+    assert [m['saldo_final'] for m in meses[:3]] == [900.0, 350.0, 650.0]
+    assert [m['realizado'] for m in meses[:4]] == [True, True, True, False]
+    assert meses[1]['entrada'] == 0.0
+    assert meses[2]['diario'] == 0.0
+    assert meses[1]['variacao_mes_anterior'] == -1450.0
+    
+    assert relatorio['totais'] == {'entrada': 1300.0, 'saida': 500.0, 'diario': 150.0, 'performance': 650.0}
+    assert relatorio['media_mensal']['entrada'] == pytest.approx(1300.0 / 3)
+    assert relatorio['melhor_mes']['mes'] == 1
+    assert relatorio['pior_mes']['mes'] == 2
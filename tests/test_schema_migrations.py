@@ -0,0 +1,71 @@
+"""
+Testes das migrações do esquema (banco SQLite em arquivo temporário)
+"""
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from core.schema_migrations import migrar
+
+
+def _banco_legado(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY, date VARCHAR, description VARCHAR, amount FLOAT,
+            type VARCHAR, category VARCHAR, installment_group_id INTEGER, created_at DATETIME
+        );
+        INSERT INTO transactions (id, date, description, amount, type)
+        VALUES (1, '2026-01-05', 'mercado', 10.555, 'variable'),
+               (2, '2026-02-31', 'data inválida', -20.0, 'variable'),
+               (3, '05/01/2026', 'formato antigo', -5.0, 'variable');
+        CREATE TABLE daily_balances (date VARCHAR PRIMARY KEY, net_amount FLOAT, balance FLOAT);
+    """)
+    conn.commit()
+    conn.close()
+
+
+def test_datas_invalidas_vao_para_quarentena(tmp_path):
+    caminho = tmp_path / 'legado.db'
+    _banco_legado(caminho)
+    engine = create_engine(f"sqlite:///{caminho}")
+    
+    assert migrar(engine) == ['transactions', 'daily_balances']
+    assert migrar(engine) == []
+    engine.dispose()
+    
+    conn = sqlite3.connect(caminho)
+    assert conn.execute("SELECT id, date, amount FROM transactions").fetchall() == [(1, '2026-01-05', 1056)]
+    quarentena = conn.execute("SELECT id, date, motivo FROM transactions_quarentena ORDER BY id").fetchall()
+    assert quarentena == [(2, '2026-02-31', 'data inválida'), (3, '05/01/2026', 'data inválida')]
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'daily_balances'").fetchone() is None
+    conn.close()
+
+
+def test_created_at_preenchido_sem_reconverter_centavos(tmp_path):
+    # Esquema após a migração para centavos, ainda com created_at opcional
+    caminho = tmp_path / 'centavos.db'
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY, date DATE NOT NULL, description VARCHAR NOT NULL, amount INTEGER NOT NULL,
+            type VARCHAR NOT NULL, category VARCHAR, installment_group_id INTEGER, created_at DATETIME
+        );
+        INSERT INTO transactions (id, date, description, amount, type, created_at)
+        VALUES (1, '2026-01-05', 'mercado', 1056, 'variable', NULL),
+               (2, '2026-01-06', 'padaria', -500, 'variable', '2026-01-06 09:30:00');
+    """)
+    conn.commit()
+    conn.close()
+    
+    engine = create_engine(f"sqlite:///{caminho}")
+    assert 'transactions' in migrar(engine)
+    engine.dispose()
+    
+    conn = sqlite3.connect(caminho)
+    assert conn.execute("SELECT id, amount, created_at FROM transactions ORDER BY id").fetchall() == [
+        (1, 1056, '2026-01-05 00:00:00'), (2, -500, '2026-01-06 09:30:00')
+    ]
+    notnull = {row[1]: row[3] for row in conn.execute("PRAGMA table_info(transactions)")}
+    assert notnull['created_at'] == 1
+    conn.close()
@@ -0,0 +1,76 @@
+"""
+Testes do pool de conexões com o Google Sheets (sem rede)
+"""
+import threading
+import time
+
+import pytest
+
+import services.sheets_client_pool as sheets_client_pool
+from services.sheets_client_pool import SheetsClientPool
+
+
+class Credenciais:
+    valid = True
+
+
+class ServicoLento:
+    """Serviço cuja autenticação e health check demoram (chamadas de rede lentas)"""
+    
+    def __init__(self, spreadsheet_id, credentials_path=None, mirror=None, demora=0.5):
+        self.spreadsheet_id = spreadsheet_id
+        self.credentials = Credenciais()
+        self.demora = demora
+        self.health_checks = 0
+        time.sleep(self.demora)
+    
+    def health_check(self):
+        self.health_checks += 1
+        time.sleep(self.demora)
+        return True
+    
+    def reconnect(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(sheets_client_pool, 'MIRROR_ENABLED', False)
+    monkeypatch.setattr(sheets_client_pool, 'GoogleSheetsBreno', ServicoLento)
+    return SheetsClientPool(health_check_interval=60)
+
+
+def _em_segundo_plano(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    time.sleep(0.1)  # Deixa a thread entrar na chamada lenta
+    return thread
+
+
+def test_autenticacao_lenta_nao_bloqueia_outra_planilha(pool):
+    pool._services['b'] = ServicoLento('b', demora=0)
+    pool._last_check['b'] = time.monotonic()
+    
+    thread = _em_segundo_plano(lambda: pool.get('a'))
+    inicio = time.monotonic()
+    assert pool.get('b').spreadsheet_id == 'b'
+    assert time.monotonic() - inicio < 0.2
+    thread.join()
+    
+    # A planilha 'a' foi criada uma única vez
+    assert pool.get('a') is pool._services['a']
+
+
+def test_health_check_lento_nao_bloqueia_a_mesma_planilha(pool):
+    service = ServicoLento('a', demora=0)
+    pool._services['a'] = service
+    pool._last_check['a'] = 0.0  # Verificação vencida
+    service.demora = 0.5
+    
+    thread = _em_segundo_plano(lambda: pool.get('a'))
+    inicio = time.monotonic()
+    assert pool.get('a') is service
+    assert time.monotonic() - inicio < 0.2
+    thread.join()
+    
+    assert service.health_checks == 1
@@ -0,0 +1,125 @@
+"""
+Testes da fila de escrita na planilha (planilha em memória)
+"""
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+from services.sheets_write_queue import SheetsWriteQueue
+
+
+class EspelhoDesatualizado:
+    """Espelho local com valores antigos em todos os meses"""
+    
+    def get_months(self, months):
+        return {month: [['R$ 10,00'] * 6 for _ in range(38)] for month in months}
+    
+    def generation(self):
+        return 0
+    
+    def store_months(self, blocos, generation):
+        pass
+    
+    def discard(self, months):
+        pass
+
+
+@pytest.fixture
+def celula_entrada(sheets_service, worksheet):
+    """Entrada de hoje = R$ 100,00 na planilha; espelho desatualizado e escrita durante cada leitura"""
+    hoje = datetime.now()
+    row = sheets_service._get_day_row(hoje.day)
+    col = sheets_service._get_month_column_offset(hoje.month) + 1
+    worksheet.set(row, col, 'R$ 100,00')
+    
+    sheets_service.mirror = EspelhoDesatualizado()
+    # Invalidação concorrente: a leitura fresca não é guardada em memória
+    worksheet.on_read = sheets_service._invalidate_month_blocks
+    return row, col
+
+
+def test_flush_soma_sobre_a_leitura_fresca(sheets_service, worksheet, celula_entrada, tmp_path):
+    queue = SheetsWriteQueue('planilha-teste', lambda: sheets_service, db_path=tmp_path / 'fila.db')
+    queue.enqueue('entrada', 50.0)
+    
+    assert queue.flush()['sucesso']
+    assert worksheet.get(*celula_entrada) == 'R$ 150,00'
+    assert queue.pending_count() == 0
+
+
+def test_dados_do_mes_fresh_ignoram_espelho(sheets_service, celula_entrada):
+    assert sheets_service._get_current_month_data(fresh=True)['entrada'] == 100.0
+
+
+def test_gravacao_lenta_mantem_as_travas(sheets_service, worksheet, tmp_path):
+    hoje = datetime.now()
+    row = sheets_service._get_day_row(hoje.day)
+    col = sheets_service._get_month_column_offset(hoje.month) + 1
+    worksheet.set(row, col, 'R$ 100,00')
+    
+    queue = SheetsWriteQueue('planilha-teste', lambda: sheets_service, db_path=tmp_path / 'fila.db', lock_ttl=0.2)
+    outra = SheetsWriteQueue('planilha-teste', lambda: sheets_service, db_path=tmp_path / 'fila.db', lock_ttl=0.2)
+    queue.enqueue('entrada', 50.0)
+    
+    reservadas = []
+    
+    def leitura_lenta():
+        time.sleep(0.5)  # Mais que lock_ttl
+        reservadas.append(outra._claim('outra-gravacao'))
+    
+    worksheet.on_read = leitura_lenta
+    assert queue.flush()['registros'] == 1
+    
+    assert reservadas == [{}]
+    assert worksheet.get(row, col) == 'R$ 150,00'
+    assert queue.pending_count() == 0
+
+
+def test_release_nao_remove_registros_de_trava_perdida(tmp_path):
+    queue = SheetsWriteQueue('planilha-teste', lambda: None, db_path=tmp_path / 'fila.db', lock_ttl=60)
+    queue.enqueue('entrada', 50.0)
+    assert queue._claim('primeira')
+    
+    # Trava da primeira gravação expirou e outra gravação assumiu a célula
+    conn = sqlite3.connect(queue.db_path)
+    conn.execute("UPDATE cell_locks SET acquired_at = 0")
+    conn.commit()
+    conn.close()
+    assert queue._claim('segunda')
+    
+    queue._release('primeira', written=True)
+    assert queue.pending_count() == 1
+    
+    queue._release('segunda', written=True)
+    assert queue.pending_count() == 0
+
+
+def test_registro_confirmado_sem_acesso_a_planilha(tmp_path):
+    def sem_planilha():
+        raise TimeoutError("planilha não respondeu")
+    
+    queue = SheetsWriteQueue('planilha-teste', sem_planilha, db_path=tmp_path / 'fila.db')
+    result = queue.registrar_entrada(50.0, 'salário')
+    
+    assert result['sucesso'] and result['enfileirado']
+    assert queue.pending_entry(result['id']) is not None
+    assert queue.pending_count() == 1
+
+
+def test_estimativa_nao_conta_o_registro_duas_vezes(sheets_service, worksheet, tmp_path):
+    hoje = datetime.now()
+    row = sheets_service._get_day_row(hoje.day)
+    col = sheets_service._get_month_column_offset(hoje.month)
+    worksheet.set(row, col + 3, 'R$ 50,00')  # Diário previsto
+    worksheet.set(row, col + 4, 'R$ 1.000,00')  # Saldo
+    
+    queue = SheetsWriteQueue('planilha-teste', lambda: sheets_service, db_path=tmp_path / 'fila.db')
+    primeiro = queue.registrar_gasto_diario(30.0, 'mercado')
+    assert (primeiro['acao'], primeiro['previsto'], primeiro['gasto_diario']) == ('substituído', 50.0, 30.0)
+    assert primeiro['saldo_atual'] == 1020.0
+    
+    segundo = queue.registrar_gasto_diario(10.0, 'padaria')
+    assert (segundo['acao'], segundo['previsto'], segundo['gasto_diario']) == ('adicionado', 30.0, 40.0)
+    assert segundo['saldo_atual'] == 1010.0
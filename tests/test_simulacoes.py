@@ -0,0 +1,57 @@
+"""
+Testes de simulate_loan_scenarios
+"""
+from datetime import datetime
+
+import pytest
+
+from core.finance_engine_api import FinanceEngineAPI, add_months
+
+
+def _inicio_em(meses: int) -> str:
+    hoje = datetime.now()
+    year, month = add_months(hoje.year, hoje.month, meses)
+    return f"{year}-{month:02d}-01"
+
+
+def test_emprestimo_com_inicio_futuro_cobra_todas_as_parcelas(db):
+    engine = FinanceEngineAPI(db)
+    base = engine.project_future_balance(18)
+    
+    [resultado] = engine.simulate_loan_scenarios([(12000.0, 2.0, 12)], start_date=_inicio_em(6))
+    
+    parcela = resultado['installment']
+    projecoes = resultado['projections']
+    assert len(projecoes) == 12
+    
+    # Cada mês projetado começa no mês da primeira parcela
+    assert (projecoes[0]['year'], projecoes[0]['month']) == (base[6]['year'], base[6]['month'])
+    
+    total_pago = sum(p['saidas'] - b['saidas'] for p, b in zip(projecoes, base[6:18]))
+    assert total_pago == pytest.approx(parcela * 12)
+    assert resultado['final_balance'] == pytest.approx(base[17]['balance'] - parcela * 12)
+
+
+def test_emprestimo_com_inicio_no_passado_so_cobra_parcelas_restantes(db):
+    engine = FinanceEngineAPI(db)
+    base = engine.project_future_balance(3)
+    
+    # 6 parcelas a partir de 3 meses atrás: 3 já pagas, restam o mês atual e os 2 seguintes
+    [resultado] = engine.simulate_loan_scenarios([(6000.0, 0.0, 6)], start_date=_inicio_em(-3))
+    
+    projecoes = resultado['projections']
+    assert len(projecoes) == 3
+    assert (projecoes[0]['year'], projecoes[0]['month']) == (base[0]['year'], base[0]['month'])
+    assert resultado['final_balance'] == pytest.approx(base[2]['balance'] - 3000.0)
+    assert resultado['total_payable'] == pytest.approx(6000.0)
+
+
+def test_emprestimo_ja_quitado_nao_altera_a_projecao(db):
+    engine = FinanceEngineAPI(db)
+    base = engine.project_future_balance(1)
+    
+    [resultado] = engine.simulate_loan_scenarios([(6000.0, 0.0, 6)], start_date=_inicio_em(-12))
+    
+    assert resultado['projections'] == []
+    assert resultado['final_balance'] == pytest.approx(base[0]['balance'])
+    assert resultado['min_balance'] == pytest.approx(base[0]['balance'])
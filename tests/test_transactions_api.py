@@ -0,0 +1,86 @@
+"""
+Testes da listagem de transações (paginação por cursor)
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import event
+
+from api.routes_transactions import TransactionCreate, create_bulk_transactions, get_transactions
+from core.models_sqlalchemy import Transaction
+
+
+def _paginas(db, **filtros):
+    ids, cursor = [], None
+    while True:
+        resposta = get_transactions(limit=3, cursor=cursor, db=db, **filtros)
+        ids += [t['id'] for t in json.loads(resposta.body)]
+        cursor = resposta.headers.get('x-next-cursor')
+        if not cursor:
+            return ids
+
+
+def test_cursor_percorre_todas_as_transacoes_uma_vez(db):
+    for i in range(7):
+        db.add(Transaction(date=f'2026-01-0{1 + i % 3}', description=str(i), amount=-1.0, type='variable'))
+    # created_at gravado pelo Python (com microssegundos) junto com os de server_default
+    db.add(Transaction(date='2026-01-02', description='agora', amount=-1.0, type='variable', created_at=datetime.now()))
+    db.commit()
+    
+    ids = _paginas(db)
+    esperado = [
+        t.id for t in db.query(Transaction).order_by(
+            Transaction.date.desc(), Transaction.created_at.desc(), Transaction.id.desc()
+        )
+    ]
+    assert ids == esperado
+    assert len(set(ids)) == 8
+
+
+def test_pagina_usa_o_indice_sem_ordenar(db, engine):
+    db.add(Transaction(date='2026-01-01', description='a', amount=-1.0, type='variable'))
+    db.add(Transaction(date='2026-01-02', description='b', amount=-1.0, type='variable'))
+    db.commit()
+    
+    consultas = []
+    
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            consultas.append((statement, parameters))
+    
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        cursor = get_transactions(limit=1, db=db).headers['x-next-cursor']
+        get_transactions(limit=1, cursor=cursor, start_date='2026-01-01', type_filter='variable', db=db)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+    
+    assert len(consultas) == 2
+    with engine.connect() as conn:
+        for statement, parameters in consultas:
+            plano = ' | '.join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters))
+            assert 'ix_transactions_date_created_id' in plano
+            assert 'TEMP B-TREE' not in plano
+
+
+def test_lote_sem_categoria_usa_palavras_chave(db, dicionario):
+    lote = [
+        TransactionCreate(date='2026-01-05', description='uber', amount=-25.0, type='variable', category='Outros'),
+        TransactionCreate(date='2026-01-05', description='almoço', amount=-30.0, type='variable', category=None),
+        TransactionCreate(date='2026-01-05', description='uber', amount=-15.0, type='variable', category='Lazer'),
+    ]
+    criadas = create_bulk_transactions(lote, db=db)['transactions']
+    assert [t['category'] for t in criadas] == ['Transporte', 'Alimentação', 'Lazer']
+
+
+def test_lote_devolve_ids_na_ordem_das_linhas(db, dicionario):
+    lote = [
+        TransactionCreate(date=f'2026-01-{dia:02d}', description=f'compra {dia}', amount=-float(dia),
+                          type='variable', category='Lazer')
+        for dia in (5, 1, 3)
+    ]
+    criadas = create_bulk_transactions(lote, db=db)['transactions']
+    
+    for criada in criadas:
+        gravada = db.get(Transaction, criada['id'])
+        assert (gravada.date, gravada.description, gravada.amount) == (criada['date'], criada['description'], criada['amount'])
@@ -0,0 +1,50 @@
+"""
+Script para treinar o classificador de categorias com as transações do banco
+Uso:
+    python treinar_categorias.py                -> treina e salva em data/category_model.npz
+    python treinar_categorias.py --epochs 300   -> mais passos de otimização
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Configurar encoding UTF-8 para Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.database import SessionLocal, init_db
+from services.category_classifier import treinar_de_transacoes, DEFAULT_MODEL_PATH
+
+parser = argparse.ArgumentParser(description="Treina o classificador de categorias com as transações do banco")
+parser.add_argument('--epochs', type=int, default=150, help="Passos de otimização (padrão: 150)")
+args = parser.parse_args()
+if args.epochs <= 0:
+    parser.error("--epochs deve ser positivo")
+epochs = args.epochs
+
+init_db()
+db = SessionLocal()
+
+try:
+    print("🧠 Treinando classificador de categorias...")
+    resultado = treinar_de_transacoes(db, epochs=epochs)
+    print(f"✅ {resultado['amostras']} transações, {len(resultado['categorias'])} categorias")
+    print(f"🏷️  Categorias: {', '.join(resultado['categorias'])}")
+    print(f"🎯 Acurácia no treino: {resultado['acuracia_treino'] * 100:.1f}%")
+    print(f"💾 Modelo salvo em {DEFAULT_MODEL_PATH}")
+
+except ValueError as e:
+    print(f"❌ {e}")
+    print("💡 Categorize mais transações antes de treinar.")
+    sys.exit(1)
+except Exception as e:
+    print(f"❌ Erro: {e}")
+    import traceback
+    traceback.print_exc()
+    sys.exit(1)
+finally:
+    db.close()